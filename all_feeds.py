@@ -1,8 +1,10 @@
-from feeds.crypto_indices import mcap1000
+from feeds.crypto_indices import mcap
 from feeds import test_feed
 
 Test = test_feed.Test
-MCAP1000 = mcap1000.MCAP1000
+MCAP10 = mcap.MCAP10
+MCAP100 = mcap.MCAP100
+MCAP1000 = mcap.MCAP1000
 
 #NOTE: this is a dict of all feed classes that SIWA can run, keyed by feed name
 #     this is used in endpoint.py to route requests to the correct feed
@@ -10,5 +12,7 @@ MCAP1000 = mcap1000.MCAP1000
 #TO ENABLE OR DISABLE A FEED, ADD OR REMOVE IT FROM THIS DICT
 all_feeds = {
     Test.NAME: Test,
+    MCAP10.NAME: MCAP10,
+    MCAP100.NAME: MCAP100,
     MCAP1000.NAME: MCAP1000,
     }
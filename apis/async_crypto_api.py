@@ -0,0 +1,226 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Type
+
+from apis import async_utils, response_cache, storage, utils
+from apis.crypto_api import CryptoAPI, MarketCapSnapshot, get_client
+from apis.coingecko import CoinGeckoAPI
+from apis.coinmarketcap import CoinMarketCapAPI
+from apis.coinpaprika import CoinPaprikaAPI
+from apis.cryptocompare import CryptoCompareAPI
+
+
+class AsyncCryptoAPI:
+    """
+    Mixin turning a `CryptoAPI` subclass into an asyncio client. Requests
+    are built by the blocking client's `get_data_request` and responses are
+    parsed by its `parse_data` / `extract_market_cap`, so only the I/O
+    differs between the two. Listings go through the response cache shared
+    with the blocking clients (apis.response_cache) and are decoded off the
+    event loop.
+
+    Methods:
+        get_data(N: int) -> Any:
+            Gets data from the API without blocking the event loop.
+        extract_market_cap_async(data: Any) -> MarketCapSnapshot:
+            Extracts market cap data, awaiting any follow-up requests.
+        fetch_mcap_by_rank(N: int) -> MarketCapSnapshot:
+            Fetch data by market capitalization, store it in a database and
+            return the data.
+    """
+
+    @utils.handle_request_errors
+    async def get_data(self, N: int) -> Any:
+        """
+        Gets data from the API.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            Any: Data fetched from API, or None if the request failed.
+        """
+        response = await response_cache.get_async(
+            **self.get_data_request(N), source=self.source
+        )
+        return self.parse_data(await async_utils.decode_json(response), N)
+
+    async def extract_market_cap_async(self, data: Any) -> MarketCapSnapshot:
+        """
+        Extracts market cap data from API response. Clients whose extraction
+        needs further requests override this method.
+
+        Parameters:
+            data (Any): Data received from API.
+
+        Returns:
+            MarketCapSnapshot: Market caps of the coins in the response.
+        """
+        return self.extract_market_cap(data)
+
+    async def fetch_mcap_by_rank(self, N: int) -> Optional[MarketCapSnapshot]:
+        """
+        Fetch data by market capitalization, store it in a database and return
+        the data.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            MarketCapSnapshot: Market caps of the top N cryptocurrencies.
+        """
+        data = await self.get_data(N)
+        if data is None:
+            return None
+        market_data = await self.extract_market_cap_async(data)
+        if market_data is None:
+            return None
+
+        # Store market data in the database (written in the background)
+        storage.get_market_cap_store().enqueue_snapshot(
+            market_data=market_data, source=self.source
+        )
+        return market_data
+
+
+class AsyncCoinGeckoAPI(AsyncCryptoAPI, CoinGeckoAPI):
+    """
+    Asyncio client for the CoinGecko API. The pages of a top N larger than
+    PER_PAGE_MAX are requested concurrently.
+    """
+
+    @utils.handle_request_errors
+    async def get_data(self, N: int) -> Any:
+        """
+        Gets data from the API.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            Any: Data fetched from API, or None if the request failed.
+        """
+        responses = await asyncio.gather(*[
+            response_cache.get_async(**self.get_data_request(N, page), source=self.source)
+            for page in range(self.PAGE, self.PAGE + self.num_pages(N))
+        ])
+        pages = [await async_utils.decode_json(response) for response in responses]
+        data = [coin for coins in pages for coin in coins]
+        return self.parse_data(data[:N], N)
+
+
+class AsyncCoinMarketCapAPI(AsyncCryptoAPI, CoinMarketCapAPI):
+    """
+    Asyncio client for the CoinMarketCap API.
+    """
+
+
+class AsyncCryptoCompareAPI(AsyncCryptoAPI, CryptoCompareAPI):
+    """
+    Asyncio client for the CryptoCompare API.
+    """
+
+
+class AsyncCoinPaprikaAPI(AsyncCryptoAPI, CoinPaprikaAPI):
+    """
+    Asyncio client for the CoinPaprika API. The listing is streamed, like
+    in the blocking client, and the per-coin OHLC requests of coins without
+    a ticker market cap are sent concurrently.
+    """
+
+    @utils.handle_request_errors
+    async def get_data(self, N: int) -> List[Dict[str, Any]]:
+        """
+        Gets data from CoinPaprika API. The listing holds tens of thousands
+        of coins; parse_data keeps the top N while it is read, in the loop's
+        default executor.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            List[Dict[str, Any]]: The top N coins sorted by rank.
+        """
+        return await async_utils.read_json(
+            **self.get_data_request(N), source=self.source,
+            consume=lambda coins: self.parse_data(coins, N)
+        )
+
+    @utils.handle_request_errors
+    async def extract_market_cap_async(
+            self, data: List[Dict[str, Any]]
+    ) -> Optional[MarketCapSnapshot]:
+        """
+        Extracts market cap data from API response.
+
+        Parameters:
+            data (List[Dict[str, Any]]): Data received from API.
+
+        Returns:
+            MarketCapSnapshot: Market caps of the coins in the response.
+        """
+        market_caps = [self.ticker_market_cap(coin) for coin in data]
+        # coins whose OHLC has no data are left out
+        ohlc_market_caps = iter(await asyncio.gather(*[
+            self.get_ohlc_market_cap_async(coin)
+            for coin, market_cap in zip(data, market_caps) if market_cap is None
+        ]))
+
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [next(ohlc_market_caps) if market_cap is None else market_cap
+             for market_cap in market_caps],
+            [coin["name"] for coin in data],
+            [coin.get(self.LAST_UPDATED) for coin in data],
+        )
+
+    @utils.handle_request_errors
+    async def get_ohlc_market_cap_async(self, coin: Dict[str, Any]) -> Optional[float]:
+        """
+        Market cap of a coin from its latest OHLC, see get_ohlc_market_cap.
+        """
+        coin_info = await async_utils.get_json(
+            self.ohlc_url.format(coin_id=coin["id"]), source=self.source
+        )
+        return self.ohlc_market_cap(coin_info)
+
+
+async def fetch_mcap_by_rank_from_sources(
+        sources: List[Type[CryptoAPI]], N: int, deadline: Optional[float] = None
+) -> Dict[str, MarketCapSnapshot]:
+    """
+    Fetches the top N market caps from several asyncio clients concurrently
+    and returns whatever arrived before the deadline; the fetches still
+    running then are cancelled.
+
+    Parameters:
+        sources (List[Type[CryptoAPI]]): AsyncCryptoAPI subclasses to query.
+        N (int): Number of cryptocurrencies to fetch from each source.
+        deadline (float, optional):
+            Seconds to wait for the sources. Defaults to waiting for all.
+
+    Returns:
+        Dict[str, MarketCapSnapshot]:
+            Market data (as returned by `fetch_mcap_by_rank`) keyed by the
+            source name, for the sources that answered in time.
+    """
+    async def fetch(source: Type[CryptoAPI]):
+        api = get_client(source)
+        return api.source, await api.fetch_mcap_by_rank(N)
+
+    tasks = {asyncio.ensure_future(fetch(source)): source for source in sources}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+    results = {}
+    for task in done:
+        try:
+            source_name, market_data = task.result()
+        except Exception as e:
+            print(f"Error occurred while fetching from {tasks[task].__name__}:", str(e))
+            continue
+        if market_data:
+            results[source_name] = market_data
+    for task in pending:
+        task.cancel()
+        print(f"Warning: {tasks[task].__name__} missed the {deadline}s deadline.")
+    await asyncio.gather(*pending, return_exceptions=True)
+    return results
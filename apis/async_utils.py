@@ -0,0 +1,289 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Sequence, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from apis import utils
+from apis.rate_limiter import rate_limiter
+
+REQUEST_TIMEOUT = 30  # seconds, for the whole request
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+
+T = TypeVar('T')
+
+# One aiohttp session (and so one connection pool) per running event loop
+_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+
+class AsyncResponse:
+    """
+    Fully read response of an asyncio request, mirroring the parts of
+    `requests.Response` that the API clients use.
+
+    Attributes:
+        url (str): URL of the request.
+        status_code (int): HTTP status code.
+        headers (CaseInsensitiveDict): Response headers.
+        content (bytes): Response body.
+    """
+
+    def __init__(self, url: str, status_code: int,
+                 headers: Dict[str, str], content: bytes) -> None:
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        """
+        Decodes the response body as JSON.
+        """
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """
+        Raises requests.exceptions.HTTPError if the status code is 4xx/5xx.
+        """
+        if 400 <= self.status_code < 600:
+            raise requests.exceptions.HTTPError(
+                f"Received status code {self.status_code} for URL: {self.url}"
+            )
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the aiohttp session of the running event loop, creating it on
+    first use.
+
+    Returns:
+        aiohttp.ClientSession: Session shared by all asyncio clients.
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+            ),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_session() -> None:
+    """
+    Closes the aiohttp session of the running event loop, if any.
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+def _format_params(params: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    # aiohttp only accepts str/int/float query values; format the rest the
+    # way requests does so both clients send identical URLs
+    if params is None:
+        return None
+    return {
+        key: value if isinstance(value, (str, int)) and not isinstance(value, bool)
+        else str(value)
+        for key, value in params.items()
+    }
+
+
+async def request(method: str, url: str,
+                  params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None,
+                  source: Optional[str] = None,
+                  **kwargs) -> AsyncResponse:
+    """
+    Sends a request on the shared session and reads the whole body.
+    aiohttp errors are raised as their `requests` equivalents, so the same
+    error handling (utils.handle_request_errors) applies to both clients.
+
+    Parameters:
+        method (str): HTTP method.
+        url (str): URL of the request.
+        params (Dict[str, Any], optional): Query parameters.
+        headers (Dict[str, str], optional): Request headers.
+        source (str, optional): Provider name; if given, the request waits
+            for the provider's (and endpoint's) rate limit budget.
+
+    Returns:
+        AsyncResponse: The fully read response.
+    """
+    if source is not None:
+        await rate_limiter.acquire_async(source, urlsplit(url).path.lstrip('/'))
+    session = get_session()
+    try:
+        async with session.request(method, url, params=_format_params(params),
+                                   headers=headers, **kwargs) as response:
+            content = await response.read()
+            return AsyncResponse(
+                str(response.url), response.status, dict(response.headers), content
+            )
+    except asyncio.TimeoutError as e:
+        raise requests.exceptions.Timeout(f"Request to {url} timed out") from e
+    except aiohttp.ClientError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+async def get_json(url: str, **kwargs) -> Any:
+    """
+    Sends a GET request and decodes the JSON body.
+
+    Parameters:
+        url (str): URL of the request.
+
+    Returns:
+        Any: Decoded JSON body.
+
+    Raises:
+        requests.exceptions.HTTPError: If the status code is not 2xx.
+    """
+    return await decode_json(await request('GET', url, **kwargs))
+
+
+async def decode_json(response: Any) -> Any:
+    """
+    Decodes the JSON body of a response in the loop's default executor, so
+    a large body does not block the event loop.
+
+    Parameters:
+        response (Any): An AsyncResponse, or a requests.Response (e.g. one
+            cached by apis.response_cache).
+
+    Returns:
+        Any: Decoded JSON body.
+
+    Raises:
+        requests.exceptions.HTTPError: If the status code is not 2xx.
+    """
+    if not 200 <= response.status_code < 300:
+        raise requests.exceptions.HTTPError(
+            f"Received status code {response.status_code} for URL: {response.url}"
+        )
+    return await asyncio.get_running_loop().run_in_executor(None, response.json)
+
+
+def _chunks(response: aiohttp.ClientResponse, loop: asyncio.AbstractEventLoop,
+            chunk_size: int) -> Iterator[bytes]:
+    # runs in the executor, each read is awaited on the loop
+    while True:
+        chunk = asyncio.run_coroutine_threadsafe(
+            response.content.read(chunk_size), loop).result(REQUEST_TIMEOUT)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def iter_json(url: str, path: Sequence[str] = (),
+                    max_items: Optional[int] = None,
+                    fields: Optional[Sequence[str]] = None,
+                    params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None,
+                    source: Optional[str] = None,
+                    chunk_size: int = utils.STREAM_CHUNK_SIZE) -> AsyncIterator[Any]:
+    """
+    Asyncio counterpart of utils.iter_json: sends a GET request on the
+    shared session and iterates the items of the JSON array at path as the
+    body arrives, stopping the read after max_items. The body is read on the
+    event loop and decoded (utils.iter_json_items) in the loop's default
+    executor, so neither blocks the loop.
+
+    Parameters:
+        url (str): URL of the request.
+        path (Sequence[str], optional): Keys leading to the array.
+        max_items (int, optional): Stop after this many items.
+        fields (Sequence[str], optional): Keep only these keys of items.
+        params (Dict[str, Any], optional): Query parameters.
+        headers (Dict[str, str], optional): Request headers.
+        source (str, optional): Provider name, see request.
+
+    Returns:
+        AsyncIterator[Any]: The decoded items of the array.
+
+    Raises:
+        requests.exceptions.HTTPError: If the status code is not 2xx.
+    """
+    if source is not None:
+        await rate_limiter.acquire_async(source, urlsplit(url).path.lstrip('/'))
+    loop = asyncio.get_running_loop()
+    session = get_session()
+    try:
+        async with session.get(url, params=_format_params(params),
+                               headers=headers) as response:
+            if not 200 <= response.status < 300:
+                raise requests.exceptions.HTTPError(
+                    f"Received status code {response.status} for URL: {url}"
+                )
+
+            items = utils.iter_json_items(_chunks(response, loop, chunk_size),
+                                          path, max_items, fields)
+            end = object()
+            while True:
+                item = await loop.run_in_executor(None, next, items, end)
+                if item is end:
+                    return
+                yield item
+    except asyncio.TimeoutError as e:
+        raise requests.exceptions.Timeout(f"Request to {url} timed out") from e
+    except aiohttp.ClientError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+async def read_json(url: str, consume: Callable[[Iterable[Any]], T],
+                    path: Sequence[str] = (),
+                    max_items: Optional[int] = None,
+                    fields: Optional[Sequence[str]] = None,
+                    params: Optional[Dict[str, Any]] = None,
+                    headers: Optional[Dict[str, str]] = None,
+                    source: Optional[str] = None,
+                    chunk_size: int = utils.STREAM_CHUNK_SIZE) -> T:
+    """
+    Like iter_json, but hands the items to a blocking consumer, run whole in
+    the loop's default executor while the body is read on the event loop;
+    cheaper than iter_json for long arrays consumed by blocking code, e.g.
+    a client's parse_data.
+
+    Parameters:
+        url (str): URL of the request.
+        consume (Callable[[Iterable[Any]], T]): Takes the items of the array
+            as they are decoded (utils.iter_json_items).
+        See iter_json for the other parameters.
+
+    Returns:
+        T: What consume returned.
+
+    Raises:
+        requests.exceptions.HTTPError: If the status code is not 2xx.
+    """
+    if source is not None:
+        await rate_limiter.acquire_async(source, urlsplit(url).path.lstrip('/'))
+    loop = asyncio.get_running_loop()
+    session = get_session()
+    try:
+        async with session.get(url, params=_format_params(params),
+                               headers=headers) as response:
+            if not 200 <= response.status < 300:
+                raise requests.exceptions.HTTPError(
+                    f"Received status code {response.status} for URL: {url}"
+                )
+            items = utils.iter_json_items(_chunks(response, loop, chunk_size),
+                                          path, max_items, fields)
+            return await loop.run_in_executor(None, consume, items)
+    except asyncio.TimeoutError as e:
+        raise requests.exceptions.Timeout(f"Request to {url} timed out") from e
+    except aiohttp.ClientError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
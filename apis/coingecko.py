@@ -1,7 +1,6 @@
 from typing import Any, Dict, List
-from apis.crypto_api import CryptoAPI
-import requests
-from apis import utils
+from apis.crypto_api import CryptoAPI, MarketCapSnapshot
+from apis import response_cache, sessions, utils
 
 
 class CoinGeckoAPI(CryptoAPI):
@@ -14,12 +13,13 @@ class CoinGeckoAPI(CryptoAPI):
     Methods:
         get_data(N: int) -> Dict[str, Any]:
             Gets data from CoinGecko API.
-        extract_market_cap(data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+        extract_market_cap(data: List[Dict[str, Any]]) -> MarketCapSnapshot:
             Extracts market cap data from API response.
     """
     VS_CURRENCY = "usd"
     ORDER = "market_cap_desc"
     PAGE = 1
+    PER_PAGE_MAX = 250  # largest per_page the markets endpoint accepts
     SPARKLINE = False  # Don't pull last 7 days of data
 
     NAME_KEY = "name"
@@ -46,41 +46,63 @@ class CoinGeckoAPI(CryptoAPI):
         Returns:
             Dict[str, Any]: A dictionary with data fetched from API.
         """
+        data = []
+        for page in range(self.PAGE, self.PAGE + self.num_pages(N)):
+            response = response_cache.get(
+                **self.get_data_request(N, page), source=self.source
+            )
+            response.raise_for_status()
+            coins = response.json()
+            data.extend(coins)
+            if len(coins) < self.PER_PAGE_MAX:
+                break
+        return self.parse_data(data[:N], N)
+
+    def num_pages(self, N: int) -> int:
+        """
+        Number of markets pages holding the top N cryptocurrencies.
+        """
+        return -(-N // self.PER_PAGE_MAX)
+
+    def get_data_request(self, N: int, page: int = PAGE) -> Dict[str, Any]:
+        """
+        Builds the CoinGecko markets request of one page of the top N.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+            page (int): Page of PER_PAGE_MAX coins, if N is larger.
+
+        Returns:
+            Dict[str, Any]: Keyword arguments of the HTTP GET request.
+        """
         parameters = {
             "vs_currency": self.VS_CURRENCY,
             "order": self.ORDER,
-            "per_page": N,
-            "page": self.PAGE,
+            "per_page": min(N, self.PER_PAGE_MAX),
+            "page": page,
             "sparkline": self.SPARKLINE,
         }
-        response = requests.get(self.url, params=parameters)
-        data = response.json()
-        return data
+        return {"url": self.url, "params": parameters}
 
-    def extract_market_cap(self, data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+    def extract_market_cap(self, data: List[Dict[str, Any]]) -> MarketCapSnapshot:
         """
         Extracts market cap data from API response.
 
         Parameters:
-            data (Dict[str, Any]): Data received from API.
+            data (List[Dict[str, Any]]): Data received from API.
 
         Returns:
-            Dict[float, Dict[str, str]]:
-                A dictionary with market cap as keys and coin details as values.
+            MarketCapSnapshot: Market caps of the coins in the response.
         """
-        market_data = {}
-        for coin in data:
-            name = coin[self.NAME_KEY]
-            last_updated = coin[self.LAST_UPDATED_KEY]
-            market_cap = coin[self.MARKET_CAP_KEY]
-            market_data[market_cap] = {
-                "name": name,
-                "last_updated": last_updated,
-            }
-        return market_data
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [coin[self.MARKET_CAP_KEY] for coin in data],
+            [coin[self.NAME_KEY] for coin in data],
+            [coin[self.LAST_UPDATED_KEY] for coin in data],
+        )
 
     @utils.handle_request_errors
-    def get_market_caps_of_list(self, tokens: List[str]) -> Dict[str, float]:
+    def get_market_caps_of_list(self, tokens: List[str]) -> MarketCapSnapshot:
         """
         Gets market cap data for the provided list of tokens from CoinGecko API.
 
@@ -88,26 +110,23 @@ class CoinGeckoAPI(CryptoAPI):
             tokens (List[str]): List of token names for which to fetch market cap data.
 
         Returns:
-            Dict[str, float]: A dictionary with token names as keys and their market cap as values.
+            MarketCapSnapshot: Market caps of the tokens.
         """
-        market_caps = {}
-
         tokens_comma_sep = ','.join(tokens)
 
         parameters = {
             "vs_currency": self.VS_CURRENCY,
             "ids": tokens_comma_sep,
         }
-        response = requests.get(self.url, params=parameters)
-        data = response.json()
-
-        if data:
-            for d in data:
-                market_cap = d.get(self.MARKET_CAP_KEY)
-                name = d.get(self.NAME_KEY)
-                last_updated = d.get(self.LAST_UPDATED_KEY)
-                market_caps[market_cap] = {
-                    'name': name,
-                    'last_updated': last_updated,
-                }
-        return market_caps
+        response = sessions.get(
+            self.url, params=parameters, source=self.source
+        )
+        response.raise_for_status()
+        data = response.json() or []
+
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [d.get(self.MARKET_CAP_KEY) for d in data],
+            [d.get(self.NAME_KEY) for d in data],
+            [d.get(self.LAST_UPDATED_KEY) for d in data],
+        )
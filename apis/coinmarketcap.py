@@ -1,8 +1,14 @@
-from typing import Any, Dict, List
-from apis.crypto_api import CryptoAPI
-import requests
-from apis import utils
-import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from apis.crypto_api import CryptoAPI, MarketCapSnapshot
+from apis import response_cache, sessions, utils
+
+QUOTES_BATCH_SIZE = 100     # ids per quotes/latest request, one credit each
+QUOTES_WORKERS = 4          # batches in flight; the rate limiter paces them
+
+_quotes_executor = ThreadPoolExecutor(
+    max_workers=QUOTES_WORKERS, thread_name_prefix='cmc-quotes'
+)
 
 
 class CoinMarketCapAPI(CryptoAPI):
@@ -15,8 +21,12 @@ class CoinMarketCapAPI(CryptoAPI):
     Methods:
         get_data(N: int) -> Dict[str, Any]:
             Gets data from CoinMarketCap API.
-        extract_market_cap(data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+        extract_market_cap(data: Dict[str, Any]) -> MarketCapSnapshot:
             Extracts market cap data from API response.
+        get_quotes(ids: List[int]) -> Dict[str, Any]:
+            Gets the latest quotes of up to QUOTES_BATCH_SIZE tokens.
+        get_market_caps_of_list(ids: List[int]) -> MarketCapSnapshot:
+            Gets market cap data of many tokens, in concurrent batches.
     """
 
     LIMIT = "limit"
@@ -28,6 +38,8 @@ class CoinMarketCapAPI(CryptoAPI):
     USD = "USD"
     MARKET_CAP = "market_cap"
     CMC_PRO_API_KEY = "X-CMC_PRO_API_KEY"
+    SKIP_INVALID = "skip_invalid"
+    QUOTES_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
 
     def __init__(self) -> None:
         """
@@ -53,16 +65,27 @@ class CoinMarketCapAPI(CryptoAPI):
         Returns:
             Dict[str, Any]: A dictionary with data fetched from API.
         """
+        response = response_cache.get(**self.get_data_request(N), source=self.source)
+        response.raise_for_status()
+        data = response.json()
+        return self.parse_data(data, N)
+
+    def get_data_request(self, N: int) -> Dict[str, Any]:
+        """
+        Builds the CoinMarketCap listings request.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            Dict[str, Any]: Keyword arguments of the HTTP GET request.
+        """
         parameters = {
             self.LIMIT: N
         }
-        response = requests.get(
-            self.url, headers=self.headers, params=parameters
-        )
-        data = response.json()
-        return data
+        return {"url": self.url, "headers": self.headers, "params": parameters}
 
-    def extract_market_cap(self, data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+    def extract_market_cap(self, data: Dict[str, Any]) -> MarketCapSnapshot:
         """
         Extracts market cap data from API response.
 
@@ -70,21 +93,49 @@ class CoinMarketCapAPI(CryptoAPI):
             data (Dict[str, Any]): Data received from API.
 
         Returns:
-            Dict[float, Dict[str, str]]:
-                A dictionary with market cap as keys and coin details as values.
-        """
-        market_data = {}
-        for coin in data[self.DATA]:
-            name = coin[self.NAME]
-            last_updated = coin[self.LAST_UPDATED]
-            market_cap = coin[self.QUOTE][self.USD][self.MARKET_CAP]
-            market_data[market_cap] = {
-                "name": name,
-                "last_updated": last_updated,
-            }
-        return market_data
+            MarketCapSnapshot: Market caps of the coins in the response.
+        """
+        coins = data[self.DATA]
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [coin[self.QUOTE][self.USD][self.MARKET_CAP] for coin in coins],
+            [coin[self.NAME] for coin in coins],
+            [coin[self.LAST_UPDATED] for coin in coins],
+        )
+
+    def parse_quote(self, token_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Market cap data of one token of a quotes/latest response.
+        """
+        return {
+            'name': token_data[self.NAME],
+            'market_cap': token_data[self.QUOTE][self.USD][self.MARKET_CAP],
+            'last_updated': token_data[self.LAST_UPDATED],
+        }
 
     @utils.handle_request_errors
+    def get_quotes(self, ids: List[int]) -> Dict[str, Any]:
+        """
+        Gets the latest quotes of several tokens in one request. Unknown ids
+        are skipped instead of failing the whole request.
+
+        Parameters:
+            ids (List[int]): Token ids, at most QUOTES_BATCH_SIZE.
+
+        Returns:
+            Dict[str, Any]: Quotes keyed by token id (as a string).
+        """
+        parameters = {
+            self.ID: ','.join(str(id) for id in ids),
+            self.SKIP_INVALID: 'true',
+        }
+        response = sessions.get(
+            self.QUOTES_URL, headers=self.headers, params=parameters,
+            source=self.source
+        )
+        response.raise_for_status()
+        return response.json().get(self.DATA, {})
+
     def get_market_cap_of_token(self, id: int) -> Dict[str, float]:
         """
         Gets market cap data for the provided token id from CoinMarketCap API.
@@ -95,46 +146,42 @@ class CoinMarketCapAPI(CryptoAPI):
         Returns:
             Dict[str, float]: A dictionary with market cap as keys and other metadata as values.
         """
-        url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
-        parameters = {
-            self.ID: id
-        }
-        response = requests.get(
-            url, headers=self.headers, params=parameters
-        )
-        data = response.json()
+        quotes = self.get_quotes([id])
+        if not quotes or str(id) not in quotes:
+            return {}
+        return self.parse_quote(quotes[str(id)])
 
-        market_cap_data = {}
-        if self.DATA in data:
-            token_data = data[self.DATA][str(id)]
-            name = token_data[self.NAME]
-            last_updated = token_data[self.LAST_UPDATED]
-            market_cap = token_data[self.QUOTE][self.USD][self.MARKET_CAP]
-            market_cap_data = {
-                'name': name,
-                'market_cap': market_cap,
-                'last_updated': last_updated,
-            }
-        return market_cap_data
-
-    def get_market_caps_of_list(self, ids: List[int]) -> Dict[str, Dict[str, Any]]:
+    def get_market_caps_of_list(self, ids: List[int]) -> Optional[MarketCapSnapshot]:
         """
         Gets market cap data for the provided list of token ids from CoinMarketCap API.
+        The ids are sent QUOTES_BATCH_SIZE at a time, the batches concurrently
+        within the source's rate limit budget.
 
         Parameters:
-            tokens (List[int]): List of token ids for which to fetch market cap data.
+            ids (List[int]): List of token ids for which to fetch market cap data.
 
         Returns:
-            Dict[str, Dict[str, Any]]: A dictionary with token names as keys and their respective market cap data as values.
-        """
-        market_caps = {}
-        for id in ids:
-            mcap_data = self.get_market_cap_of_token(id)
-            if mcap_data:
-                market_caps[mcap_data['market_cap']] = {
-                    'name': mcap_data['name'],
-                    'last_updated': mcap_data['last_updated']
-                }
-            time.sleep(0.2)  # To prevent hitting API rate limits
-
-        return market_caps
+            MarketCapSnapshot: Market caps of the tokens, in the order of
+                ids; None if every batch failed.
+        """
+        batches = [ids[i:i + QUOTES_BATCH_SIZE] for i in range(0, len(ids), QUOTES_BATCH_SIZE)]
+        if len(batches) <= 1:
+            results = [self.get_quotes(batch) for batch in batches]
+        else:
+            results = list(_quotes_executor.map(self.get_quotes, batches))
+
+        if batches and all(quotes is None for quotes in results):
+            return None
+        tokens = []
+        for batch, quotes in zip(batches, results):
+            if quotes is None:
+                print(f"Warning: missing quotes of {len(batch)} CoinMarketCap ids.")
+                continue
+            tokens.extend(self.parse_quote(quotes[str(id)])
+                          for id in batch if str(id) in quotes)
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [token['market_cap'] for token in tokens],
+            [token['name'] for token in tokens],
+            [token['last_updated'] for token in tokens],
+        )
@@ -1,7 +1,15 @@
-from typing import Any, Dict, List
-from apis.crypto_api import CryptoAPI
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+from apis.crypto_api import CryptoAPI, MarketCapSnapshot
 import requests
-from apis import utils
+from apis import sessions, utils
+
+OHLC_WORKERS = 8    # per-coin OHLC requests in flight; the rate limiter paces them
+
+_ohlc_executor = ThreadPoolExecutor(
+    max_workers=OHLC_WORKERS, thread_name_prefix='coinpaprika-ohlc'
+)
 
 
 class CoinPaprikaAPI(CryptoAPI):
@@ -13,21 +21,34 @@ class CoinPaprikaAPI(CryptoAPI):
 
     Attributes:
         ohlc_url (str): OHLC (Open/High/Low/Close) data URL format of the API.
+        bulk (bool): Take the market caps from the tickers listing, in one
+            request, instead of one OHLC request per coin.
 
     Methods:
         get_data(N: int) -> List[Dict[str, Any]]:
             Gets data from CoinPaprika API.
-        extract_market_cap(data: List[Dict[str, Any]]) -> Dict[float, Dict[str, Any]]:
+        extract_market_cap(data: List[Dict[str, Any]]) -> MarketCapSnapshot:
             Extracts market cap data from API response.
     """
 
-    def __init__(self) -> None:
+    COINS_URL = "https://api.coinpaprika.com/v1/coins"
+    TICKERS_URL = "https://api.coinpaprika.com/v1/tickers"
+    QUOTES = "quotes"
+    USD = "USD"
+    MARKET_CAP = "market_cap"
+    LAST_UPDATED = "last_updated"
+
+    def __init__(self, bulk: bool = True) -> None:
         """
         Constructs all the necessary attributes for the CoinPaprikaAPI object.
+
+        Parameters:
+            bulk (bool, optional): Use the tickers listing. Defaults to True.
         """
         self.ohlc_url = "https://api.coinpaprika.com/v1/coins/{coin_id}/ohlcv/latest"  # noqa E501
+        self.bulk = bulk
         super().__init__(
-            url="https://api.coinpaprika.com/v1/coins",
+            url=self.TICKERS_URL if bulk else self.COINS_URL,
             source='coinpaprika'
         )
 
@@ -43,23 +64,61 @@ class CoinPaprikaAPI(CryptoAPI):
             List[Dict[str, Any]]:
                 A list of dictionaries with data fetched from API.
         """
-        response = requests.get(self.url)
+        response = sessions.get(
+            **self.get_data_request(N), source=self.source, stream=True
+        )
         # HTTP 200 status code means the request was successful
-        if response.status_code == 200:
-            data = response.json()
-        else:
+        if response.status_code != 200:
+            response.close()
             raise requests.exceptions.RequestException(
                 f"Received status code {response.status_code} "
                 f"for URL: {self.url}"
             )
-        # Sorting the coins by market cap
+        # The listing holds tens of thousands of coins, only the top N are
+        # kept while it is read from the socket
+        return self.parse_data(utils.iter_json(response), N)
+
+    def get_data_request(self, N: int) -> Dict[str, Any]:
+        """
+        Builds the CoinPaprika tickers (or coin list) request.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch (the endpoints
+                always return the full list).
+
+        Returns:
+            Dict[str, Any]: Keyword arguments of the HTTP GET request.
+        """
+        return {"url": self.url}
+
+    def parse_data(self, data: Iterable[Dict[str, Any]], N: int) -> List[Dict[str, Any]]:
+        """
+        Keeps the top N coins by rank, holding at most N of them at a time.
+
+        Parameters:
+            data (Iterable[Dict[str, Any]]): Decoded JSON response, or its
+                items as they are decoded.
+            N (int): Number of cryptocurrencies requested.
+
+        Returns:
+            List[Dict[str, Any]]: The top N coins sorted by rank.
+        """
         # Also filtering out coins with rank 0 (junk values in API response)
-        filtered_data = [coin for coin in data if coin['rank'] != 0]
-        sorted_data = sorted(filtered_data, key=lambda coin: coin['rank'])[:N]
-        return sorted_data
+        return heapq.nsmallest(
+            N, (coin for coin in data if coin['rank'] != 0),
+            key=lambda coin: coin['rank']
+        )
+
+    def ticker_market_cap(self, coin: Dict[str, Any]) -> Optional[float]:
+        """
+        Market cap of a coin of the tickers listing, None if it has none
+        (or the coin comes from the coin list).
+        """
+        market_cap = coin.get(self.QUOTES, {}).get(self.USD, {}).get(self.MARKET_CAP)
+        return market_cap or None
 
     @utils.handle_request_errors
-    def extract_market_cap(self, data: List[Dict[str, Any]]) -> Dict[float, Dict[str, Any]]:
+    def extract_market_cap(self, data: List[Dict[str, Any]]) -> MarketCapSnapshot:
         """
         Extracts market cap data from API response.
 
@@ -67,30 +126,49 @@ class CoinPaprikaAPI(CryptoAPI):
             data (List[Dict[str, Any]]): Data received from API.
 
         Returns:
-            Dict[float, Dict[str, Any]]:
-                A dictionary with market cap as keys and coin details as values.
-        """
-        # Fetch the details of each coin
-        market_data = {}
-        for coin in data:
-            coin_id = coin["id"]
-            coin_info_url = self.ohlc_url.format(coin_id=coin_id)
-            coin_info_response = requests.get(coin_info_url)
-            # HTTP 200 status code means the request was successful
-            if coin_info_response.status_code == 200:
-                coin_info = coin_info_response.json()
-            else:
-                raise requests.exceptions.RequestException(
-                    f"Received status code {coin_info_response.status_code} "
-                    "for URL: {coin_info_url}"
-                )
-
-            name = coin["name"]
-            last_updated = 0  # Updated every 5 mins as per docs: https://api.coinpaprika.com/#tag/Coins/paths/~1coins~1%7Bcoin_id%7D~1ohlcv~1today~1/get # noqa E501
-            market_cap = coin_info[0]['market_cap']
-            market_data[market_cap] = {
-                "name": name,
-                "last_updated": last_updated,
-            }
-
-        return market_data
+            MarketCapSnapshot: Market caps of the coins in the response.
+        """
+        # Coins without a ticker market cap fall back to their OHLC, fetched
+        # concurrently; those whose OHLC has no data are left out
+        market_caps = [self.ticker_market_cap(coin) for coin in data]
+        missing = [coin for coin, market_cap in zip(data, market_caps) if market_cap is None]
+        ohlc_market_caps = iter(_ohlc_executor.map(self.get_ohlc_market_cap, missing))
+
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [next(ohlc_market_caps) if market_cap is None else market_cap
+             for market_cap in market_caps],
+            [coin["name"] for coin in data],
+            # Tickers are updated every minute, OHLC every 5 mins as per docs: https://api.coinpaprika.com/#tag/Coins/paths/~1coins~1%7Bcoin_id%7D~1ohlcv~1today~1/get # noqa E501
+            [coin.get(self.LAST_UPDATED) for coin in data],
+        )
+
+    def ohlc_market_cap(self, coin_info: Optional[List[Dict[str, Any]]]) -> Optional[float]:
+        """
+        Market cap of a latest OHLC response, None if it holds no data.
+        """
+        if not coin_info:
+            return None
+        return coin_info[0].get(self.MARKET_CAP)
+
+    @utils.handle_request_errors
+    def get_ohlc_market_cap(self, coin: Dict[str, Any]) -> Optional[float]:
+        """
+        Market cap of a coin from its latest OHLC.
+
+        Parameters:
+            coin (Dict[str, Any]): Coin of the listing.
+
+        Returns:
+            Optional[float]: Market cap, None if the OHLC has no data or
+                could not be fetched.
+        """
+        coin_info_url = self.ohlc_url.format(coin_id=coin["id"])
+        coin_info_response = sessions.get(coin_info_url, source=self.source)
+        # HTTP 200 status code means the request was successful
+        if coin_info_response.status_code != 200:
+            raise requests.exceptions.RequestException(
+                f"Received status code {coin_info_response.status_code} "
+                f"for URL: {coin_info_url}"
+            )
+        return self.ohlc_market_cap(coin_info_response.json())
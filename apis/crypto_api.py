@@ -1,7 +1,183 @@
-from typing import Any, List, Dict
-from apis import utils
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple, Type
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import threading
+import sys
+import numpy as np
+from apis import storage
 import os
 
+# Client instances are reused across heartbeats, see get_client
+_clients: Dict[type, "CryptoAPI"] = {}
+_clients_lock = threading.Lock()
+
+SOURCE_WORKERS = 8          # sources fetched at once, across all fetches
+
+# Shared by all concurrent multi-source fetches. Requests time out after
+# utils.REQUEST_TIMEOUT, so fetches outliving their deadline free their
+# worker soon after.
+_source_executor = ThreadPoolExecutor(
+    max_workers=SOURCE_WORKERS, thread_name_prefix='crypto-api-source'
+)
+
+
+def to_unix_time(value: Any) -> float:
+    """
+    Unix time of a provider's update time, given as a unix timestamp or an
+    ISO 8601 string (UTC unless it says otherwise).
+
+    Parameters:
+        value (Any): Update time as sent by the provider.
+
+    Returns:
+        float: Seconds since the epoch, NaN if missing or unparseable.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        time = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return np.nan
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    return time.timestamp()
+
+
+@dataclass(frozen=True, eq=False)
+class MarketCapSnapshot:
+    """
+    Market caps of one source as read-only columns (struct of arrays), in
+    the provider's order. Coins with equal market caps are kept apart, and
+    the top N is selected in linear time.
+
+    Attributes:
+        source (str): Source of the data.
+        market_caps (np.ndarray): Market caps (float64).
+        names (np.ndarray): Interned coin names (object).
+        last_updated (np.ndarray): Unix update times (float64, NaN if unknown).
+
+    Methods:
+        from_columns(source: str, market_caps, names, last_updated) -> MarketCapSnapshot:
+            Builds a snapshot from the values sent by a provider.
+        top(N: int) -> MarketCapSnapshot:
+            The N largest market caps, largest first.
+        total(N: int) -> float:
+            Sum of the N largest market caps.
+        records() -> Iterator[Tuple[str, float, float]]:
+            (name, market cap, last updated) of each coin.
+    """
+    source: str
+    market_caps: np.ndarray
+    names: np.ndarray
+    last_updated: np.ndarray
+
+    def __post_init__(self) -> None:
+        for column in (self.market_caps, self.names, self.last_updated):
+            column.setflags(write=False)
+
+    @classmethod
+    def from_columns(cls, source: str, market_caps: Sequence[Optional[float]],
+                     names: Iterable[str], last_updated: Iterable[Any]) -> "MarketCapSnapshot":
+        """
+        Builds a snapshot from the values sent by a provider. Coins without
+        a market cap (None) are left out.
+
+        Parameters:
+            source (str): Source of the data.
+            market_caps (Sequence[Optional[float]]): Market caps.
+            names (Iterable[str]): Coin names.
+            last_updated (Iterable[Any]): Update times, see `to_unix_time`.
+
+        Returns:
+            MarketCapSnapshot: The snapshot.
+        """
+        market_caps = np.array(market_caps, dtype=np.float64)
+        names = np.array([sys.intern(name) for name in names], dtype=object)
+        last_updated = np.array([to_unix_time(value) for value in last_updated],
+                                dtype=np.float64)
+        known = ~np.isnan(market_caps)
+        if not known.all():
+            market_caps, names, last_updated = (
+                market_caps[known], names[known], last_updated[known])
+        return cls(source, market_caps, names, last_updated)
+
+    def __len__(self) -> int:
+        return len(self.market_caps)
+
+    def take(self, indices: np.ndarray) -> "MarketCapSnapshot":
+        """
+        Snapshot of the coins at the given positions.
+        """
+        return MarketCapSnapshot(self.source, self.market_caps[indices],
+                                 self.names[indices], self.last_updated[indices])
+
+    def top(self, N: int) -> "MarketCapSnapshot":
+        """
+        Snapshot of the N largest market caps, largest first.
+
+        Parameters:
+            N (int): Number of coins.
+
+        Returns:
+            MarketCapSnapshot: The top N (all coins if there are fewer).
+        """
+        N = max(0, min(N, len(self)))
+        indices = np.argpartition(-self.market_caps, N - 1)[:N] if N else np.arange(0)
+        order = np.argsort(-self.market_caps[indices], kind='stable')
+        return self.take(indices[order])
+
+    def total(self, N: int) -> float:
+        """
+        Sum of the N largest market caps, without sorting them.
+
+        Parameters:
+            N (int): Number of coins.
+
+        Returns:
+            float: The sum (of all coins if there are fewer).
+        """
+        n = len(self)
+        if N >= n:
+            return float(self.market_caps.sum())
+        if N <= 0:
+            return 0.0
+        return float(np.partition(self.market_caps, n - N)[n - N:].sum())
+
+    def records(self) -> Iterator[Tuple[str, float, float]]:
+        """
+        (name, market cap, last updated) of each coin, e.g. to store them.
+        """
+        return zip(self.names.tolist(), self.market_caps.tolist(),
+                   self.last_updated.tolist())
+
+
+def join_market_caps(
+        snapshots: Sequence[MarketCapSnapshot]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aligns the market caps of several snapshots by coin name (outer join).
+
+    Parameters:
+        snapshots (Sequence[MarketCapSnapshot]): Snapshots to join.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]:
+            The sorted coin names of all snapshots, and a (names x snapshots)
+            matrix of their market caps, NaN where a snapshot lacks the coin.
+            If a snapshot lists a name twice, its last market cap is kept.
+    """
+    if not snapshots:
+        return np.array([], dtype=object), np.empty((0, 0))
+    names, rows = np.unique(
+        np.concatenate([snapshot.names for snapshot in snapshots]), return_inverse=True
+    )
+    columns = np.repeat(np.arange(len(snapshots)),
+                        [len(snapshot) for snapshot in snapshots])
+    matrix = np.full((len(names), len(snapshots)), np.nan)
+    matrix[rows, columns] = np.concatenate([snapshot.market_caps for snapshot in snapshots])
+    return names, matrix
+
 
 class CryptoAPI:
     """
@@ -12,11 +188,15 @@ class CryptoAPI:
         source (str): Source of the data.
 
     Methods:
-        fetch_mcap_by_rank(N: int) -> dict:
+        fetch_mcap_by_rank(N: int) -> MarketCapSnapshot:
             Fetch data by market capitalization and stores in a database.
         get_data(N: int):
             Abstract method to get data.
-        extract_market_cap(data: Any):
+        get_data_request(N: int) -> dict:
+            Abstract method to build the HTTP request sent by get_data.
+        parse_data(data: Any, N: int):
+            Post-processes the decoded response of get_data.
+        extract_market_cap(data: Any) -> MarketCapSnapshot:
             Abstract method to extract market cap data.
     """
 
@@ -33,7 +213,7 @@ class CryptoAPI:
         self.url = url
         self.source = source
 
-    def fetch_mcap_by_list(self, tokens: List[str]) -> Dict[str, float]:
+    def fetch_mcap_by_list(self, tokens: List[str]) -> Optional[MarketCapSnapshot]:
         """
         Fetch data by list of tokens, store it in a database and return
         the data.
@@ -42,22 +222,20 @@ class CryptoAPI:
             tokens (List[str]): List of tokens to fetch.
 
         Returns:
-            Dict[str, float]:
-                Dictionary with token names as keys and market cap as values.
+            MarketCapSnapshot: Market caps of the tokens.
         """
 
         market_data = self.get_market_caps_of_list(tokens)
         if market_data is None:
             return None
 
-        # Store market data in the database
-        utils.create_market_cap_database()
-        utils.store_market_cap_data(
+        # Store market data in the database (written in the background)
+        storage.get_market_cap_store().enqueue_snapshot(
             market_data=market_data, source=self.source
         )
         return market_data
 
-    def fetch_mcap_by_rank(self, N: int) -> dict:
+    def fetch_mcap_by_rank(self, N: int) -> Optional[MarketCapSnapshot]:
         """
         Fetch data by market capitalization, store it in a database and return
         the data.
@@ -66,18 +244,17 @@ class CryptoAPI:
             N (int): Number of cryptocurrencies to fetch.
 
         Returns:
-            dict:
-                Dictionary with market cap as keys and other details as values.
+            MarketCapSnapshot: Market caps of the top N cryptocurrencies.
         """
         data = self.get_data(N)
         if data is None:
             return None
-        else:
-            market_data = self.extract_market_cap(data)
+        market_data = self.extract_market_cap(data)
+        if market_data is None:
+            return None
 
-        # Store market data in the database
-        utils.create_market_cap_database()
-        utils.store_market_cap_data(
+        # Store market data in the database (written in the background)
+        storage.get_market_cap_store().enqueue_snapshot(
             market_data=market_data, source=self.source
         )
         return market_data
@@ -95,13 +272,48 @@ class CryptoAPI:
         """
         raise NotImplementedError
 
-    def extract_market_cap(self, data: Any) -> dict:
+    def get_data_request(self, N: int) -> Dict[str, Any]:
+        """
+        Abstract method to build the HTTP GET request sent by `get_data`.
+        Shared by the blocking and the asyncio clients.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+
+        Returns:
+            Dict[str, Any]:
+                Keyword arguments of the request (url, params, headers).
+
+        Raises:
+            NotImplementedError:
+                If this method is not implemented by a subclass.
+        """
+        raise NotImplementedError
+
+    def parse_data(self, data: Any, N: int) -> Any:
+        """
+        Post-processes the decoded JSON response of `get_data`.
+        Shared by the blocking and the asyncio clients.
+
+        Parameters:
+            data (Any): Decoded JSON response.
+            N (int): Number of cryptocurrencies requested.
+
+        Returns:
+            Any: The data passed on to `extract_market_cap`.
+        """
+        return data
+
+    def extract_market_cap(self, data: Any) -> MarketCapSnapshot:
         """
         Abstract method to extract market cap data from API response.
 
         Parameters:
             data (Any): Data received from API.
 
+        Returns:
+            MarketCapSnapshot: Market caps of the coins in the response.
+
         Raises:
             NotImplementedError:
                 If this method is not implemented by a subclass.
@@ -130,3 +342,62 @@ class CryptoAPI:
                 f"{api_provider_name.upper()}_API_KEY."
             )
         return api_key
+
+
+def get_client(source: Type[CryptoAPI]) -> CryptoAPI:
+    """
+    Returns the process-wide instance of a CryptoAPI subclass, creating it
+    on first use, so feeds don't rebuild clients on every heartbeat.
+
+    Parameters:
+        source (Type[CryptoAPI]): CryptoAPI subclass.
+
+    Returns:
+        CryptoAPI: Shared instance of the subclass.
+    """
+    client = _clients.get(source)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(source)
+            if client is None:
+                client = _clients[source] = source()
+    return client
+
+
+def fetch_mcap_by_rank_from_sources(
+        sources: List[Type[CryptoAPI]], N: int, deadline: Optional[float] = None
+) -> Dict[str, MarketCapSnapshot]:
+    """
+    Fetches the top N market caps from several sources in parallel and
+    returns whatever arrived before the deadline.
+
+    Parameters:
+        sources (List[Type[CryptoAPI]]): CryptoAPI subclasses to query.
+        N (int): Number of cryptocurrencies to fetch from each source.
+        deadline (float, optional):
+            Seconds to wait for the sources. Defaults to waiting for all.
+
+    Returns:
+        Dict[str, MarketCapSnapshot]:
+            Market data (as returned by `fetch_mcap_by_rank`) keyed by the
+            source name, for the sources that answered in time.
+    """
+    def fetch(source: Type[CryptoAPI]):
+        api = get_client(source)
+        return api.source, api.fetch_mcap_by_rank(N)
+
+    futures = {_source_executor.submit(fetch, source): source for source in sources}
+    done, not_done = wait(futures, timeout=deadline)
+
+    results = {}
+    for future in done:
+        try:
+            source_name, market_data = future.result()
+        except Exception as e:
+            print(f"Error occurred while fetching from {futures[future].__name__}:", str(e))
+            continue
+        if market_data:
+            results[source_name] = market_data
+    for future in not_done:
+        print(f"Warning: {futures[future].__name__} missed the {deadline}s deadline.")
+    return results
@@ -1,7 +1,7 @@
 from typing import Any, Dict, List
-from apis.crypto_api import CryptoAPI
+from apis.crypto_api import CryptoAPI, MarketCapSnapshot
 import requests
-from apis import utils
+from apis import response_cache, sessions, utils
 from apis.utils import MissingDataException
 
 
@@ -15,7 +15,7 @@ class CryptoCompareAPI(CryptoAPI):
     Methods:
         get_data(N: int) -> Dict[str, Any]:
             Gets data from CryptoCompare API.
-        extract_market_cap(data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+        extract_market_cap(data: List[Dict[str, Any]]) -> MarketCapSnapshot:
             Extracts market cap data from API response.
     """
 
@@ -30,6 +30,7 @@ class CryptoCompareAPI(CryptoAPI):
     NAME = "Name"
     LAST_UPDATE = "LASTUPDATE"
     MKTCAP = "MKTCAP"
+    BUFFER = 2
 
     def __init__(self) -> None:
         """
@@ -41,7 +42,7 @@ class CryptoCompareAPI(CryptoAPI):
         )
 
     @utils.handle_request_errors
-    def get_data(self, N: int, buffer: int = 2) -> Dict[str, Any]:
+    def get_data(self, N: int, buffer: int = BUFFER) -> Dict[str, Any]:
         """
         Gets data from CryptoCompare API.
 
@@ -57,11 +58,9 @@ class CryptoCompareAPI(CryptoAPI):
         Returns:
             Dict[str, Any]: A dictionary with data fetched from API.
         """
-        parameters = {
-            self.LIMIT: N + buffer,
-            self.TSYM: self.USD,
-        }
-        response = requests.get(self.url, params=parameters)
+        response = response_cache.get(
+            **self.get_data_request(N, buffer), source=self.source
+        )
         if response.status_code == 200:
             data = response.json()
         else:
@@ -69,6 +68,42 @@ class CryptoCompareAPI(CryptoAPI):
                 f"Received status code {response.status_code} "
                 f"for URL: {self.url}"
             )
+        return self.parse_data(data, N, buffer)
+
+    def get_data_request(self, N: int, buffer: int = BUFFER) -> Dict[str, Any]:
+        """
+        Builds the CryptoCompare top-by-market-cap request.
+
+        Parameters:
+            N (int): Number of cryptocurrencies to fetch.
+            buffer (int): Number of extra cryptocurrencies to fetch.
+
+        Returns:
+            Dict[str, Any]: Keyword arguments of the HTTP GET request.
+        """
+        parameters = {
+            self.LIMIT: N + buffer,
+            self.TSYM: self.USD,
+        }
+        return {"url": self.url, "params": parameters}
+
+    def parse_data(self, data: Dict[str, Any], N: int, buffer: int = BUFFER) -> List[Dict[str, Any]]:
+        """
+        Drops coins without RAW data (ie, without market cap) from the
+        response and keeps the top N.
+
+        Parameters:
+            data (Dict[str, Any]): Decoded JSON response.
+            N (int): Number of cryptocurrencies requested.
+            buffer (int): Number of extra cryptocurrencies fetched.
+
+        Returns:
+            List[Dict[str, Any]]: The top N coins with RAW data.
+
+        Raises:
+            MissingDataException:
+                If more than `buffer` coins are missing RAW data.
+        """
         missing_count = 0
         for coin in data[self.DATA]:
             try:
@@ -83,30 +118,25 @@ class CryptoCompareAPI(CryptoAPI):
                 data[self.DATA].remove(coin)
         return data[self.DATA][:N]
 
-    def extract_market_cap(self, data: Dict[str, Any]) -> Dict[float, Dict[str, str]]:
+    def extract_market_cap(self, data: List[Dict[str, Any]]) -> MarketCapSnapshot:
         """
         Extracts market cap data from API response.
 
         Parameters:
-            data (Dict[str, Any]): Data received from API.
+            data (List[Dict[str, Any]]): Data received from API.
 
         Returns:
-            Dict[float, Dict[str, str]]:
-                A dictionary with market cap as keys and coin details as values.
+            MarketCapSnapshot: Market caps of the coins in the response.
         """
-        market_data = {}
-        for coin in data:
-            name = coin[self.COIN_INFO][self.NAME]
-            last_updated = coin[self.RAW][self.USD][self.LAST_UPDATE]
-            market_cap = coin[self.RAW][self.USD][self.MKTCAP]
-            market_data[market_cap] = {
-                "name": name,
-                "last_updated": last_updated,
-            }
-        return market_data
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [coin[self.RAW][self.USD][self.MKTCAP] for coin in data],
+            [coin[self.COIN_INFO][self.NAME] for coin in data],
+            [coin[self.RAW][self.USD][self.LAST_UPDATE] for coin in data],
+        )
 
     @utils.handle_request_errors
-    def get_market_caps_of_list(self, tokens: List[str]) -> Dict[str, Dict[str, Any]]:
+    def get_market_caps_of_list(self, tokens: List[str]) -> MarketCapSnapshot:
         """
         Gets market cap data for the provided list of tokens from CryptoCompare API.
 
@@ -114,7 +144,7 @@ class CryptoCompareAPI(CryptoAPI):
             tokens (List[str]): List of token names for which to fetch market cap data.
 
         Returns:
-            Dict[str, Dict[str, Any]]: A dictionary with token names as keys and their respective market cap data as values.
+            MarketCapSnapshot: Market caps of the tokens, named by symbol.
         """
         url = "https://min-api.cryptocompare.com/data/pricemultifull"
         tokens_upper = [token.upper() for token in tokens]
@@ -123,17 +153,16 @@ class CryptoCompareAPI(CryptoAPI):
             self.FSYMS: tokens_comma_sep,
             self.TSYMS: self.USD,
         }
-        response = requests.get(url, params=parameters)
+        response = sessions.get(url, params=parameters, source=self.source)
+        response.raise_for_status()
         data = response.json()
 
-        market_caps = {}
-        if data and self.RAW in data:
-            for token in tokens_upper:
-                if token in data[self.RAW] and self.USD in data[self.RAW][token]:
-                    market_cap = data[self.RAW][token][self.USD][self.MKTCAP]
-                    last_updated = data[self.RAW][token][self.USD][self.LAST_UPDATE]
-                    market_caps[market_cap] = {
-                        'name': token,
-                        'last_updated': last_updated,
-                    }
-        return market_caps
+        raw = data.get(self.RAW, {}) if data else {}
+        found = [token for token in tokens_upper
+                 if token in raw and self.USD in raw[token]]
+        return MarketCapSnapshot.from_columns(
+            self.source,
+            [raw[token][self.USD][self.MKTCAP] for token in found],
+            found,
+            [raw[token][self.USD][self.LAST_UPDATE] for token in found],
+        )
@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+from apis.csgo_index import MAPPING_PATH, index_share_stats
+
+DEFAULT_DIRECTORY = 'data/csgo/price_histories'
+CHECKPOINT_FILE = 'checkpoint.json'
+DEFAULT_WORKERS = 4     # requests in flight; the RPM budget paces them
+DATE_KEY = 'date'
+COLUMNS = ['market_hash_name', 'date', 'market', 'price', 'quantity', 'updated_at']
+
+
+def history_columns(items: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Flattens validated price history items into one row per skin, date and
+    market listing, prices in dollars. Numbers may still be strings (items
+    of a sampled validation are not coerced, see
+    CSGOSkins.validate_api_data) and are converted here.
+    """
+    rows = [
+        (item['market_hash_name'], day['date'], price['market'], price['price'],
+         price['quantity'], price['updated_at'])
+        for item in items for day in item['dates'] for price in day['prices']
+    ]
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    # Explicit types, rather than a None/int object column for updated_at
+    df['price'] = pd.to_numeric(df['price']).astype('float64') / 100
+    df['quantity'] = pd.to_numeric(df['quantity']).astype('int64')
+    df['updated_at'] = pd.to_numeric(df['updated_at']).astype('Int64')
+    return df
+
+
+def read_price_histories(directory: str = DEFAULT_DIRECTORY,
+                         start: Optional[str] = None,
+                         end: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads the backfilled price histories, only opening the partitions of
+    the dates between start and end (inclusive).
+
+    Parameters:
+        directory (str, optional): Directory of the store.
+        start (str, optional): First date, e.g. '2023-01-01'.
+        end (str, optional): Last date.
+
+    Returns:
+        pd.DataFrame: Rows of COLUMNS, ordered by date.
+    """
+    prefix = DATE_KEY + '='
+    dates = sorted(
+        name[len(prefix):] for name in os.listdir(directory)
+        if name.startswith(prefix)
+        and (start is None or name[len(prefix):] >= start)
+        and (end is None or name[len(prefix):] <= end)
+    ) if os.path.isdir(directory) else []
+    frames = []
+    for date in dates:
+        partition = os.path.join(directory, prefix + date)
+        for name in sorted(os.listdir(partition)):
+            df = pd.read_parquet(os.path.join(partition, name))
+            df.insert(1, DATE_KEY, date)
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+class PriceHistoryBackfill:
+    """
+    Pages through the CSGOSkins price histories into a columnar store on
+    disk, one parquet file per page and date under `date=YYYY-MM-DD/`
+    partitions, so reads of a date range only open those dates.
+
+    Pages are fetched by `workers` threads; every request draws from the
+    price histories RPM budget (see rate_limiter), which paces them. The
+    pages written so far are checkpointed after each one, so an interrupted
+    or partly failed run resumes where it stopped. A page is written before
+    it is checkpointed and rewriting it yields the same files, so a page
+    fetched twice around a crash is harmless.
+
+    Attributes:
+        fetch_page (Callable[[int], dict]): Fetches a page, e.g.
+            CSGOSkins.get_price_histories.
+        directory (str): Directory of the store and the checkpoint.
+        workers (int): Pages fetched concurrently.
+
+    Methods:
+        run(pages: Iterable[int] = None) -> Set[int]:
+            Fetches the missing pages, returns those that failed.
+        done() -> Set[int]:
+            Pages written so far.
+    """
+
+    def __init__(self, fetch_page: Callable[[int], Dict[str, Any]],
+                 directory: str = DEFAULT_DIRECTORY,
+                 workers: int = DEFAULT_WORKERS) -> None:
+        self.fetch_page = fetch_page
+        self.directory = directory
+        self.workers = workers
+        self.checkpoint_path = os.path.join(directory, CHECKPOINT_FILE)
+        self._lock = threading.Lock()
+        self._checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return {'last_page': None, 'done': set()}
+        checkpoint['done'] = set(checkpoint['done'])
+        return checkpoint
+
+    def _save_checkpoint(self) -> None:
+        # Written aside and renamed, so a crash never leaves a torn checkpoint
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'last_page': self._checkpoint['last_page'],
+                       'done': sorted(self._checkpoint['done'])}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def done(self) -> Set[int]:
+        with self._lock:
+            return set(self._checkpoint['done'])
+
+    def _write_page(self, page: int, data: Dict[str, Any]) -> int:
+        df = history_columns(data['data'])
+        for date, rows in df.groupby(DATE_KEY, sort=False):
+            partition = os.path.join(self.directory, f'{DATE_KEY}={date}')
+            os.makedirs(partition, exist_ok=True)
+            # A gappy index makes pyarrow probe object columns by label,
+            # which fails intermittently with concurrent writers
+            rows.drop(columns=DATE_KEY).reset_index(drop=True).to_parquet(
+                os.path.join(partition, f'page-{page:06d}.parquet'), index=False
+            )
+        with self._lock:
+            self._checkpoint['done'].add(page)
+            self._save_checkpoint()
+        return len(df)
+
+    def _fetch_and_write(self, page: int, data: Optional[Dict[str, Any]] = None) -> int:
+        if data is None:
+            data = self.fetch_page(page)
+        return self._write_page(page, data)
+
+    def run(self, pages: Optional[Iterable[int]] = None) -> Set[int]:
+        """
+        Fetches and writes every page not written yet. Without `pages`, the
+        first page is fetched (if the checkpoint doesn't know it yet) to
+        learn meta['last_page'].
+
+        Parameters:
+            pages (Iterable[int], optional): Pages to backfill. Defaults to
+                all of them.
+
+        Returns:
+            Set[int]: Pages that failed; run again to retry them.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        first = None
+        if pages is None:
+            if self._checkpoint['last_page'] is None:
+                first = self.fetch_page(1)
+                with self._lock:
+                    self._checkpoint['last_page'] = first['meta']['last_page']
+                    self._save_checkpoint()
+            pages = range(1, self._checkpoint['last_page'] + 1)
+        todo = sorted(set(pages) - self.done())
+
+        failed = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self._fetch_and_write, page,
+                                first if page == 1 else None): page
+                for page in todo
+            }
+            try:
+                for future in as_completed(futures):
+                    page = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Error occurred while backfilling price histories page {page}:", str(e))
+                        failed.add(page)
+            except KeyboardInterrupt:
+                # Pages written so far are checkpointed; resume with run()
+                executor.shutdown(wait=True, cancel_futures=True)
+                raise
+        print(f'Backfilled {len(todo) - len(failed)} of {len(todo)} pages, '
+              f'{len(failed)} failed')
+        return failed
+
+
+def regenerate_mapping(directory: str = DEFAULT_DIRECTORY,
+                       mapping_path: str = MAPPING_PATH,
+                       out_path: Optional[str] = None,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+    """
+    Recomputes the avg and std dev of every skin's index share in the
+    mapping from the backfilled price histories, keeping its quantities;
+    skins without enough history keep their previous stats. A
+    CSGOIndexEngine reading the written mapping picks it up on its next
+    update.
+
+    Parameters:
+        directory (str, optional): Directory of the store.
+        mapping_path (str, optional): Mapping providing the quantities.
+        out_path (str, optional): Where to write the new mapping. Defaults
+            to mapping_path.
+        start (str, optional): First date of the histories to use.
+        end (str, optional): Last date of the histories to use.
+
+    Returns:
+        pd.DataFrame: The new mapping.
+    """
+    mapping = pd.read_csv(mapping_path, index_col=0)
+    stats = index_share_stats(read_price_histories(directory, start, end), mapping)\
+        .set_index('market_hash_name')
+    for column in stats.columns:
+        mapping[column] = mapping['market_hash_name'].map(stats[column])\
+            .fillna(mapping[column])
+    mapping.to_csv(out_path or mapping_path)
+    return mapping
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='csgo_backfill', description='Backfill CSGOSkins price histories'
+    )
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help='Directory of the store')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Pages fetched concurrently')
+    parser.add_argument('--regenerate-mapping', action='store_true',
+                        help='Recompute the index share stats of the mapping afterwards')
+    return parser
+
+
+if __name__ == '__main__':
+    from apis.csgoskins import CSGOSkins
+    args = get_parser().parse_args(sys.argv[1:])
+    backfill = PriceHistoryBackfill(CSGOSkins().get_price_histories, args.dir, args.workers)
+    if not backfill.run() and args.regenerate_mapping:
+        regenerate_mapping(args.dir)
@@ -0,0 +1,233 @@
+import os
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from apis.share_solver import DEFAULT_MAX_PASSES, ShareSolution, solve_shares
+
+MAPPING_PATH = 'apis/csgo/csgo_mapping.csv'
+MARKET_HASH_NAME_KEY = 'market_hash_name'
+PRICE_KEY = 'price'
+QUANTITY_KEY = 'quantity'
+QUANTITY_MAP_KEY = 'mapped_quantity'
+LOWER_CAP_KEY = 'lower_cap_index_share'
+UPPER_CAP_KEY = 'upper_cap_index_share'
+
+
+def compute_caps(mapping: pd.DataFrame,
+                 k: float = None,
+                 upper_multiplier: float = None,
+                 lower_multiplier: float = None) -> pd.DataFrame:
+    """
+    Derives the caps for each skin in the mapping, either from k (the
+    caps narrow exponentially with the average share) or from fixed
+    multipliers of the standard deviation of the share.
+
+    Parameters:
+        mapping (pd.DataFrame): Skins with their quantity and the avg and
+            std dev of their index share.
+        k (float, optional): Decay of the cap width with the avg share.
+        upper_multiplier (float, optional): Multiplier of the upper cap.
+        lower_multiplier (float, optional): Multiplier of the lower cap.
+
+    Returns:
+        pd.DataFrame: Copy of the mapping, quantity renamed to
+            mapped_quantity, with caps added.
+    """
+    if (k is None) and (upper_multiplier is None or lower_multiplier is None):
+        raise ValueError('Must specify either k or upper/lower multipliers')
+    if (k is not None) and (upper_multiplier is not None or lower_multiplier is not None):
+        raise ValueError('Cannot specify both k and upper/lower multipliers')
+    mapping = mapping.rename(columns={QUANTITY_KEY: QUANTITY_MAP_KEY})
+    if k is not None:
+        mapping['multiplier'] = np.exp(-k*mapping['avg_index_share'])
+        upper_multiplier = lower_multiplier = mapping['multiplier']
+    mapping[UPPER_CAP_KEY] = (
+        mapping['avg_index_share'] + upper_multiplier * mapping['std_index_share']
+    )
+    lower_cap = mapping['avg_index_share'] - lower_multiplier * mapping['std_index_share']
+    mapping[LOWER_CAP_KEY] = np.where(lower_cap < 0, 0, lower_cap)
+    return mapping
+
+
+def index_share_stats(histories: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    """
+    Avg and std dev over dates of each mapped skin's index share, the
+    statistics compute_caps derives the caps from. On each date a skin's
+    index value is its lowest price times its mapping quantity, and its
+    share that value over the date's total.
+
+    Parameters:
+        histories (pd.DataFrame): Price histories with date,
+            market_hash_name and price columns, see csgo_backfill.
+        mapping (pd.DataFrame): Skins with their quantity.
+
+    Returns:
+        pd.DataFrame: market_hash_name, avg_index_share and
+            std_index_share of every skin with history; the std dev is nan
+            for skins with a single date.
+    """
+    quantities = mapping.set_index(MARKET_HASH_NAME_KEY)[QUANTITY_KEY]
+    prices = histories.groupby(['date', MARKET_HASH_NAME_KEY])[PRICE_KEY].min().reset_index()
+    prices = prices[prices[MARKET_HASH_NAME_KEY].isin(quantities.index)]
+    values = prices[PRICE_KEY] * prices[MARKET_HASH_NAME_KEY].map(quantities)
+    shares = values / values.groupby(prices['date']).transform('sum')
+    stats = shares.groupby(prices[MARKET_HASH_NAME_KEY]).agg(['mean', 'std'])
+    stats.columns = ['avg_index_share', 'std_index_share']
+    return stats.reset_index()
+
+
+class CSGOIndexEngine:
+    """
+    Stateful computation of the CSGO index over successive price snapshots.
+
+    The mapping is parsed and its caps derived once, and again only when
+    the mapping file's mtime changes. Each skin's contribution (price *
+    mapped quantity) is kept in an array aligned with the caps; a new
+    snapshot is diffed against the previous one and only the contributions
+    of skins whose price changed, appeared or disappeared are updated
+    before the shares are rebalanced. An unchanged snapshot reuses the last
+    index.
+
+    Attributes:
+        mapping_path (str): CSV of skins with their quantity and the avg
+            and std dev of their index share.
+        caps (pd.DataFrame): Mapping with caps, as of the last reload.
+        index (float): Last computed index, None before the first one.
+        solution (ShareSolution): Adjusted contributions of the last index,
+            aligned with the skins priced in the mapping.
+        reloads (int): Times the mapping was parsed.
+
+    Methods:
+        reload_if_changed() -> bool:
+            Re-parses the mapping if the file changed.
+        update(prices: Mapping[str, float]) -> int:
+            Applies a price snapshot, returns the number of changed skins.
+        update_df(df: pd.DataFrame) -> int:
+            Applies a price snapshot of aggregated prices.
+        compute() -> Optional[float]:
+            The index of the current prices.
+    """
+
+    def __init__(self, mapping_path: str = MAPPING_PATH,
+                 k: float = None,
+                 upper_multiplier: float = None,
+                 lower_multiplier: float = None,
+                 max_passes: int = DEFAULT_MAX_PASSES) -> None:
+        self.mapping_path = mapping_path
+        self.k = k
+        self.upper_multiplier = upper_multiplier
+        self.lower_multiplier = lower_multiplier
+        self.max_passes = max_passes
+        self.caps: Optional[pd.DataFrame] = None
+        self.index: Optional[float] = None
+        self.solution: Optional[ShareSolution] = None
+        self.reloads = 0
+        self._mtime: Optional[int] = None
+        self._positions: Dict[str, int] = {}
+        self._quantities = np.empty(0)
+        self._lower = np.empty(0)
+        self._upper = np.empty(0)
+        self._values = np.empty(0)      # price * mapped quantity, nan if unpriced
+        self._prices: Dict[str, float] = {}
+        self._dirty = True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Re-parses the mapping and re-derives the caps if the mapping file's
+        mtime changed since the last reload; contributions are rebuilt from
+        the last prices.
+
+        Returns:
+            bool: True if the mapping was reloaded.
+        """
+        mtime = os.stat(self.mapping_path).st_mtime_ns
+        if mtime == self._mtime:
+            return False
+        mapping = pd.read_csv(self.mapping_path, index_col=0)
+        caps = compute_caps(mapping, self.k, self.upper_multiplier, self.lower_multiplier)
+        self.caps = caps.reset_index(drop=True)
+        self._positions = {
+            name: i for i, name in enumerate(self.caps[MARKET_HASH_NAME_KEY])
+        }
+        self._quantities = self.caps[QUANTITY_MAP_KEY].to_numpy(dtype=np.float64)
+        self._lower = self.caps[LOWER_CAP_KEY].to_numpy(dtype=np.float64)
+        self._upper = self.caps[UPPER_CAP_KEY].to_numpy(dtype=np.float64)
+        self._values = np.full(len(self.caps), np.nan)
+        for name, price in self._prices.items():
+            self._set_price(name, price)
+        self._mtime = mtime
+        self._dirty = True
+        self.reloads += 1
+        return True
+
+    def _set_price(self, name: str, price: float) -> None:
+        i = self._positions.get(name)
+        if i is not None:
+            self._values[i] = price * self._quantities[i]
+
+    def update(self, prices: Mapping[str, float]) -> int:
+        """
+        Applies a snapshot of the prices of all skins. Skins missing from
+        the snapshot drop out of the index until they are priced again.
+
+        Parameters:
+            prices (Mapping[str, float]): Price by market_hash_name.
+
+        Returns:
+            int: Number of skins whose price changed, appeared or
+                disappeared.
+        """
+        self.reload_if_changed()
+        changed = 0
+        for name, price in prices.items():
+            if self._prices.get(name) != price:
+                self._prices[name] = price
+                self._set_price(name, price)
+                changed += 1
+        for name in self._prices.keys() - prices.keys():
+            del self._prices[name]
+            i = self._positions.get(name)
+            if i is not None:
+                self._values[i] = np.nan
+            changed += 1
+        if changed:
+            self._dirty = True
+        return changed
+
+    def update_df(self, df: pd.DataFrame) -> int:
+        """
+        Applies a snapshot of aggregated prices, see CSGOSkins.agg_data.
+
+        Parameters:
+            df (pd.DataFrame): One row per market_hash_name with its price.
+
+        Returns:
+            int: Number of skins whose price changed, see update.
+        """
+        return self.update(dict(zip(df[MARKET_HASH_NAME_KEY], df[PRICE_KEY])))
+
+    def compute(self) -> Optional[float]:
+        """
+        The index of the current prices: the sum of the contributions of
+        the priced skins in the mapping, with shares adjusted to their caps.
+        Only rebalanced if the prices or the mapping changed.
+
+        Returns:
+            Optional[float]: The index, None if no skin in the mapping is
+                priced.
+        """
+        self.reload_if_changed()
+        if not self._dirty:
+            return self.index
+        priced = ~np.isnan(self._values)
+        if priced.any():
+            self.solution = solve_shares(
+                self._values[priced], self._lower[priced], self._upper[priced],
+                max_passes=self.max_passes
+            )
+            self.index = self.solution.total
+        else:
+            self.solution = self.index = None
+        self._dirty = False
+        return self.index
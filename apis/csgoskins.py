@@ -1,16 +1,20 @@
+import functools
+import random
+
 import pandas as pd
 import numpy as np
-import requests
-try:
-    from apis.utils import get_api_key
-except ModuleNotFoundError:
-    from utils import get_api_key
-from pydantic import BaseModel, ValidationError
+from apis import csgo_index, sessions, utils
+from apis.rate_limiter import rate_limiter
+from apis.csgo_index import CSGOIndexEngine, compute_caps
+from apis.share_solver import solve_shares
+from apis.utils import get_api_key
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from typing import Dict, List, Optional
+from typing_extensions import TypedDict
 from web3 import Web3
-import json
 
 import prometheus_metrics
+from chain.reader import Call, ChainReader
 
 
 class CSGOSkinsPrice(BaseModel):
@@ -25,6 +29,42 @@ class CSGOSkinsPrices(BaseModel):
     prices: List[CSGOSkinsPrice]
 
 
+# Same schema as CSGOSkinsPrice(s), validated into plain dicts: coerced in
+# bulk by one compiled validator without building a model per item
+class CSGOSkinsPriceRecord(TypedDict):
+    market: str
+    price: int
+    quantity: int
+    updated_at: Optional[int]
+
+
+class CSGOSkinsPricesRecord(TypedDict):
+    market_hash_name: str
+    prices: List[CSGOSkinsPriceRecord]
+
+
+@functools.lru_cache(maxsize=None)
+def list_adapter(model) -> TypeAdapter:
+    """Compiled validator of a list of `model` items, built once per model."""
+    return TypeAdapter(List[model])
+
+
+def prices_columns(items: List[Dict]) -> Dict[str, list]:
+    """
+    Flattens validated prices items into columns, one row per market
+    listing, in the column order of
+    pd.json_normalize(items, record_path='prices', meta='market_hash_name').
+    """
+    rows = [
+        (price['market'], price['price'], price['quantity'],
+         price['updated_at'], item['market_hash_name'])
+        for item in items for price in item['prices']
+    ]
+    names = ['market', 'price', 'quantity', 'updated_at', 'market_hash_name']
+    columns = zip(*rows) if rows else [()] * len(names)
+    return {name: list(column) for name, column in zip(names, columns)}
+
+
 class CSGOSkinsPriceHistoryDate(BaseModel):
     date: str
     prices: List[CSGOSkinsPrice]
@@ -40,6 +80,16 @@ class CSGOSkinsPriceHistories(BaseModel):
     data: List[CSGOSkinsPriceHistory]
 
 
+class CSGOSkinsPriceHistoryDateRecord(TypedDict):
+    date: str
+    prices: List[CSGOSkinsPriceRecord]
+
+
+class CSGOSkinsPriceHistoryRecord(TypedDict):
+    market_hash_name: str
+    dates: List[CSGOSkinsPriceHistoryDateRecord]
+
+
 class CSGOSkins:
     """
     A class to interact with the CSGOSkins API to fetch and process skin
@@ -55,23 +105,33 @@ class CSGOSkins:
         The API key to authenticate with the CSGOSkins API.
     """
     API_PREFIX = 'CSGO'
+    SOURCE = 'csgoskins'
     PRICES_ENDPOINT = 'api/v1/prices'
     PRICE_HISTORIES_ENDPOINT = 'api/v1/price-histories'
     PRICE_HISTORIES_RPM = 20
     DEFAULT_BASE_URL = 'https://csgoskins.gg/'
-    MAPPING_PATH = 'apis/csgo/csgo_mapping.csv'
+    MAPPING_PATH = csgo_index.MAPPING_PATH
     DEFAULT_RANGE = 'current'
     DEFAULT_AGG = 'max'
     AUTH_TYPE = 'Bearer'
     CONTENT_TYPE = 'application/json'
     RANGE_KEY = "range"
+    PAGE_KEY = 'page'
+    META_KEY = 'meta'
+    LAST_PAGE_KEY = 'last_page'
     AGGREGATOR_KEY = "aggregator"
     DATA_KEY = 'data'
     PRICES_KEY = 'prices'
-    PRICE_KEY = 'price'
-    QUANTITY_KEY = 'quantity'
-    QUANTITY_MAP_KEY = 'mapped_quantity'
-    MARKET_HASH_NAME_KEY = 'market_hash_name'
+    # shared with the index engine, see apis.csgo_index
+    PRICE_KEY = csgo_index.PRICE_KEY
+    QUANTITY_KEY = csgo_index.QUANTITY_KEY
+    QUANTITY_MAP_KEY = csgo_index.QUANTITY_MAP_KEY
+    MARKET_HASH_NAME_KEY = csgo_index.MARKET_HASH_NAME_KEY
+    # 'full' validates every item; 'sample' only a random sample of
+    # VALIDATION_SAMPLE_SIZE items, for payloads from a trusted source
+    VALIDATION_FULL = 'full'
+    VALIDATION_SAMPLE = 'sample'
+    VALIDATION_SAMPLE_SIZE = 500
     AUTHORIZATION_KEY = 'Authorization'
     CONTENT_TYPE_KEY = 'Content-Type'
     GOERLI_URL = 'https://goerli.infura.io/v3/'
@@ -79,7 +139,7 @@ class CSGOSkins:
     CONTRACT_ADD_FILE = 'apis/csgo/contract_address.txt'
     ABI_FILE = 'apis/csgo/abi.json'
 
-    def __init__(self, base_url=DEFAULT_BASE_URL):
+    def __init__(self, base_url=DEFAULT_BASE_URL, validation=VALIDATION_FULL):
         """
         Initializes the CSGOSkins class with the base URL and API key.
 
@@ -89,22 +149,57 @@ class CSGOSkins:
             The base URL for the CSGOSkins API.
         api_key : str
             The API key to authenticate with the CSGOSkins API.
+        validation : str, optional
+            VALIDATION_FULL (default) or VALIDATION_SAMPLE, see
+            validate_api_data.
         """
+        if validation not in (self.VALIDATION_FULL, self.VALIDATION_SAMPLE):
+            raise ValueError(f'Unknown validation mode: {validation}')
         self.base_url = base_url
+        self.validation = validation
         self.api_key = get_api_key(self.API_PREFIX)
         self.infura_key = get_api_key(self.INFURA_PREFIX)
         self.headers = {
             self.AUTHORIZATION_KEY: f"{self.AUTH_TYPE} {self.api_key}",
             self.CONTENT_TYPE_KEY: self.CONTENT_TYPE
         }
-        # Init web3
+        # Init web3; contract and chain reads are cached by the reader
         self.w3 = Web3(Web3.HTTPProvider(self.GOERLI_URL + self.infura_key))
+        self.chain = ChainReader(self.w3)
+        self.last_share_solution = None     # set by adjust_share
+        self.index_engine = None            # created by update_index
+
+    def validate_api_data(self, model, data):
+        """
+        Validate data pulled from external API using Pydantic, in one pass
+        of a compiled validator over the whole list. In VALIDATION_SAMPLE
+        mode only a random sample of VALIDATION_SAMPLE_SIZE items is
+        validated and the rest is trusted as is: the items are returned
+        as pulled, not coerced, so numbers may still be strings (see
+        get_prices_df and csgo_backfill.history_columns).
+
+        Parameters:
+        ----------
+        model : type
+            Pydantic model or TypedDict of an item.
+        data : list
+            Items pulled from the API.
 
-    def validate_api_data(self, model: BaseModel, data):
-        """Validate data pulled from external API using Pydantic."""
+        Returns:
+        -------
+        list
+            The validated (coerced) items, or the uncoerced input items if
+            sampled.
+        """
+        sampled = (self.validation == self.VALIDATION_SAMPLE
+                   and len(data) > self.VALIDATION_SAMPLE_SIZE)
         try:
-            for item in data:
-                model(**item)
+            if sampled:
+                list_adapter(model).validate_python(
+                    random.sample(data, self.VALIDATION_SAMPLE_SIZE)
+                )
+                return data
+            return list_adapter(model).validate_python(data)
         except ValidationError as e:
             raise Exception(
                 f"Data pulled from {self.base_url} does not match "
@@ -126,17 +221,80 @@ class CSGOSkins:
         Returns:
         -------
         dict
-            A dictionary containing the fetched data from the API.
+            A dictionary containing the fetched data from the API, its
+            'data' items validated, see validate_api_data.
         """
         url = self.base_url + self.PRICES_ENDPOINT
         payload = {
             self.RANGE_KEY: range,
             self.AGGREGATOR_KEY: agg
         }
-        response = requests.request('GET', url,
+        response = sessions.request('GET', url, source=self.SOURCE,
                                     headers=self.headers, json=payload)
         data = response.json()
-        self.validate_api_data(CSGOSkinsPrices, data["data"])
+        data[self.DATA_KEY] = self.validate_api_data(
+            CSGOSkinsPricesRecord, data[self.DATA_KEY]
+        )
+        return data
+
+    def iter_prices(self, range=DEFAULT_RANGE, agg=DEFAULT_AGG):
+        """
+        Iterates the unvalidated items of the current prices of CSGO skins
+        as they are read from the socket, see utils.iter_json, decoding
+        nothing but the 'data' list.
+
+        Parameters:
+        ----------
+        range : str, optional
+            The range of prices to fetch. Default is 'current'.
+        agg : str, optional
+            The aggregation method to use. Default is 'max'.
+
+        Returns:
+        -------
+        Iterator[dict]
+            The items of the response's 'data' list.
+        """
+        url = self.base_url + self.PRICES_ENDPOINT
+        payload = {
+            self.RANGE_KEY: range,
+            self.AGGREGATOR_KEY: agg
+        }
+        response = sessions.request('GET', url, source=self.SOURCE,
+                                    headers=self.headers, json=payload,
+                                    stream=True)
+        return utils.iter_json(
+            response, (self.DATA_KEY,),
+            fields=(self.MARKET_HASH_NAME_KEY, self.PRICES_KEY)
+        )
+
+    def get_price_histories(self, page=1, **params):
+        """
+        Fetches one page of the price histories of CSGO skins from the API,
+        drawing from the PRICE_HISTORIES_RPM budget.
+
+        Parameters:
+        ----------
+        page : int, optional
+            The page to fetch, from 1 to meta['last_page'].
+        **params
+            Further request parameters, e.g. a date range.
+
+        Returns:
+        -------
+        dict
+            The page, with 'meta' and validated 'data' items, see
+            validate_api_data (sampled items are not coerced, see
+            csgo_backfill.history_columns).
+        """
+        url = self.base_url + self.PRICE_HISTORIES_ENDPOINT
+        payload = {self.PAGE_KEY: page, **params}
+        response = sessions.request('GET', url, source=self.SOURCE,
+                                    headers=self.headers, json=payload)
+        data = response.json()
+        data[self.DATA_KEY] = self.validate_api_data(
+            CSGOSkinsPriceHistoryRecord, data[self.DATA_KEY]
+        )
         return data
 
     def get_prices_df(self, range=DEFAULT_RANGE, agg=DEFAULT_AGG):
@@ -157,12 +315,15 @@ class CSGOSkins:
         pd.DataFrame
             A DataFrame containing the fetched data from the API.
         """
-        data = self.get_prices()
-        df = pd.json_normalize(
-            data[self.DATA_KEY],
-            record_path=self.PRICES_KEY,
-            meta=self.MARKET_HASH_NAME_KEY
+        items = self.validate_api_data(
+            CSGOSkinsPricesRecord, list(self.iter_prices(range, agg))
         )
+        # Built straight from the validated items, not parsed again
+        df = pd.DataFrame(prices_columns(items))
+        if self.validation == self.VALIDATION_SAMPLE:
+            # sampled items were not coerced by the validator
+            for key in (self.PRICE_KEY, self.QUANTITY_KEY):
+                df[key] = pd.to_numeric(df[key])
         df[self.PRICE_KEY] = df[self.PRICE_KEY]/100
         return df
 
@@ -181,17 +342,16 @@ class CSGOSkins:
         pd.DataFrame
             A DataFrame containing the aggregated data.
         """
-        df = df.groupby(self.MARKET_HASH_NAME_KEY)[self.PRICE_KEY, self.QUANTITY_KEY]\
+        df = df.groupby(self.MARKET_HASH_NAME_KEY)[[self.PRICE_KEY, self.QUANTITY_KEY]]\
             .agg(price=pd.NamedAgg(column=self.PRICE_KEY, aggfunc='min'),
                  quantity=pd.NamedAgg(column=self.QUANTITY_KEY, aggfunc='sum'))\
             .reset_index()
-        for row in df.to_dict('records'):
-            prometheus_metrics.csgo_price_gauge.labels(
-                market_hash_name=row['market_hash_name']).set(row['price'])
+        # Exported per skin when scraped, nothing to do per row here
+        prometheus_metrics.csgo_price_collector.set_frame(df)
         return df
 
     def get_caps(self,
-                 mapping: pd.DataFrame,
+                 mapping: pd.DataFrame = None,
                  k: float = None,
                  upper_multiplier: float = None,
                  lower_multiplier: float = None):
@@ -200,9 +360,9 @@ class CSGOSkins:
 
         Parameters:
         ----------
-        mapping : pd.DataFrame
+        mapping : pd.DataFrame, optional
             The input DataFrame containing skins and their avg and std dev of
-            index share.
+            index share. Read from MAPPING_PATH if not given.
         upper_multiplier : float
             The multiplier to use for the upper cap.
         lower_multiplier : float
@@ -213,78 +373,38 @@ class CSGOSkins:
         pd.DataFrame
             Input dataframe with caps added.
         """
-        # Get caps for each skin
-        mapping = pd.read_csv(self.MAPPING_PATH, index_col=0)
-        mapping = mapping.rename(columns={self.QUANTITY_KEY: self.QUANTITY_MAP_KEY})
-        if (k is None) and (upper_multiplier is None and lower_multiplier is None):
-            raise ValueError('Must specify either k or upper/lower multipliers')
-        if (k is not None) and (upper_multiplier is not None or lower_multiplier is not None):
-            raise ValueError('Cannot specify both k and upper/lower multipliers')
-        if (upper_multiplier is not None and lower_multiplier is None):
-            mapping['upper_cap_index_share'] = (
-                mapping['avg_index_share']
-                + upper_multiplier * mapping['std_index_share']
-            )
-            mapping['lower_cap_index_share'] = np.where(
-                mapping['avg_index_share'] - lower_multiplier * mapping['std_index_share'] > 0,
-                mapping['avg_index_share'] - lower_multiplier * mapping['std_index_share'],
-                0
-            )
-        elif k is not None:
-            mapping['multiplier'] = np.exp(-k*mapping['avg_index_share'])
-            mapping['upper_cap_index_share'] = mapping['avg_index_share'] + mapping['multiplier']*mapping['std_index_share']
-            mapping['lower_cap_index_share'] = mapping['avg_index_share'] - mapping['multiplier']*mapping['std_index_share']
-            mapping['lower_cap_index_share'] = np.where(mapping['lower_cap_index_share'] < 0, 0, mapping['lower_cap_index_share'])
-        return mapping
+        if mapping is None:
+            mapping = pd.read_csv(self.MAPPING_PATH, index_col=0)
+        return compute_caps(mapping, k, upper_multiplier, lower_multiplier)
 
     def adjust_share(self, df, max_iter):
-        # Initialize
-        df['mean_cap_index_share'] = (df['lower_cap_index_share'] + df['upper_cap_index_share']) / 2
-        elements = df.iloc[:, 0].tolist()
-        min_percentages = df.loc[:, 'lower_cap_index_share'].tolist()
-        max_percentages = df.loc[:, 'upper_cap_index_share'].tolist()
-        mean_percentages = df.loc[:, 'mean_cap_index_share'].tolist()
-        max_iterations = max_iter  # setting a limit to prevent infinite loops
-        iterations = 0
-
-        while iterations < max_iterations:
-            # Calculate total sum
-            sum_elements = sum(elements)
-            # Calculate deviations
-            deviations = []
-            for i, num in enumerate(elements):
-                current_percentage = num / sum_elements
-                if current_percentage < min_percentages[i]:
-                    deviation = current_percentage - min_percentages[i]
-                elif current_percentage > max_percentages[i]:
-                    deviation = current_percentage - max_percentages[i]
-                else:
-                    deviation = 0
-                deviations.append(deviation)
-
-            # Check if all deviations are zero (all elements within their acceptable ranges)
-            if all(d == 0 for d in deviations):
-                break
-
-            # Sort by deviation
-            sorted_indices = sorted(range(len(deviations)), key=lambda k: abs(deviations[k]), reverse=True)
-
-            # Adjust the Most Deviating Element
-            most_deviating_index = sorted_indices[0]
-            if deviations[most_deviating_index] < 0:
-                # Below the acceptable range
-                target_value = min_percentages[most_deviating_index] * sum_elements
-            else:
-                # Above the acceptable range
-                target_value = max_percentages[most_deviating_index] * sum_elements
-
-            # Update the value in elements list
-            elements[most_deviating_index] = target_value
-
-            iterations += 1
+        """
+        Adjusts the index values (first column) so each skin's share of the
+        index lies within its lower and upper cap.
+
+        Parameters:
+        ----------
+        df : pd.DataFrame
+            Index values followed by 'lower_cap_index_share' and
+            'upper_cap_index_share' columns.
+        max_iter : int
+            Bound on the greedy passes, see share_solver.solve_shares.
+
+        Returns:
+        -------
+        pd.DataFrame
+            The input DataFrame with adjusted index values.
+        """
+        solution = solve_shares(
+            df.iloc[:, 0].to_numpy(),
+            df['lower_cap_index_share'].to_numpy(),
+            df['upper_cap_index_share'].to_numpy(),
+            max_passes=max_iter
+        )
+        self.last_share_solution = solution
 
         # Update the DataFrame
-        df.iloc[:, 0] = elements
+        df.iloc[:, 0] = solution.values
 
         return df
 
@@ -300,18 +420,13 @@ class CSGOSkins:
         float
             The capped index.
         '''
-        # Read answer from chainlink contract using web3py
-        # Get contract address from file
-        with open(self.CONTRACT_ADD_FILE) as f:
-            contract_address = f.read()
-        # Read contract abi from file
-        with open(self.ABI_FILE) as f:
-            abi = json.load(f)
-        # Init contract
-        contract = self.w3.eth.contract(address=contract_address, abi=abi)
-        # Get answer
-        prev_index = contract.functions.latestAnswer().call()
-        decimals = contract.functions.decimals().call()
+        # Read answer from chainlink contract (address and abi files are
+        # read once; decimals once, the answer once per block)
+        contract = self.chain.contract_from_files(self.CONTRACT_ADD_FILE, self.ABI_FILE)
+        prev_index, decimals = self.chain.read_many([
+            Call(contract, 'latestAnswer'),
+            Call(contract, 'decimals', immutable=True),
+        ])
         prev_index = prev_index / 10**decimals
         # If prev_index more/less by 5% of index, cap current index at 5% move
         if index < prev_index * 0.95:
@@ -320,7 +435,23 @@ class CSGOSkins:
             index = prev_index * 1.05
         return index
 
-    def get_index(self, df, caps):
+    def get_index(self, df, caps, cap_to_prev=False):
+        '''
+        Computes the index of the aggregated prices.
+        Parameters:
+        ----------
+        df : pd.DataFrame
+            Aggregated prices, see agg_data.
+        caps : pd.DataFrame
+            Index share caps, see get_caps.
+        cap_to_prev : bool, optional
+            Cap the index to within 5% of the one on chain, see
+            cap_compared_to_prev.
+        Returns:
+        -------
+        float
+            The index.
+        '''
         # Get caps
         df = df.merge(caps, on=self.MARKET_HASH_NAME_KEY, how='inner')
         df['index'] = df[self.PRICE_KEY] * df[self.QUANTITY_MAP_KEY]
@@ -329,19 +460,53 @@ class CSGOSkins:
             max_iter=1000
         )
         index = adjusted_df['index'].sum()
-        # index = self.cap_compared_to_prev(index)
+        if cap_to_prev:
+            index = self.cap_compared_to_prev(index)
 
         # Set prometheus metric to index
         print(f'Set prometheus metric to index {index}')
         prometheus_metrics.csgo_index_gauge.set(index)
         return index
 
+    def update_index(self, df, k: float = 100):
+        """
+        Incremental alternative to get_caps and get_index for repeated
+        updates: the mapping is parsed once (again when it changes) and only
+        the contributions of skins whose price changed are recomputed, see
+        CSGOIndexEngine.
+
+        Parameters:
+        ----------
+        df : pd.DataFrame
+            Aggregated prices, see agg_data.
+        k : float
+            Decay of the cap width, used when the engine is created.
+
+        Returns:
+        -------
+        float
+            The index.
+        """
+        if self.index_engine is None:
+            self.index_engine = CSGOIndexEngine(self.MAPPING_PATH, k=k)
+        self.index_engine.update_df(df)
+        index = self.index_engine.compute()
+        if index is not None:
+            prometheus_metrics.csgo_index_gauge.set(index)
+        return index
+
+
+# Enforce the documented price histories budget on top of the provider's
+rate_limiter.configure(
+    CSGOSkins.SOURCE, CSGOSkins.PRICE_HISTORIES_RPM,
+    endpoint=CSGOSkins.PRICE_HISTORIES_ENDPOINT
+)
+
 
 if __name__ == '__main__':
     csgo = CSGOSkins()
-    data = csgo.get_prices()
     df = csgo.get_prices_df()
     df = csgo.agg_data(df)
-    caps = csgo.get_caps(df, k=100)
+    caps = csgo.get_caps(k=100)
     index = csgo.get_index(df, caps)
     print('index: ', index)
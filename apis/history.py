@@ -0,0 +1,208 @@
+import argparse
+import sqlite3
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+from apis import storage
+
+
+class MarketCapHistory:
+    """
+    Read API over the market cap database written by `storage.MarketCapStore`.
+    Every query is answered from an index (see storage.SCHEMA), so it stays
+    fast as the history grows.
+
+    Attributes:
+        db_path (str): Path to the SQLite database.
+
+    Methods:
+        sources() -> List[str]:
+            Names of all sources with stored snapshots.
+        latest_snapshot(source: str) -> List[Dict[str, Any]]:
+            Latest snapshot of a source.
+        latest_snapshots() -> Dict[str, List[Dict[str, Any]]]:
+            Latest snapshot of every source.
+        market_cap_between(name: str, t0: float, t1: float, source: str = None):
+            Market caps of a coin between two times.
+        top_n_at(n: int, t: float, source: str) -> List[Dict[str, Any]]:
+            Top N coins of the source's snapshot at time t.
+    """
+
+    def __init__(self, db_path: str = storage.DEFAULT_DB_PATH) -> None:
+        """
+        Opens a read connection, creating or migrating the schema first.
+
+        Parameters:
+            db_path (str, optional): Path to the SQLite database.
+                Defaults to 'data.db'.
+        """
+        self.db_path = db_path
+        storage.get_market_cap_store(db_path)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _rows(self, query: str, params=()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._conn.execute(query, params)]
+
+    def sources(self) -> List[str]:
+        """
+        Names of all sources with stored snapshots.
+        """
+        return [row['name'] for row in self._rows(
+            "SELECT name FROM sources ORDER BY name"
+        )]
+
+    def _snapshot_at(self, source: str, t: Optional[float] = None) -> Optional[sqlite3.Row]:
+        query = (
+            "SELECT snapshots.id, snapshots.load_time FROM snapshots "
+            "JOIN sources ON sources.id = snapshots.source_id "
+            "WHERE sources.name = ?"
+        )
+        params = [source]
+        if t is not None:
+            query += " AND snapshots.load_time <= ?"
+            params.append(t)
+        query += " ORDER BY snapshots.load_time DESC, snapshots.id DESC LIMIT 1"
+        return self._conn.execute(query, params).fetchone()
+
+    def _snapshot_rows(self, snapshot_id: int, limit: int = -1) -> List[Dict[str, Any]]:
+        return self._rows(
+            "SELECT coins.name, market_caps.market_cap, "
+            "market_caps.last_updated_time, market_caps.load_time "
+            "FROM market_caps JOIN coins ON coins.id = market_caps.coin_id "
+            "WHERE market_caps.snapshot_id = ? "
+            "ORDER BY market_caps.market_cap DESC LIMIT ?",
+            (snapshot_id, limit)
+        )
+
+    def latest_snapshot(self, source: str) -> List[Dict[str, Any]]:
+        """
+        Latest snapshot of a source, sorted by market cap.
+
+        Parameters:
+            source (str): Source name.
+
+        Returns:
+            List[Dict[str, Any]]:
+                Rows with name, market_cap, last_updated_time and load_time;
+                empty if the source has no snapshots.
+        """
+        snapshot = self._snapshot_at(source)
+        return self._snapshot_rows(snapshot['id']) if snapshot else []
+
+    def latest_snapshots(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Latest snapshot of every source.
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Snapshots keyed by source.
+        """
+        return {source: self.latest_snapshot(source) for source in self.sources()}
+
+    def market_cap_between(self, name: str, t0: float, t1: float,
+                           source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Market caps of a coin fetched between two times (inclusive).
+
+        Parameters:
+            name (str): Coin name, e.g. 'Bitcoin'.
+            t0 (float): Start unix time.
+            t1 (float): End unix time.
+            source (str, optional): Only this source. Defaults to all.
+
+        Returns:
+            List[Dict[str, Any]]:
+                Rows with load_time, source and market_cap, by load time.
+        """
+        query = (
+            "SELECT market_caps.load_time, sources.name AS source, "
+            "market_caps.market_cap "
+            "FROM market_caps "
+            "JOIN snapshots ON snapshots.id = market_caps.snapshot_id "
+            "JOIN sources ON sources.id = snapshots.source_id "
+            "WHERE market_caps.coin_id = (SELECT id FROM coins WHERE name = ?) "
+            "AND market_caps.load_time BETWEEN ? AND ?"
+        )
+        params = [name, t0, t1]
+        if source is not None:
+            query += " AND sources.name = ?"
+            params.append(source)
+        query += " ORDER BY market_caps.load_time"
+        return self._rows(query, params)
+
+    def top_n_at(self, n: int, t: Optional[float], source: str) -> List[Dict[str, Any]]:
+        """
+        Top N coins by market cap in the source's latest snapshot at time t.
+
+        Parameters:
+            n (int): Number of coins.
+            t (float): Unix time, or None for the latest snapshot.
+            source (str): Source name.
+
+        Returns:
+            List[Dict[str, Any]]:
+                Rows with name, market_cap, last_updated_time and load_time;
+                empty if the source has no snapshot before t.
+        """
+        snapshot = self._snapshot_at(source, t)
+        return self._snapshot_rows(snapshot['id'], n) if snapshot else []
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Parser of the history CLI, shared by `python -m apis.history` and the
+    siwa `history` command.
+    """
+    parser = argparse.ArgumentParser(
+        prog='history', description='Query stored market cap history'
+    )
+    parser.add_argument('--db', default=storage.DEFAULT_DB_PATH,
+                        help='Path to the SQLite database')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    latest = commands.add_parser('latest', help='Latest snapshot per source')
+    latest.add_argument('--source', help='Only this source')
+
+    between = commands.add_parser('between', help='Market cap of a coin between t0 and t1')
+    between.add_argument('name', help='Coin name, e.g. Bitcoin')
+    between.add_argument('t0', type=float, help='Start unix time')
+    between.add_argument('t1', type=float, help='End unix time')
+    between.add_argument('--source', help='Only this source')
+
+    top = commands.add_parser('top', help='Top N coins of a source at time t')
+    top.add_argument('n', type=int, help='Number of coins')
+    top.add_argument('source', help='Source name')
+    top.add_argument('--at', type=float, default=None,
+                     help='Unix time (defaults to the latest snapshot)')
+    return parser
+
+
+def run_command(args: argparse.Namespace, output: Callable[[str], None] = print) -> None:
+    """
+    Runs a parsed history command and writes its rows to `output`.
+    """
+    history = MarketCapHistory(args.db)
+    try:
+        if args.command == 'latest':
+            sources = [args.source] if args.source else history.sources()
+            for source in sources:
+                rows = history.latest_snapshot(source)
+                output(f'{source}: {len(rows)} coins')
+                for row in rows:
+                    output(f"  {row['name']}: {row['market_cap']}")
+        elif args.command == 'between':
+            for row in history.market_cap_between(args.name, args.t0, args.t1, args.source):
+                output(f"{row['load_time']} {row['source']}: {row['market_cap']}")
+        elif args.command == 'top':
+            rows = history.top_n_at(args.n, args.at, args.source)
+            for rank, row in enumerate(rows, start=1):
+                output(f"{rank}. {row['name']}: {row['market_cap']}")
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    run_command(get_parser().parse_args(sys.argv[1:]))
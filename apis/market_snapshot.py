@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple, Type
+
+import numpy as np
+
+from apis import async_crypto_api
+from apis.crypto_api import (
+    CryptoAPI, MarketCapSnapshot, fetch_mcap_by_rank_from_sources, join_market_caps
+)
+
+# Seconds a snapshot is reused for; shorter than the heartbeat of the feeds
+# sharing it, so they share one fetch per tick.
+MAX_AGE = 60
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """
+    Immutable top-N market caps of every source that answered in one fetch.
+
+    Attributes:
+        N (int): Number of coins requested from each source.
+        fetched_at (float): Unix time of the fetch.
+        sources (Mapping[str, MarketCapSnapshot]): Top N of each source,
+            largest first, keyed by source name.
+    """
+    N: int
+    fetched_at: float
+    sources: Mapping[str, MarketCapSnapshot]
+
+    def totals(self, N: int) -> Dict[str, float]:
+        """
+        Sum of the N largest market caps of each source.
+
+        Parameters:
+            N (int): Number of coins, at most the snapshot's N.
+
+        Returns:
+            Dict[str, float]: Totals keyed by source name.
+        """
+        if N > self.N:
+            raise ValueError(f'Snapshot has the top {self.N} coins, not {N}')
+        return {source: snapshot.total(N) for source, snapshot in self.sources.items()}
+
+    def join(self, N: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Market caps of the top N coins of the sources, aligned by coin name.
+
+        Parameters:
+            N (int): Number of coins of each source, at most the snapshot's N.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray]:
+                The source names, the coin names, and a (coins x sources)
+                matrix of market caps, NaN where a source's top N lacks the
+                coin. See `join_market_caps`.
+        """
+        if N > self.N:
+            raise ValueError(f'Snapshot has the top {self.N} coins, not {N}')
+        sources = sorted(self.sources)
+        return (sources,) + join_market_caps([self.sources[source].top(N)
+                                              for source in sources])
+
+
+class MarketSnapshotService:
+    """
+    Fetches the top market caps from several sources for any number of
+    index feeds: the first feed needing a snapshot on a tick fetches the
+    largest N registered from each source, the others reuse it.
+
+    Attributes:
+        sources (List[Type[CryptoAPI]]): CryptoAPI subclasses to query.
+        async_sources (List[Type[CryptoAPI]]): Their asyncio clients (see
+            apis.async_crypto_api), queried by get_async.
+        deadline (float): Seconds to wait for the sources on each fetch.
+        max_age (float): Seconds a snapshot is reused for.
+        fetches (int): Number of fetches made.
+
+    Methods:
+        register(N: int):
+            Declares that a feed needs the top N coins.
+        get(N: int) -> MarketSnapshot:
+            A snapshot of at least the top N coins, fetched if needed.
+        get_async(N: int) -> MarketSnapshot:
+            Same as get, fetching with the asyncio clients.
+    """
+
+    def __init__(self, sources: List[Type[CryptoAPI]],
+                 deadline: Optional[float] = None, max_age: float = MAX_AGE,
+                 async_sources: Optional[List[Type[CryptoAPI]]] = None) -> None:
+        self.sources = sources
+        self.async_sources = async_sources or []
+        self.deadline = deadline
+        self.max_age = max_age
+        self.fetches = 0
+        self._N = 0
+        self._snapshot: Optional[MarketSnapshot] = None
+        # guards the snapshot and the fetches, not held while fetching
+        self._lock = threading.Lock()
+        self._fetches: Dict[int, Future] = {}   # fetches in progress by N
+        self._fetch_task: Optional[asyncio.Task] = None
+        self._fetch_task_N = 0
+
+    @property
+    def snapshot(self) -> Optional[MarketSnapshot]:
+        """
+        The latest snapshot, if any.
+        """
+        return self._snapshot
+
+    def register(self, N: int) -> None:
+        """
+        Declares that a feed needs the top N coins, so every fetch covers
+        it. Feeds register when they start, before their first tick.
+        """
+        with self._lock:
+            self._N = max(self._N, N)
+
+    def _is_fresh(self, snapshot: Optional[MarketSnapshot], N: int) -> bool:
+        return (snapshot is not None and snapshot.N >= N
+                and time.time() - snapshot.fetched_at < self.max_age)
+
+    def get(self, N: int) -> MarketSnapshot:
+        """
+        Returns a snapshot of at least the top N coins: the latest one if
+        fresh enough, else a new one. Concurrent callers wait for a single
+        fetch covering their N; a caller needing more coins than the fetches
+        in progress starts its own.
+
+        Parameters:
+            N (int): Number of coins needed.
+
+        Returns:
+            MarketSnapshot: The snapshot; sources that failed or missed the
+                deadline are left out.
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, N):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot, N):
+                return snapshot
+            fetch = next((future for fetch_N, future in self._fetches.items()
+                          if fetch_N >= N), None)
+            if fetch is None:
+                self._N = max(self._N, N)
+                fetch_N = self._N
+                fetch = self._fetches[fetch_N] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return fetch.result()
+
+        try:
+            source_data = fetch_mcap_by_rank_from_sources(
+                self.sources, fetch_N, deadline=self.deadline)
+            with self._lock:
+                snapshot = self._publish(fetch_N, source_data)
+        except BaseException as e:
+            fetch.set_exception(e)
+            raise
+        else:
+            fetch.set_result(snapshot)
+            return snapshot
+        finally:
+            with self._lock:
+                del self._fetches[fetch_N]
+
+    async def get_async(self, N: int) -> MarketSnapshot:
+        """
+        Same as get, but fetching with the asyncio clients on the running
+        event loop; concurrent callers await a single fetch.
+
+        Parameters:
+            N (int): Number of coins needed.
+
+        Returns:
+            MarketSnapshot: The snapshot; sources that failed or missed the
+                deadline are left out.
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, N):
+            return snapshot
+        task = self._fetch_task
+        if (task is None or task.done() or self._fetch_task_N < N
+                or task.get_loop() is not asyncio.get_running_loop()):
+            self.register(N)
+            self._fetch_task_N = self._N
+            task = self._fetch_task = asyncio.ensure_future(self._fetch_async(self._N))
+        # a cancelled caller must not cancel the fetch the others await
+        return await asyncio.shield(task)
+
+    async def _fetch_async(self, N: int) -> MarketSnapshot:
+        source_data = await async_crypto_api.fetch_mcap_by_rank_from_sources(
+            self.async_sources, N, deadline=self.deadline)
+        with self._lock:
+            return self._publish(N, source_data)
+
+    def _publish(self, N: int, source_data: Dict[str, MarketCapSnapshot]) -> MarketSnapshot:
+        #called with self._lock held
+        snapshot = MarketSnapshot(
+            N, time.time(), MappingProxyType({
+                source: market_data.top(N)
+                for source, market_data in source_data.items()
+            })
+        )
+        #a larger fetch that finished first is kept while fresh
+        latest = self._snapshot
+        if latest is None or latest.N <= N or not self._is_fresh(latest, N):
+            self._snapshot = snapshot
+        self.fetches += 1
+        return snapshot
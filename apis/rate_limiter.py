@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Requests per minute and burst size per provider; endpoint-specific budgets
+# (keyed by URL path) are drawn from on top of the provider's budget.
+# Sources: provider docs for the free/basic plans we use.
+DEFAULT_BUDGETS: Dict[str, Dict[Optional[str], Tuple[float, float]]] = {
+    'coingecko': {None: (30, 5)},
+    # Basic plan: 30 calls/min. A full bucket plus a minute of refill stays
+    # within it, and the burst covers the up to 10 quotes/latest batches
+    # (QUOTES_BATCH_SIZE ids each) of a 1000 id list without pacing them.
+    'coinmarketcap': {None: (20, 10)},
+    'cryptocompare': {None: (300, 20)},
+    'coinpaprika': {None: (600, 10)},
+    'unisat': {None: (300, 5)},
+    'csgoskins': {None: (60, 5)},
+}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to
+    `capacity`. Callers reserve tokens ahead of time, so concurrent callers
+    are queued fairly and never exceed the budget.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): Maximum number of stored tokens (burst size).
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.acquired = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes `tokens` from the bucket, possibly into debt.
+
+        Parameters:
+            tokens (float, optional): Number of tokens to take. Defaults to 1.
+
+        Returns:
+            float: Seconds to wait before the tokens may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= tokens
+            wait = max(0.0, -self.tokens / self.rate)
+            self.acquired += 1
+            self.waited += wait
+            return wait
+
+
+class RateLimiter:
+    """
+    Process-wide registry of token buckets: one per provider plus optional
+    ones per provider endpoint. A call waits until both its provider's and
+    its endpoint's budget allow it, and no longer.
+
+    Methods:
+        configure(provider: str, per_minute: float, burst: float = 1, endpoint: str = None):
+            Sets the budget of a provider or one of its endpoints.
+        acquire(provider: str, endpoint: str = None):
+            Blocks until a call is allowed.
+        acquire_async(provider: str, endpoint: str = None):
+            Awaits until a call is allowed.
+        get_stats() -> Dict[str, Dict[str, float]]:
+            Calls made and seconds waited per bucket.
+    """
+
+    def __init__(self, budgets: Dict[str, Dict[Optional[str], Tuple[float, float]]] = None) -> None:
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._lock = threading.Lock()
+        for provider, endpoints in (budgets or {}).items():
+            for endpoint, (per_minute, burst) in endpoints.items():
+                self.configure(provider, per_minute, burst, endpoint)
+
+    def configure(self, provider: str, per_minute: float,
+                  burst: float = 1, endpoint: Optional[str] = None) -> None:
+        """
+        Sets (or replaces) the budget of a provider or one of its endpoints.
+
+        Parameters:
+            provider (str): Source name, e.g. 'coingecko'.
+            per_minute (float): Calls allowed per minute.
+            burst (float, optional): Calls allowed back to back. Defaults to 1.
+            endpoint (str, optional): URL path of the endpoint, e.g.
+                'api/v1/price-histories'. Defaults to the whole provider.
+        """
+        with self._lock:
+            self._buckets[(provider, endpoint)] = TokenBucket(
+                rate=per_minute / 60, capacity=burst
+            )
+
+    def reserve(self, provider: str, endpoint: Optional[str] = None) -> float:
+        """
+        Takes a token from the provider's (and endpoint's) bucket.
+
+        Returns:
+            float: Seconds to wait before the call may be made.
+        """
+        wait = 0.0
+        for key in ((provider, None), (provider, endpoint)):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                wait = max(wait, bucket.reserve())
+            if endpoint is None:
+                break
+        return wait
+
+    def acquire(self, provider: str, endpoint: Optional[str] = None) -> None:
+        """
+        Blocks until the provider's (and endpoint's) budget allows a call.
+        """
+        wait = self.reserve(provider, endpoint)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, provider: str, endpoint: Optional[str] = None) -> None:
+        """
+        Awaits until the provider's (and endpoint's) budget allows a call.
+        """
+        wait = self.reserve(provider, endpoint)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Calls made and total seconds waited per bucket.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Stats keyed by 'provider[/endpoint]'.
+        """
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {
+            provider + (f'/{endpoint}' if endpoint else ''): {
+                'calls': bucket.acquired,
+                'waited': bucket.waited,
+            }
+            for (provider, endpoint), bucket in buckets.items()
+        }
+
+
+rate_limiter = RateLimiter(DEFAULT_BUDGETS)
@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    Retry and circuit breaker settings of a source.
+
+    Attributes:
+        max_attempts (int): Attempts per call, including the first one.
+        base_delay (float): Backoff before the first retry, in seconds;
+            doubled on every further retry and fully jittered.
+        max_delay (float): Upper bound of a single backoff, in seconds.
+        latency_budget (float): No retry is started once a call has spent
+            this many seconds (attempts plus backoff).
+        failure_threshold (int): Consecutive failed calls that open the
+            circuit breaker.
+        reset_timeout (float): Seconds the breaker stays open before a
+            single trial call is let through.
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    latency_budget: float = 30.0
+    failure_threshold: int = 5
+    reset_timeout: float = 60.0
+
+    def backoff(self, retry: int) -> float:
+        """
+        Jittered exponential backoff before the given retry (0-based).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+DEFAULT_POLICY = ResiliencePolicy()
+
+# Per-source overrides of DEFAULT_POLICY
+SOURCE_POLICIES: Dict[str, ResiliencePolicy] = {
+    # Credits are charged per call, don't burn them on a struggling API
+    'coinmarketcap': ResiliencePolicy(max_attempts=2),
+    # The per-coin OHLC calls are many and cheap
+    'coinpaprika': ResiliencePolicy(base_delay=0.2, max_delay=2.0),
+}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of a single source. Closed: calls go through. Open:
+    calls are skipped immediately. Half-open: after `reset_timeout`, one
+    trial call decides whether to close or re-open.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, source: str, policy: ResiliencePolicy) -> None:
+        self.source = source
+        self.policy = policy
+        self.state = self.CLOSED
+        self.failures = 0           # consecutive failed calls
+        self.opened_at = 0.0
+        self.skipped = 0            # calls rejected while open
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be made now.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if (self.state == self.OPEN
+                    and time.monotonic() - self.opened_at >= self.policy.reset_timeout):
+                self.state = self.HALF_OPEN
+                return True
+            self.skipped += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def release(self) -> None:
+        """
+        Ends a call without an outcome (e.g. cancelled): a half-open
+        breaker lets the next call through as its trial instead.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN
+                    or self.failures >= self.policy.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_policy(source: Optional[str]) -> ResiliencePolicy:
+    """
+    Returns the resilience policy of a source.
+    """
+    return SOURCE_POLICIES.get(source, DEFAULT_POLICY)
+
+
+def configure(source: str, **settings) -> None:
+    """
+    Overrides resilience settings of a source, e.g.
+    `configure('coingecko', max_attempts=5)`.
+    """
+    SOURCE_POLICIES[source] = replace(get_policy(source), **settings)
+    with _breakers_lock:
+        if source in _breakers:
+            _breakers[source].policy = SOURCE_POLICIES[source]
+
+
+def get_breaker(source: str) -> CircuitBreaker:
+    """
+    Returns the circuit breaker of a source, creating it on first use.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(source)
+        if breaker is None:
+            breaker = _breakers[source] = CircuitBreaker(source, get_policy(source))
+        return breaker
+
+
+def get_breakers() -> Dict[str, CircuitBreaker]:
+    """
+    Returns the circuit breakers of every source called so far.
+    """
+    with _breakers_lock:
+        return dict(_breakers)
@@ -0,0 +1,269 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+from apis import async_utils, sessions
+
+# Seconds a response stays fresh per provider, about how often the provider
+# refreshes the data behind it; sources without a TTL are not cached.
+DEFAULT_TTLS: Dict[str, float] = {
+    'coingecko': 60,
+    'coinmarketcap': 60,
+    'cryptocompare': 60,
+    'coinpaprika': 60,
+}
+
+
+@dataclass
+class CacheEntry:
+    """
+    A cached response and the validators to revalidate it with.
+    """
+    response: Any   # requests.Response or async_utils.AsyncResponse
+    fetched_at: float
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ResponseCache:
+    """
+    Process-wide cache of GET responses keyed by URL and query parameters,
+    fresh for the TTL of their source, so any number of feeds and CLI calls
+    needing the same listing within a TTL cost one upstream request.
+
+    An expired entry is revalidated with a conditional request
+    (If-None-Match / If-Modified-Since) if the provider sent an ETag or a
+    Last-Modified header; a 304 keeps the cached response. Identical
+    requests arriving while one is in flight wait for it instead of being
+    sent ("single-flight"). Only 200 responses are cached, and streamed
+    requests are never cached. The blocking and asyncio clients share the
+    entries and the requests in flight.
+
+    Attributes:
+        pool (SessionPool): Pool the requests are sent on.
+        ttls (Dict[str, float]): Seconds a response is fresh, per source.
+
+    Methods:
+        configure(source: str, ttl: float):
+            Sets the TTL of a source; 0 disables caching.
+        get(url: str, source: str = None, params: dict = None, **kwargs) -> requests.Response:
+            Cached (or coalesced, or fresh) GET response.
+        get_async(url: str, source: str = None, params: dict = None, **kwargs) -> Any:
+            Asyncio counterpart of get.
+        get_stats() -> Dict[str, Dict[str, int]]:
+            Hits, misses, revalidations and coalesced requests per source.
+        clear():
+            Drops every entry.
+    """
+
+    def __init__(self, pool: sessions.SessionPool = None,
+                 ttls: Dict[str, float] = None) -> None:
+        self.pool = pool or sessions.default_pool
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._entries: Dict[Tuple, CacheEntry] = {}
+        self._flights: Dict[Tuple, Future] = {}
+        self._stats: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, source: str, ttl: float) -> None:
+        """
+        Sets the TTL of a source's responses.
+
+        Parameters:
+            source (str): Source name, e.g. 'coingecko'.
+            ttl (float): Seconds a response is fresh; 0 disables caching.
+        """
+        with self._lock:
+            self.ttls[source] = ttl
+
+    def _count(self, source: Optional[str], event: str) -> None:
+        self._stats.setdefault(source or '', Counter())[event] += 1
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]]) -> Tuple:
+        return url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+    def get(self, url: str, source: Optional[str] = None,
+            params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        """
+        GET response of the URL and parameters: the cached one while fresh,
+        else the one of an identical request in flight, else a new one
+        (conditional if the expired entry has validators).
+
+        Parameters:
+            url (str): URL of the request.
+            source (str, optional): Provider name, selects the TTL and the
+                rate limit budget.
+            params (dict, optional): Query parameters, part of the key.
+            **kwargs: Passed on to SessionPool.get, e.g. headers.
+
+        Returns:
+            requests.Response: The response; shared between callers, so it
+                must not be modified.
+        """
+        ttl = self.ttls.get(source, 0)
+        if ttl <= 0 or kwargs.get('stream'):
+            return self.pool.get(url, source=source, params=params, **kwargs)
+
+        key = self.key(url, params)
+        entry, flight, leader = self._join(key, source, ttl)
+        if flight is None:
+            return entry.response
+        if not leader:
+            return flight.result()
+
+        headers = self._conditional_headers(entry, kwargs)
+        try:
+            response = self.pool.get(url, source=source, params=params,
+                                     headers=headers, **kwargs)
+            response = self._store(key, entry, source, response)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, response)
+        return response
+
+    async def get_async(self, url: str, source: Optional[str] = None,
+                        params: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+        """
+        Asyncio counterpart of get: a new request is sent on the aiohttp
+        session (async_utils.request), and an identical request in flight,
+        of either client, is awaited without blocking the event loop.
+
+        Returns:
+            Any: The response, a requests.Response or an AsyncResponse;
+                shared between callers, so it must not be modified.
+        """
+        ttl = self.ttls.get(source, 0)
+        if ttl <= 0:
+            return await async_utils.request('GET', url, source=source,
+                                             params=params, **kwargs)
+
+        key = self.key(url, params)
+        entry, flight, leader = self._join(key, source, ttl)
+        if flight is None:
+            return entry.response
+        if not leader:
+            # shielded, a cancelled waiter must not cancel the request
+            return await asyncio.shield(asyncio.wrap_future(flight))
+
+        headers = self._conditional_headers(entry, kwargs)
+        try:
+            response = await async_utils.request('GET', url, source=source, params=params,
+                                                 headers=headers, **kwargs)
+            response = self._store(key, entry, source, response)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, response)
+        return response
+
+    def _join(self, key: Tuple, source: Optional[str],
+              ttl: float) -> Tuple[Optional[CacheEntry], Optional[Future], bool]:
+        # The fresh entry (and no flight), else the flight to wait for, or
+        # the new one the caller leads, with the expired entry if any
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at < ttl:
+                self._count(source, 'hits')
+                return entry, None, False
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._count(source, 'coalesced')
+                return entry, flight, False
+            flight = self._flights[key] = Future()
+            return entry, flight, True
+
+    def _land(self, key: Tuple, flight: Future, response: Any = None,
+              error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._flights[key]
+        if error is None:
+            flight.set_result(response)
+        elif isinstance(error, Exception):
+            flight.set_exception(error)
+        else:
+            # e.g. the leading task was cancelled; the waiters' request failed
+            flight.set_exception(requests.exceptions.RequestException(
+                f"Request to {key[0]} was interrupted"))
+
+    @staticmethod
+    def _conditional_headers(entry: Optional[CacheEntry],
+                             kwargs: Dict[str, Any]) -> Dict[str, str]:
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def _store(self, key: Tuple, entry: Optional[CacheEntry],
+               source: Optional[str], response: Any) -> Any:
+        # The response to return for a fetch, caching it if it is a 200
+        now = time.monotonic()
+        with self._lock:
+            if entry is not None and response.status_code == 304:
+                self._count(source, 'revalidated')
+                entry.fetched_at = now
+                return entry.response
+            self._count(source, 'misses')
+            if response.status_code == 200:
+                self._entries[key] = CacheEntry(
+                    response, now, response.headers.get('ETag'),
+                    response.headers.get('Last-Modified')
+                )
+            else:
+                self._entries.pop(key, None)
+        return response
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Hits, misses, revalidations (304s) and coalesced requests per
+        source. Every hit, revalidation and coalesced request saved a
+        provider call.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Stats keyed by source.
+        """
+        with self._lock:
+            return {
+                source: {event: counts[event] for event in
+                         ('hits', 'misses', 'revalidated', 'coalesced')}
+                for source, counts in self._stats.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+default_cache = ResponseCache()
+
+
+def get(url: str, source: Optional[str] = None, **kwargs) -> requests.Response:
+    """
+    GET through the process-wide response cache, see ResponseCache.get.
+    """
+    return default_cache.get(url, source=source, **kwargs)
+
+
+async def get_async(url: str, source: Optional[str] = None, **kwargs) -> Any:
+    """
+    Asyncio GET through the process-wide response cache, see
+    ResponseCache.get_async.
+    """
+    return await default_cache.get_async(url, source=source, **kwargs)
+
+
+def get_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Stats of the process-wide response cache.
+    """
+    return default_cache.get_stats()
@@ -0,0 +1,155 @@
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from apis import utils
+from apis.rate_limiter import rate_limiter
+
+POOL_MAXSIZE = 10  # connections kept alive per host
+
+
+class SessionPool:
+    """
+    Process-wide pool of keep-alive HTTP sessions, one per host, shared by
+    all API clients so repeated calls reuse TCP+TLS connections instead of
+    opening a new one per request.
+
+    Attributes:
+        pool_maxsize (int): Connections kept alive per host.
+        timeout (float): Default timeout of every request, in seconds.
+
+    Methods:
+        request(method: str, url: str, **kwargs) -> requests.Response:
+            Sends a request on the session of the URL's host.
+        get(url: str, **kwargs) -> requests.Response:
+            Sends a GET request on the session of the URL's host.
+        get_stats() -> Dict[str, Dict[str, int]]:
+            Requests sent and connections opened per host.
+    """
+
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE,
+                 timeout: float = utils.REQUEST_TIMEOUT) -> None:
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url: str) -> requests.Session:
+        """
+        Returns the session of the URL's host, creating it on first use.
+
+        Parameters:
+            url (str): URL about to be requested.
+
+        Returns:
+            requests.Session: Session with a keep-alive connection pool.
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1, pool_maxsize=self.pool_maxsize
+                    )
+                    session.mount(host, adapter)
+                    session.headers['Connection'] = 'keep-alive'
+                    self._sessions[host] = session
+        return session
+
+    def request(self, method: str, url: str, source: Optional[str] = None,
+                **kwargs) -> requests.Response:
+        """
+        Sends a request on the session of the URL's host.
+
+        Parameters:
+            method (str): HTTP method.
+            url (str): URL of the request.
+            source (str, optional): Provider name; if given, the request
+                waits for the provider's (and endpoint's) rate limit budget.
+            **kwargs: Passed on to `requests.Session.request`; `timeout`
+                defaults to the pool's timeout.
+
+        Returns:
+            requests.Response: The response.
+        """
+        if source is not None:
+            rate_limiter.acquire(source, urlsplit(url).path.lstrip('/'))
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, source: Optional[str] = None,
+            **kwargs) -> requests.Response:
+        """
+        Sends a GET request on the session of the URL's host.
+        """
+        return self.request('GET', url, source=source, **kwargs)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Requests sent and connections opened per host. Every request beyond
+        the number of connections opened reused a kept-alive connection.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Stats keyed by host.
+        """
+        stats = {}
+        with self._lock:
+            sessions = dict(self._sessions)
+        for host, session in sessions.items():
+            pools = session.get_adapter(host).poolmanager.pools
+            num_requests = num_connections = 0
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    num_requests += pool.num_requests
+                    num_connections += pool.num_connections
+            stats[host] = {
+                'requests': num_requests,
+                'connections': num_connections,
+                'reused': max(0, num_requests - num_connections),
+            }
+        return stats
+
+    def close(self) -> None:
+        """
+        Closes every session and its kept-alive connections.
+        """
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+default_pool = SessionPool()
+
+
+def request(method: str, url: str, source: Optional[str] = None,
+            **kwargs) -> requests.Response:
+    """
+    Sends a request through the process-wide session pool, drawing from the
+    source's rate limit budget if a source is given.
+    """
+    return default_pool.request(method, url, source=source, **kwargs)
+
+
+def get(url: str, source: Optional[str] = None,
+        **kwargs) -> requests.Response:
+    """
+    Sends a GET request through the process-wide session pool, drawing from
+    the source's rate limit budget if a source is given.
+    """
+    return default_pool.get(url, source=source, **kwargs)
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Connection reuse stats of the process-wide session pool.
+    """
+    return default_pool.get_stats()
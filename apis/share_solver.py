@@ -0,0 +1,173 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+DEFAULT_MAX_PASSES = 1000      # greedy passes before falling back to the projection
+PROJECTION_MAX_PASSES = 200
+# Share deviations this small are rounding noise: the greedy passes approach
+# the caps geometrically and may never hit them exactly
+SHARE_TOLERANCE = 1e-12
+
+
+@dataclass
+class ShareSolution:
+    """
+    Values whose index shares lie within their caps.
+
+    Attributes:
+        values (np.ndarray): Adjusted values; uncapped ones are unchanged.
+        total (float): Sum of the adjusted values.
+        passes (int): Vectorized passes over the values that were needed.
+        residual (float): Largest remaining violation of a share cap;
+            at most SHARE_TOLERANCE unless the caps are infeasible (lower
+            caps summing to more than 1 or upper caps to less).
+        projected (bool): The greedy passes did not converge and the values
+            were projected onto the caps instead.
+    """
+    values: np.ndarray
+    total: float
+    passes: int
+    residual: float
+    projected: bool = False
+
+
+def _active_sets(values: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                 total: float):
+    shares = values / total
+    return shares < lower, shares > upper
+
+
+def share_residual(values: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> float:
+    """
+    Largest violation of a share cap by the given values.
+    """
+    shares = values / values.sum()
+    return float(max(0.0, (lower - shares).max(), (shares - upper).max()))
+
+
+def greedy_shares(values: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                  max_passes: int, tolerance: float = SHARE_TOLERANCE) -> ShareSolution:
+    """
+    The original adjust_share algorithm, one vectorized pass per step:
+    the value whose share deviates most from its caps (the first one on
+    ties) is set to its cap times the current total, until no share
+    deviates by more than tolerance. Path dependent, so its result is not
+    a projection.
+
+    Each pass caps a single value, so the passes stop early, unconverged,
+    once more values deviate than there are passes left.
+    """
+    values = values.copy()
+    for passes in range(1, max_passes + 1):
+        # summed left to right like python's sum(), pairwise summation
+        # rounds differently and can send the greedy down another path
+        total = np.cumsum(values)[-1]
+        shares = values / total
+        deviations = np.where(shares < lower, shares - lower,
+                              np.where(shares > upper, shares - upper, 0.0))
+        magnitudes = np.abs(deviations)
+        i = np.argmax(magnitudes)
+        if magnitudes[i] <= tolerance:
+            return ShareSolution(values, float(total), passes, float(magnitudes[i]))
+        if np.count_nonzero(magnitudes > tolerance) > max_passes - passes + 1:
+            return ShareSolution(values, float(values.sum()), passes,
+                                 share_residual(values, lower, upper))
+        values[i] = (lower[i] if deviations[i] < 0 else upper[i]) * total
+    return ShareSolution(values, float(values.sum()), max_passes,
+                         share_residual(values, lower, upper))
+
+
+def project_shares(values: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                   max_passes: int = PROJECTION_MAX_PASSES) -> ShareSolution:
+    """
+    Projects the values onto the share caps: values within their caps are
+    left unchanged and capped values are set to their cap times the new
+    total T, so the shares are clip(values / T, lower, upper), which must
+    sum to 1.
+
+    That sum is non-increasing in T, so T is bracketed by bisection, each
+    pass vectorized over all values, until no value changes between
+    capped-below, uncapped and capped-above inside the bracket. With the
+    capped values known, T = uncapped sum / (1 - caps of the capped values)
+    exactly.
+
+    Converges in a bounded number of passes, whereas the greedy passes may
+    not converge at all.
+    """
+    total = values.sum()
+    if total <= 0:
+        return ShareSolution(values.copy(), float(total), 0,
+                             0.0 if lower.sum() <= 0 else float(lower.max()))
+
+    def excess(t):
+        return np.clip(values / t, lower, upper).sum() - 1
+
+    passes = 1
+    below, above = _active_sets(values, lower, upper, total)
+    if not (below.any() or above.any()):
+        return ShareSolution(values.copy(), float(total), passes, 0.0)
+
+    # Bracket the root: excess(lo) >= 0 >= excess(hi)
+    lo = hi = total
+    while excess(lo) < 0 and passes < max_passes:
+        lo /= 2
+        passes += 1
+    while excess(hi) > 0 and passes < max_passes:
+        hi *= 2
+        passes += 1
+
+    while passes < max_passes:
+        sets_lo = _active_sets(values, lower, upper, lo)
+        sets_hi = _active_sets(values, lower, upper, hi)
+        passes += 1
+        if all(np.array_equal(a, b) for a, b in zip(sets_lo, sets_hi)):
+            below, above = sets_lo
+            free = ~(below | above)
+            capped = lower[below].sum() + upper[above].sum()
+            if free.any() and capped < 1:
+                t = values[free].sum() / (1 - capped)
+            else:
+                t = np.sqrt(lo * hi)    # every share capped, any T in the bracket fits
+            break
+        mid = np.sqrt(lo * hi)
+        if excess(mid) > 0:
+            lo = mid
+        else:
+            hi = mid
+    else:
+        t = np.sqrt(lo * hi)
+
+    adjusted = np.clip(values / t, lower, upper) * t
+    return ShareSolution(adjusted, float(adjusted.sum()), passes,
+                         share_residual(adjusted, lower, upper), projected=True)
+
+
+def solve_shares(values, lower, upper,
+                 max_passes: int = DEFAULT_MAX_PASSES) -> ShareSolution:
+    """
+    Adjusts the values so each one's share of their total lies within
+    [lower, upper]. Runs the original greedy algorithm (vectorized, same
+    result) and, if it has not converged after max_passes or cannot
+    converge in the passes left (see greedy_shares), projects the original
+    values onto the caps instead.
+
+    Parameters:
+        values (array-like): Non-negative values, e.g. price * quantity.
+        lower (array-like): Lower share caps.
+        upper (array-like): Upper share caps.
+        max_passes (int, optional): Bound on the greedy passes.
+
+    Returns:
+        ShareSolution: Adjusted values, their total, passes and residual.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    if values.sum() <= 0:
+        return project_shares(values, lower, upper)
+    solution = greedy_shares(values, lower, upper, max_passes)
+    if solution.residual <= SHARE_TOLERANCE:
+        return solution
+    projection = project_shares(values, lower, upper)
+    projection.passes += solution.passes
+    return projection
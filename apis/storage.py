@@ -0,0 +1,291 @@
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from collections import ChainMap
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from apis.crypto_api import MarketCapSnapshot
+
+DEFAULT_DB_PATH = 'data.db'
+QUEUE_SIZE = 1000  # pending snapshots before enqueue_snapshot blocks
+
+SQLITE_MAX_VARIABLES = 999
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS coins (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources (id),
+    load_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS market_caps (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    coin_id INTEGER NOT NULL REFERENCES coins (id),
+    market_cap REAL,
+    last_updated_time REAL,
+    load_time REAL NOT NULL
+);
+-- latest snapshot of a source / its snapshot at time t
+CREATE INDEX IF NOT EXISTS snapshots_by_source_time
+    ON snapshots (source_id, load_time);
+-- top N of a snapshot
+CREATE INDEX IF NOT EXISTS market_caps_by_snapshot_cap
+    ON market_caps (snapshot_id, market_cap DESC);
+-- market cap of a coin between t0 and t1
+CREATE INDEX IF NOT EXISTS market_caps_by_coin_time
+    ON market_caps (coin_id, load_time);
+CREATE VIEW IF NOT EXISTS market_cap_data AS
+    SELECT coins.name AS name, market_caps.market_cap AS market_cap,
+           market_caps.last_updated_time AS last_updated_time,
+           market_caps.load_time AS load_time, sources.name AS source
+    FROM market_caps
+    JOIN snapshots ON snapshots.id = market_caps.snapshot_id
+    JOIN sources ON sources.id = snapshots.source_id
+    JOIN coins ON coins.id = market_caps.coin_id;
+"""
+
+MIGRATE_LEGACY = """
+INSERT OR IGNORE INTO sources (name)
+    SELECT DISTINCT source FROM market_cap_data_legacy WHERE source IS NOT NULL;
+INSERT OR IGNORE INTO coins (name)
+    SELECT DISTINCT name FROM market_cap_data_legacy WHERE name IS NOT NULL;
+INSERT INTO snapshots (source_id, load_time)
+    SELECT DISTINCT sources.id, legacy.load_time
+    FROM market_cap_data_legacy AS legacy
+    JOIN sources ON sources.name = legacy.source
+    ORDER BY legacy.load_time;
+INSERT INTO market_caps
+    (snapshot_id, coin_id, market_cap, last_updated_time, load_time)
+    SELECT snapshots.id, coins.id, legacy.market_cap,
+           legacy.last_updated_time, legacy.load_time
+    FROM market_cap_data_legacy AS legacy
+    JOIN sources ON sources.name = legacy.source
+    JOIN snapshots ON snapshots.source_id = sources.id
+        AND snapshots.load_time = legacy.load_time
+    JOIN coins ON coins.name = legacy.name;
+DROP TABLE market_cap_data_legacy;
+"""
+
+_STOP = object()
+
+
+class MarketCapStore:
+    """
+    Owns a long-lived WAL-mode SQLite connection to the market cap database.
+    The schema is created once, each snapshot is written as one batched
+    transaction (names and sources normalized into lookup tables), and
+    `enqueue_snapshot` hands snapshots to a background writer thread so
+    feeds never wait on the disk.
+
+    Attributes:
+        db_path (str): Path to the SQLite database.
+
+    Methods:
+        write_snapshot(market_data: MarketCapSnapshot, source: str, load_time: float = None):
+            Writes a snapshot synchronously.
+        enqueue_snapshot(market_data: MarketCapSnapshot, source: str):
+            Queues a snapshot for the background writer.
+        flush():
+            Blocks until every queued snapshot is written.
+        close():
+            Flushes, stops the writer and closes the connection.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 queue_size: int = QUEUE_SIZE) -> None:
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self.create_schema()
+
+    def create_schema(self) -> None:
+        """
+        Creates the market cap tables and indexes (if not exists), migrating
+        a database still holding the original flat market_cap_data table.
+
+        Names and sources are normalized into lookup tables, every fetch is a
+        row of `snapshots`, and `market_cap_data` is kept as a view with the
+        original columns.
+        """
+        with self._lock:
+            legacy = self._conn.execute(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'market_cap_data'"
+            ).fetchone()
+            script = SCHEMA
+            if legacy:
+                script = (
+                    "ALTER TABLE market_cap_data RENAME TO market_cap_data_legacy;"
+                    + SCHEMA + MIGRATE_LEGACY
+                )
+            # executescript commits first, so the transaction is explicit
+            self._conn.executescript(f"BEGIN; {script} COMMIT;")
+        self._load_ids()
+
+    def _load_ids(self) -> None:
+        with self._lock:
+            self._source_ids = dict(
+                (name, id) for id, name in self._conn.execute("SELECT id, name FROM sources")
+            )
+            self._coin_ids = dict(
+                (name, id) for id, name in self._conn.execute("SELECT id, name FROM coins")
+            )
+
+    def _get_ids(self, table: str, cache: Dict[str, int], names) -> ChainMap:
+        # called with self._lock held, inside a transaction; the new ids
+        # (maps[0]) are left out of the cache until the transaction commits
+        missing = [name for name in set(names) if name not in cache]
+        new_ids: Dict[str, int] = {}
+        if missing:
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {table} (name) VALUES (?)",
+                [(name,) for name in missing]
+            )
+            for i in range(0, len(missing), SQLITE_MAX_VARIABLES):
+                chunk = missing[i:i + SQLITE_MAX_VARIABLES]
+                new_ids.update(self._conn.execute(
+                    f"SELECT name, id FROM {table} "
+                    f"WHERE name IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+        return ChainMap(new_ids, cache)
+
+    def write_snapshot(self, market_data: 'MarketCapSnapshot',
+                       source: str, load_time: Optional[float] = None) -> None:
+        """
+        Writes a market cap snapshot in a single transaction.
+
+        Parameters:
+            market_data (MarketCapSnapshot): Market cap data to store.
+            source (str): Source of the market cap data.
+            load_time (float, optional): Time the data was fetched.
+                Defaults to now.
+        """
+        load_time = int(time.time()) if load_time is None else load_time
+        rows = list(market_data.records())
+        with self._lock:
+            with self._conn:
+                source_ids = self._get_ids('sources', self._source_ids, [source])
+                coin_ids = self._get_ids(
+                    'coins', self._coin_ids, [name for name, _, _ in rows]
+                )
+                snapshot_id = self._conn.execute(
+                    "INSERT INTO snapshots (source_id, load_time) VALUES (?, ?)",
+                    (source_ids[source], load_time)
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO market_caps "
+                    "(snapshot_id, coin_id, market_cap, last_updated_time, load_time) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (snapshot_id, coin_ids[name], market_cap, last_updated, load_time)
+                        for name, market_cap, last_updated in rows
+                    ]
+                )
+            # committed: a rolled back transaction would have cached ids of
+            # rows that do not exist
+            self._source_ids.update(source_ids.maps[0])
+            self._coin_ids.update(coin_ids.maps[0])
+
+    def enqueue_snapshot(self, market_data: 'MarketCapSnapshot', source: str) -> None:
+        """
+        Queues a market cap snapshot for the background writer. The load
+        time is taken now, not when the snapshot reaches the disk.
+
+        Parameters:
+            market_data (MarketCapSnapshot): Market cap data to store.
+            source (str): Source of the market cap data.
+        """
+        self._ensure_writer()
+        self._queue.put((market_data, source, int(time.time())))
+
+    def flush(self) -> None:
+        """
+        Blocks until every queued snapshot has been written.
+        """
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Flushes pending snapshots, stops the writer and closes the connection.
+        """
+        if self._writer is not None:
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            self._conn.close()
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_loop, name='market-cap-writer',
+                        daemon=True
+                    )
+                    self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                try:
+                    self.write_snapshot(*item)
+                except Exception as e:
+                    # a bad snapshot must not stop the only writer, or
+                    # enqueue_snapshot, flush and close would block forever
+                    print("Error occurred while storing market cap data:", repr(e))
+            finally:
+                self._queue.task_done()
+
+
+_stores: Dict[str, MarketCapStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_market_cap_store(db_path: str = DEFAULT_DB_PATH) -> MarketCapStore:
+    """
+    Returns the process-wide store of a database, opening it on first use.
+
+    Parameters:
+        db_path (str, optional): Path to the SQLite database.
+            Defaults to 'data.db'.
+
+    Returns:
+        MarketCapStore: The shared store.
+    """
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = MarketCapStore(db_path)
+        return store
+
+
+@atexit.register
+def close_all() -> None:
+    """
+    Flushes and closes every open store; also run at interpreter exit.
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
@@ -1,9 +1,10 @@
 # from pprint import pprint
 import os
 from dotenv import load_dotenv
-import requests
 import json
 
+from apis import async_utils, sessions, utils
+
 # import json
 # from pathlib import Path
 
@@ -14,7 +15,9 @@ import json
 # Load environment variables from .env file
 load_dotenv()
 class UnisatAPI:
-    
+    SOURCE = 'unisat'
+    DETAIL_PATH = ('data', 'detail')    # list of the list endpoints' responses
+
     def __init__(self):
         api_key = os.environ.get('UNISAT_API_KEY')
         if api_key is None:
@@ -26,10 +29,24 @@ class UnisatAPI:
         }
         self.api_key = api_key
 
-    def _make_request(self, endpoint, params=None):
+    def _make_request(self, endpoint, params=None, stream=False):
         url = self.base_url + endpoint
-        response = requests.get(url, headers=self.headers, params=params)
+        response = sessions.get(url, headers=self.headers, params=params, source=self.SOURCE,
+                                stream=stream)
         return response
+
+    def iter_detail(self, endpoint, params=None, max_items=None, fields=None):
+        '''
+        items of the data.detail list of a list endpoint, decoded as they
+        arrive from the socket instead of after the whole response, see
+        utils.iter_json; stops reading after max_items and keeps only
+        `fields` of each item
+        '''
+        response = self._make_request(endpoint, params, stream=True)
+        if response.status_code != 200:
+            response.close()
+            response.raise_for_status()
+        return utils.iter_json(response, self.DETAIL_PATH, max_items, fields)
     
     def get_best_block_height(self):
         return self._make_request('brc20/bestheight')
@@ -52,6 +69,9 @@ class UnisatAPI:
     def get_brc20_list(self, start=0, limit=100):
         return self._make_request(f'brc20/list', {'start': start, 'limit': limit})
 
+    def iter_brc20_list(self, start=0, limit=100, max_items=None):
+        return self.iter_detail('brc20/list', {'start': start, 'limit': limit}, max_items)
+
     def get_brc20_status(self, start=0, limit=10, sort='holders', complete='yes'):
         '''
         sort by (holders/deploy/minted/transactions)
@@ -71,6 +91,12 @@ class UnisatAPI:
         '''
         return self._make_request(f'brc20/{ticker}/history', {'type': type, 'start': start, 'height': height, 'limit': limit})
 
+    def iter_brc20_ticker_history(self, ticker, height, type, start=0, limit=100,
+                                  max_items=None, fields=None):
+        return self.iter_detail(f'brc20/{ticker}/history',
+                                {'type': type, 'start': start, 'height': height, 'limit': limit},
+                                max_items, fields)
+
     def get_history_by_height(self, height, start=0, limit=100):
         return self._make_request(f'brc20/history-by-height/{height}', {'start': start, 'limit': limit})
 
@@ -97,7 +123,26 @@ class UnisatAPI:
 
     def get_transferable_inscriptions(self, address, ticker):
         return self._make_request(f'address/{address}/brc20/{ticker}/transferable-inscriptions')
-    
+
+
+class AsyncUnisatAPI(UnisatAPI):
+    '''
+    asyncio version of UnisatAPI: every get_* method returns a coroutine
+    resolving to a fully read response with the same .json()/.status_code
+    as the blocking client, and every iter_* method an async iterator
+    '''
+
+    async def _make_request(self, endpoint, params=None):
+        url = self.base_url + endpoint
+        return await async_utils.request('GET', url, headers=self.headers, params=params, source=self.SOURCE)
+
+    def iter_detail(self, endpoint, params=None, max_items=None, fields=None):
+        ''' async iterator of the data.detail items of a list endpoint,
+        streamed on the aiohttp session, see async_utils.iter_json '''
+        return async_utils.iter_json(self.base_url + endpoint, self.DETAIL_PATH,
+                                     max_items, fields, params=params,
+                                     headers=self.headers, source=self.SOURCE)
+
 def main():
     unisat_api = UnisatAPI()
     # print(unisat_api.get_best_block_height().json())
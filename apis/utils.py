@@ -1,12 +1,27 @@
 import os
+import re
 import json
-import sqlite3
 import time
-from typing import Any, Dict, Callable, Optional
-from requests.exceptions import RequestException
+import codecs
+import asyncio
+import inspect
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Optional, Sequence
+from requests.exceptions import JSONDecodeError, RequestException
 from functools import wraps
 import datetime
 
+from apis import resilience, storage
+
+if TYPE_CHECKING:
+    from apis.crypto_api import MarketCapSnapshot
+
+# Seconds to wait for a provider to connect / send data before giving up,
+# so a hung request can't stall a feed's heartbeat
+REQUEST_TIMEOUT = 30
+STREAM_CHUNK_SIZE = 64 * 1024   # bytes read from the socket at a time
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
 
 class MissingDataException(Exception):
     """Raised when the expected data is missing in an API response"""
@@ -27,44 +42,29 @@ def convert_timestamp_to_unixtime(timestamp):
 def create_market_cap_database(db_path: str = 'data.db') -> None:
     """
     Creates a SQLite database (if not exists) to store market cap data.
+    The schema is created once, when the database's store is first opened.
 
     Parameters:
         db_path (str, optional): Path to the SQLite database.
         Defaults to 'data.db'.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        "CREATE TABLE IF NOT EXISTS "
-        "market_cap_data "
-        "(name TEXT, market_cap REAL, last_updated_time REAL, "
-        "load_time REAL, source TEXT)"
-    )
-    conn.commit()
-    conn.close()
+    storage.get_market_cap_store(db_path)
 
 
 def store_market_cap_data(
-        market_data: Dict[float, Dict[str, Any]],
+        market_data: 'MarketCapSnapshot',
         source: str, db_path: str = 'data.db'
 ) -> None:
     """
-    Stores market cap data into the SQLite database.
+    Stores market cap data into the SQLite database, in one transaction on
+    the database's long-lived connection.
 
     Parameters:
-        market_data (Dict[float, Dict[str, Any]]): Market cap data to store.
+        market_data (MarketCapSnapshot): Market cap data to store.
         source (str): Source of the market cap data.
         db_path (str, optional): Path to the SQLite database. Defaults to 'data.db'.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    for market_cap, md in market_data.items():
-        cursor.execute(
-            "INSERT INTO market_cap_data (name, market_cap, last_updated_time, load_time, source)"
-            "VALUES (?, ?, ?, ?, ?)",
-            (md['name'], market_cap, md['last_updated'], int(time.time()), source))
-    conn.commit()
-    conn.close()
+    storage.get_market_cap_store(db_path).write_snapshot(market_data, source)
 
 
 def handle_request_errors(
@@ -73,20 +73,118 @@ def handle_request_errors(
     """
     Decorator function to handle request errors.
 
+    Failed requests are retried with jittered exponential backoff within the
+    source's latency budget, and repeated failures open the source's circuit
+    breaker, skipping further calls until it resets (see apis.resilience).
+    Any other error (e.g. a parsing error) is raised as is, after being
+    recorded as a failure of the source. A cancellation (e.g. a missed
+    deadline) is not the source's failure: it is raised without being
+    recorded, only releasing a half-open breaker's trial, so the breaker
+    never waits forever for the outcome of its trial call. Only the error
+    ending a call is printed, not those of attempts that are retried.
+    The source is the `source` attribute of the decorated method's instance;
+    functions without one are retried under the default policy and have no
+    breaker. Works for both plain and coroutine functions.
+
     Parameters:
         func (Callable[..., Any]): The function to be decorated.
 
     Returns:
-        Callable[..., Optional[Any]]: The decorated function.
+        Callable[..., Optional[Any]]:
+            The decorated function, returning None if every attempt failed
+            or the breaker is open.
     """
+    def prepare(args):
+        source = getattr(args[0], 'source', None) if args else None
+        breaker = resilience.get_breaker(source) if source else None
+        if breaker is not None and not breaker.allow():
+            print(f"Circuit breaker for {source} is open, skipping the API request.")
+            return None, None, False
+        return resilience.get_policy(source), breaker, True
+
+    def next_delay(policy, attempt, started):
+        if attempt + 1 >= policy.max_attempts:
+            return None
+        delay = policy.backoff(attempt)
+        if time.monotonic() - started + delay > policy.latency_budget:
+            return None
+        return delay
+
+    def give_up(breaker, attempts, error):
+        if breaker is not None:
+            breaker.record_failure()
+        print(f"Error occurred while making the API request ({attempts} attempts):", str(error))
+        print("Warning: Continuing with the rest of the execution.")
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            policy, breaker, allowed = prepare(args)
+            if not allowed:
+                return None
+            started = time.monotonic()
+            try:
+                for attempt in range(policy.max_attempts):
+                    try:
+                        result = await func(*args, **kwargs)
+                    except RequestException as e:
+                        error = e
+                        delay = next_delay(policy, attempt, started)
+                        if delay is None:
+                            break
+                        await asyncio.sleep(delay)
+                    except Exception:
+                        if breaker is not None:
+                            breaker.record_failure()
+                        raise
+                    else:
+                        if breaker is not None:
+                            breaker.record_success()
+                        return result
+            except Exception:
+                raise
+            except BaseException:
+                # cancelled, also while backing off
+                if breaker is not None:
+                    breaker.release()
+                raise
+            give_up(breaker, attempt + 1, error)
+            return None
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except RequestException as e:
-            print("Error occurred while making the API request:", str(e))
-            print("Warning: Continuing with the rest of the execution.")
+        policy, breaker, allowed = prepare(args)
+        if not allowed:
             return None
+        started = time.monotonic()
+        try:
+            for attempt in range(policy.max_attempts):
+                try:
+                    result = func(*args, **kwargs)
+                except RequestException as e:
+                    error = e
+                    delay = next_delay(policy, attempt, started)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                except Exception:
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise
+                else:
+                    if breaker is not None:
+                        breaker.record_success()
+                    return result
+        except Exception:
+            raise
+        except BaseException:
+            # interrupted, also while backing off
+            if breaker is not None:
+                breaker.release()
+            raise
+        give_up(breaker, attempt + 1, error)
+        return None
     return wrapper
 
 
@@ -106,3 +204,144 @@ def get_api_key(source: str) -> str:
     if key is None:
         raise Exception(f"API key '{key_name}' not found in env vars.")
     return key
+
+
+class _JSONStream:
+    """
+    Incremental reader of JSON text arriving in chunks: values are decoded
+    by the C scanner of the json module once enough text has arrived, and
+    only the unconsumed tail of the text is kept.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._text = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, min_length: int = 0) -> bool:
+        # Appends chunks until the unconsumed text is at least min_length
+        # long, so a value spanning many chunks is not re-scanned per chunk
+        if self._eof:
+            return False
+        parts = [self._text[self._pos:]]
+        length = len(parts[0])
+        while True:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                parts.append(self._utf8.decode(b'', final=True))
+                break
+            parts.append(self._utf8.decode(chunk))
+            length += len(parts[-1])
+            if length >= min_length:
+                break
+        self._text, self._pos = ''.join(parts), 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, '' at the end of the text."""
+        while True:
+            self._pos = _WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._read():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f'Expecting {char!r}', self._text, self._pos)
+        self._pos += 1
+
+    def value(self) -> Any:
+        """Decodes the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._text, self._pos)
+                # a number at the end of the text may continue in the next chunk
+                if end < len(self._text) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read(2 * (len(self._text) - self._pos))
+
+    def items(self, path: Sequence[str]) -> Iterator[Any]:
+        """Decodes the items of the array at path one at a time."""
+        for key in path:
+            self.expect('{')
+            while True:
+                if self.peek() == '}':
+                    raise MissingDataException(f"Key '{key}' missing in the response")
+                found = self.value() == key
+                self.expect(':')
+                if found:
+                    break
+                self.value()
+                if self.peek() == ',':
+                    self._pos += 1
+        self.expect('[')
+        if self.peek() == ']':
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ']':
+                return
+            self.expect(',')
+
+
+def iter_json_items(chunks: Iterable[bytes], path: Sequence[str] = (),
+                    max_items: Optional[int] = None,
+                    fields: Optional[Sequence[str]] = None) -> Iterator[Any]:
+    """
+    Iterates the items of a JSON array as the JSON text arrives, so only
+    one item at a time is held in memory instead of the whole document.
+    Values are decoded by the C scanner of the json module.
+
+    Parameters:
+        chunks (Iterable[bytes]): The JSON text, in chunks of UTF-8.
+        path (Sequence[str], optional): Keys leading from the top-level
+            object to the array, e.g. ('data',). Defaults to a top-level
+            array.
+        max_items (int, optional): Stop after this many items, without
+            reading the rest of the text.
+        fields (Sequence[str], optional): Keep only these keys of object
+            items, so the callers holding on to items hold less.
+
+    Returns:
+        Iterator[Any]: The decoded items of the array.
+
+    Raises:
+        JSONDecodeError: If the text is not valid JSON.
+        MissingDataException: If a key of the path is missing.
+    """
+    if max_items is not None and max_items <= 0:
+        return
+    try:
+        for count, item in enumerate(_JSONStream(chunks).items(path), start=1):
+            if fields is not None and isinstance(item, dict):
+                item = {key: item[key] for key in fields if key in item}
+            yield item
+            if count == max_items:
+                return
+    except json.JSONDecodeError as e:
+        # a RequestException, like the error of response.json()
+        raise JSONDecodeError(e.msg, e.doc, e.pos)
+
+
+def iter_json(response, path: Sequence[str] = (),
+              max_items: Optional[int] = None,
+              fields: Optional[Sequence[str]] = None,
+              chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Iterates the items of the JSON array at path in the body of a response
+    requested with stream=True, as they are read from the socket; see
+    iter_json_items. The response is closed once iterated, or as soon as
+    max_items were read.
+    """
+    with response:
+        yield from iter_json_items(response.iter_content(chunk_size), path,
+                                   max_items, fields)
@@ -0,0 +1,101 @@
+'''
+Benchmark of apis.share_solver.solve_shares against the original pure python
+CSGOSkins.adjust_share loop (legacy_adjust_share).
+
+    python benchmarks/share_solver.py --skins 10000 --universes 3
+'''
+#stdlib
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+#third party
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+#our stuff
+from apis.share_solver import project_shares, solve_shares
+
+
+def legacy_adjust_share(elements: List[float], min_percentages: List[float],
+                        max_percentages: List[float], max_iterations: int) -> List[float]:
+    '''
+    The original iterative algorithm of CSGOSkins.adjust_share: repeatedly
+    moves the single most deviating value to its cap at the current total.
+    Pure python, O(iterations * n log n); kept as the reference of
+    apis.share_solver.greedy_shares, here and in test/test_share_solver.py.
+    '''
+    elements = list(elements)
+    iterations = 0
+    while iterations < max_iterations:
+        sum_elements = sum(elements)
+        deviations = []
+        for i, num in enumerate(elements):
+            current_percentage = num / sum_elements
+            if current_percentage < min_percentages[i]:
+                deviation = current_percentage - min_percentages[i]
+            elif current_percentage > max_percentages[i]:
+                deviation = current_percentage - max_percentages[i]
+            else:
+                deviation = 0
+            deviations.append(deviation)
+        if all(d == 0 for d in deviations):
+            break
+        sorted_indices = sorted(range(len(deviations)), key=lambda k: abs(deviations[k]), reverse=True)
+        most_deviating_index = sorted_indices[0]
+        if deviations[most_deviating_index] < 0:
+            target_value = min_percentages[most_deviating_index] * sum_elements
+        else:
+            target_value = max_percentages[most_deviating_index] * sum_elements
+        elements[most_deviating_index] = target_value
+        iterations += 1
+    return elements
+
+
+def make_universe(rng, n, k=100):
+    ''' values and share caps shaped like CSGOSkins.get_caps(k=...) output '''
+    avg = rng.dirichlet(np.ones(n))
+    std = avg * rng.uniform(0.05, 0.4, n)
+    multiplier = np.exp(-k * avg)
+    lower = np.maximum(avg - multiplier * std, 0)
+    upper = avg + multiplier * std
+    values = np.maximum(avg + rng.uniform(0.5, 3) * std * rng.standard_normal(n), 1e-9) * 1e6
+    return values, lower, upper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--skins', type=int, default=10000)
+    parser.add_argument('--universes', type=int, default=3)
+    parser.add_argument('--max-iter', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for u in range(args.universes):
+        values, lower, upper = make_universe(rng, args.skins)
+
+        start = time.perf_counter()
+        legacy = legacy_adjust_share(values.tolist(), lower.tolist(), upper.tolist(), args.max_iter)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        solution = solve_shares(values, lower, upper, max_passes=args.max_iter)
+        solver_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        project_shares(values, lower, upper)
+        projection_time = time.perf_counter() - start
+
+        diff = abs(solution.total - sum(legacy)) / sum(legacy)
+        print(f'universe {u}: {args.skins} skins | legacy {legacy_time:.3f}s | '
+              f'solver {solver_time:.4f}s ({legacy_time / solver_time:.0f}x) | '
+              f'projection alone {projection_time:.4f}s | passes {solution.passes} | residual {solution.residual:.1e} | '
+              f'projected {solution.projected} | index diff {diff:.1e}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+from typing import Any, Dict, Optional, Tuple
+
+from eth_account import Account
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+
+class ChainClient:
+    """
+    The chain operations the publisher needs, on behalf of one sending
+    account. Implemented by `Web3Client` (a JSON-RPC node) and
+    `chain.local_chain.LocalChain` (an in-process stand-in for tests and
+    dry runs).
+
+    Attributes:
+        address (str): Address transactions are sent from.
+
+    Methods:
+        get_transaction_count() -> int:
+            Nonce of the next transaction, counting pending ones.
+        get_fees() -> Tuple[int, int]:
+            Current max fee and priority fee per gas, in wei.
+        call(tx: dict) -> bytes:
+            Executes a read-only call.
+        send_transaction(tx: dict) -> str:
+            Signs and broadcasts a transaction, returning its hash.
+        get_receipt(tx_hash: str) -> Optional[dict]:
+            Receipt of a mined transaction, None while pending.
+    """
+    address: str
+
+    def get_transaction_count(self) -> int:
+        raise NotImplementedError
+
+    def get_fees(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def call(self, tx: Dict[str, Any]) -> bytes:
+        raise NotImplementedError
+
+    def send_transaction(self, tx: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class Web3Client(ChainClient):
+    """
+    `ChainClient` of a JSON-RPC node; transactions are signed locally.
+    """
+
+    def __init__(self, rpc_url: str, private_key: str) -> None:
+        """
+        Parameters:
+            rpc_url (str): URL of the node, e.g. constants.ARBITRUM_GOERLI_RPC.
+            private_key (str): Key of the sending (oracle) account.
+        """
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.account = Account.from_key(private_key)
+        self.address = self.account.address
+        self._chain_id: Optional[int] = None
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def get_transaction_count(self) -> int:
+        return self.w3.eth.get_transaction_count(self.address, 'pending')
+
+    def get_fees(self) -> Tuple[int, int]:
+        # Headroom for the base fee doubling before the transaction is mined
+        base_fee = self.w3.eth.get_block('latest')['baseFeePerGas']
+        priority_fee = self.w3.eth.max_priority_fee
+        return 2 * base_fee + priority_fee, priority_fee
+
+    def call(self, tx: Dict[str, Any]) -> bytes:
+        return bytes(self.w3.eth.call(tx))
+
+    def send_transaction(self, tx: Dict[str, Any]) -> str:
+        tx = dict(tx, chainId=self.chain_id, **{'from': self.address})
+        signed = self.account.sign_transaction(tx)
+        return self.w3.eth.send_raw_transaction(signed.raw_transaction).to_0x_hex()
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            return dict(self.w3.eth.get_transaction_receipt(tx_hash))
+        except TransactionNotFound:
+            return None
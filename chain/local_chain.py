@@ -0,0 +1,140 @@
+import itertools
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from eth_abi import encode
+from eth_utils import keccak
+from web3 import Web3
+
+from chain.client import ChainClient
+import constants as c
+
+ORACLE_ADDRESS = '0x' + '11' * 20
+
+
+class LocalChain(ChainClient):
+    """
+    In-process stand-in for an EVM node running one FluxAggregator, for
+    tests and dry runs of the publisher. Mimics the node behaviour the
+    publisher depends on:
+
+    - transactions sit in a mempool until `mine()` (or at once with
+      `auto_mine`), and are only mined in nonce order while their max fee
+      covers the base fee, so raising `base_fee` leaves them stuck;
+    - a transaction reusing a pending nonce replaces it only if it bumps
+      both fees by at least 10%, and a mined nonce is rejected;
+    - `submit` must be for the next round, otherwise it reverts.
+
+    Transactions are not signed; the chain acts as the oracle account.
+
+    Attributes:
+        address (str): Oracle account transactions are sent from.
+        base_fee (int): Current base fee per gas, in wei.
+        priority_fee (int): Suggested priority fee per gas, in wei.
+        auto_mine (bool): Mine a block after every transaction.
+        clock (Callable[[], float]): Source of block timestamps.
+        rounds (Dict[int, Tuple[int, int]]): Answer and timestamp of every
+            round.
+        mined (list): Mined transactions, in order.
+    """
+
+    def __init__(self, decimals: int = 8, base_fee: int = 10**8,
+                 priority_fee: int = 10**7, auto_mine: bool = True,
+                 clock: Callable[[], float] = time.time,
+                 address: str = ORACLE_ADDRESS,
+                 contract_address: str = c.TRANSLUCENT_GAUSS_ARBITRUM_GOERLI,
+                 abi: str = c.TRANSLUCENT_FLUX_AGGREGATOR) -> None:
+        self.address = Web3.to_checksum_address(address)
+        self.contract = Web3().eth.contract(
+            address=Web3.to_checksum_address(contract_address), abi=abi
+        )
+        self.decimals = decimals
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+        self.auto_mine = auto_mine
+        self.clock = clock
+        self.nonce = 0                  # next nonce to be mined
+        self.mempool: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+        self.receipts: Dict[str, Dict[str, Any]] = {}
+        self.rounds: Dict[int, Tuple[int, int]] = {}
+        self.mined = []
+        self._hashes = itertools.count()
+
+    @property
+    def latest_round(self) -> int:
+        return max(self.rounds, default=0)
+
+    def get_transaction_count(self) -> int:
+        nonce = self.nonce
+        while nonce in self.mempool:
+            nonce += 1
+        return nonce
+
+    def get_fees(self) -> Tuple[int, int]:
+        return 2 * self.base_fee + self.priority_fee, self.priority_fee
+
+    def call(self, tx: Dict[str, Any]) -> bytes:
+        fn, args = self.contract.decode_function_input(tx['data'])
+        outputs = [o['type'] for o in fn.abi['outputs']]
+        answer, updated_at = self.rounds.get(self.latest_round, (0, 0))
+        if fn.fn_name == 'decimals':
+            values = [self.decimals]
+        elif fn.fn_name in ('latestAnswer', 'latestTimestamp', 'latestRound'):
+            values = [{'latestAnswer': answer, 'latestTimestamp': updated_at,
+                       'latestRound': self.latest_round}[fn.fn_name]]
+        elif fn.fn_name == 'latestRoundData':
+            round_id = self.latest_round
+            values = [round_id, answer, updated_at, updated_at, round_id]
+        elif fn.fn_name == 'oracleRoundState':
+            eligible = args['_oracle'] == self.address
+            values = [eligible, self.latest_round + 1, answer, 0, 0, 0, 1, 0]
+        else:
+            raise NotImplementedError(f'LocalChain does not implement {fn.fn_name}')
+        return encode(outputs, values)
+
+    def send_transaction(self, tx: Dict[str, Any]) -> str:
+        nonce = tx['nonce']
+        if nonce < self.nonce:
+            raise ValueError('nonce too low')
+        if nonce in self.mempool:
+            _, pending = self.mempool[nonce]
+            if (tx['maxFeePerGas'] < pending['maxFeePerGas'] * 1.1
+                    or tx['maxPriorityFeePerGas'] < pending['maxPriorityFeePerGas'] * 1.1):
+                raise ValueError('replacement transaction underpriced')
+        tx_hash = '0x' + keccak(text=f'tx-{next(self._hashes)}').hex()
+        self.mempool[nonce] = (tx_hash, tx)
+        if self.auto_mine:
+            self.mine()
+        return tx_hash
+
+    def mine(self) -> int:
+        """
+        Mines one block of every includable pending transaction.
+
+        Returns:
+            int: Number of transactions mined.
+        """
+        block_time = int(self.clock())
+        count = 0
+        while self.nonce in self.mempool:
+            tx_hash, tx = self.mempool[self.nonce]
+            if tx['maxFeePerGas'] < self.base_fee:
+                break   # stuck until replaced or the base fee drops
+            del self.mempool[self.nonce]
+            self.receipts[tx_hash] = {
+                'transactionHash': tx_hash, 'status': self._execute(tx, block_time)
+            }
+            self.mined.append(tx)
+            self.nonce += 1
+            count += 1
+        return count
+
+    def _execute(self, tx: Dict[str, Any], block_time: int) -> int:
+        fn, args = self.contract.decode_function_input(tx['data'])
+        if fn.fn_name != 'submit' or args['_roundId'] != self.latest_round + 1:
+            return 0
+        self.rounds[args['_roundId']] = (args['_submission'], block_time)
+        return 1
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        return self.receipts.get(tx_hash)
@@ -0,0 +1,290 @@
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from eth_abi import decode
+from web3 import Web3
+
+from chain.client import ChainClient
+from feeds import data_feed
+import constants as c
+
+
+@dataclass(frozen=True)
+class PublishPolicy:
+    """
+    When and how a feed value is published on chain.
+
+    Attributes:
+        deviation (float): Publish once the value moves by this fraction of
+            the last published value.
+        heartbeat (float): Publish once the last published value is this
+            many seconds old, even without deviation.
+        replace_after (float): Seconds a transaction may stay pending before
+            it is re-sent with higher fees.
+        fee_bump (float): Minimum fractional fee increase of a replacement;
+            nodes reject replacements bumping fees by less than 10%.
+        max_fee_per_gas (int): Fees are never raised above this, in wei.
+        gas_limit (int): Gas limit of a submission.
+    """
+    deviation: float = 0.005
+    heartbeat: float = 3600.0
+    replace_after: float = 60.0
+    fee_bump: float = 0.125
+    max_fee_per_gas: int = 100 * 10**9
+    gas_limit: int = 300_000
+
+
+DEFAULT_POLICY = PublishPolicy()
+
+
+class NonceManager:
+    """
+    Hands out the sending account's nonces locally, so consecutive
+    transactions don't each wait for the node's pending count. Synced from
+    the chain on first use and after any failed send.
+    """
+
+    def __init__(self, client: ChainClient) -> None:
+        self.client = client
+        self._nonce: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def next(self) -> int:
+        with self._lock:
+            if self._nonce is None:
+                self._nonce = self.client.get_transaction_count()
+            nonce = self._nonce
+            self._nonce += 1
+            return nonce
+
+    def reset(self) -> None:
+        with self._lock:
+            self._nonce = None
+
+
+@dataclass
+class PendingSubmission:
+    """
+    A submission sent but not yet mined. Replacements reuse the nonce, so
+    any of `hashes` may be the one that gets mined; each maps to the value
+    it submitted and when it was sent.
+    """
+    nonce: int
+    value: float
+    round_id: int
+    max_fee: int
+    priority_fee: int
+    sent_at: float
+    hashes: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+
+
+class Publisher:
+    """
+    Publishes a feed's values to a FluxAggregator contract, gated by
+    deviation and heartbeat so a transaction is only sent when the on-chain
+    value is off by more than `policy.deviation` or older than
+    `policy.heartbeat`.
+
+    At most one submission is in flight: a stuck one is re-sent with bumped
+    fees after `policy.replace_after`, and a new value deviating from the
+    pending one replaces it at the same nonce.
+
+    Attributes:
+        client (ChainClient): Chain the contract lives on.
+        policy (PublishPolicy): Gating and fee settings.
+        pending (PendingSubmission): Submission in flight, if any.
+        sent (int): Transactions sent, including replacements.
+
+    Methods:
+        update(value: float, now: float = None) -> Optional[str]:
+            Publishes the value if the policy requires it.
+        should_publish(value: float, now: float) -> bool:
+            Whether the policy requires publishing the value.
+        attach(feed):
+            Publishes every new data point of a feed.
+    """
+
+    def __init__(self, client: ChainClient,
+                 contract_address: str = c.TRANSLUCENT_GAUSS_ARBITRUM_GOERLI,
+                 policy: PublishPolicy = DEFAULT_POLICY,
+                 abi: str = c.TRANSLUCENT_FLUX_AGGREGATOR) -> None:
+        self.client = client
+        self.policy = policy
+        self.contract = Web3().eth.contract(
+            address=Web3.to_checksum_address(contract_address), abi=abi
+        )
+        self.nonces = NonceManager(client)
+        self.pending: Optional[PendingSubmission] = None
+        self.sent = 0
+        self._decimals: Optional[int] = None
+        self._last_value: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self._loaded = False
+        self._feed = None
+        self._lock = threading.Lock()
+
+    def _call(self, fn_name: str, *args) -> tuple:
+        outputs = self.contract.get_function_by_name(fn_name).abi['outputs']
+        data = self.client.call({
+            'to': self.contract.address,
+            'data': self.contract.encode_abi(fn_name, args=list(args)),
+        })
+        return decode([o['type'] for o in outputs], data)
+
+    @property
+    def decimals(self) -> int:
+        if self._decimals is None:
+            self._decimals = self._call('decimals')[0]
+        return self._decimals
+
+    def _load_last_published(self) -> None:
+        # The on-chain answer, so the heartbeat survives restarts
+        _, answer, _, updated_at, _ = self._call('latestRoundData')
+        if updated_at:
+            self._last_value = answer / 10**self.decimals
+            self._last_time = float(updated_at)
+
+    def should_publish(self, value: float, now: float) -> bool:
+        """
+        Whether the policy requires publishing the value.
+
+        Parameters:
+            value (float): Latest feed value.
+            now (float): Current unix time.
+
+        Returns:
+            bool: True if the value deviates from the pending (or else last
+                published) value, or nothing is pending and the last
+                published value is older than the heartbeat.
+        """
+        if self.pending is not None:
+            return self._deviates(value, self.pending.value)
+        if self._last_value is None:
+            return True
+        return (self._deviates(value, self._last_value)
+                or now - self._last_time >= self.policy.heartbeat)
+
+    def _deviates(self, value: float, reference: float) -> bool:
+        if reference == 0:
+            return value != 0
+        return abs(value - reference) / abs(reference) >= self.policy.deviation
+
+    def update(self, value: float, now: Optional[float] = None) -> Optional[str]:
+        """
+        Tracks the pending submission and publishes the value if the policy
+        requires it. Meant to be called on every heartbeat of the feed.
+
+        Parameters:
+            value (float): Latest feed value.
+            now (float, optional): Current unix time. Defaults to now.
+
+        Returns:
+            Optional[str]: Hash of the transaction sent, if any.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._loaded:
+                self._load_last_published()
+                self._loaded = True
+            self._check_pending()
+            if self.pending is not None and now - self.pending.sent_at >= self.policy.replace_after:
+                # stuck: re-send the newer of the pending and latest value
+                if not self._deviates(value, self.pending.value):
+                    value = self.pending.value
+                return self._send(value, now, replace=True)
+            if self.should_publish(value, now):
+                return self._send(value, now, replace=self.pending is not None)
+            return None
+
+    def _check_pending(self) -> None:
+        if self.pending is None:
+            return
+        for tx_hash in self.pending.hashes:
+            receipt = self.client.get_receipt(tx_hash)
+            if receipt is None:
+                continue
+            if receipt['status'] == 1:
+                # the mined one may be an earlier value than the latest sent
+                self._last_value, self._last_time = self.pending.hashes[tx_hash]
+            else:
+                print(f"Warning: submission {tx_hash} of round "
+                      f"{self.pending.round_id} reverted.")
+            self.pending = None
+            return
+
+    def _bumped(self, fee: int) -> int:
+        # rounded up, so a replacement is never short of the bump by a wei
+        return math.ceil(fee * (1 + self.policy.fee_bump))
+
+    def _fees(self, replace: bool) -> tuple:
+        max_fee, priority_fee = self.client.get_fees()
+        if replace:
+            max_fee = max(max_fee, self._bumped(self.pending.max_fee))
+            priority_fee = max(priority_fee, self._bumped(self.pending.priority_fee))
+        return min(max_fee, self.policy.max_fee_per_gas), priority_fee
+
+    def _send(self, value: float, now: float, replace: bool) -> Optional[str]:
+        max_fee, priority_fee = self._fees(replace)
+        if priority_fee > max_fee or (
+                replace and max_fee < self._bumped(self.pending.max_fee)):
+            print(f"Warning: not publishing {value}, fees would exceed "
+                  f"max_fee_per_gas ({self.policy.max_fee_per_gas} wei).")
+            return None
+
+        if replace:
+            nonce, round_id = self.pending.nonce, self.pending.round_id
+        else:
+            eligible, round_id = self._call('oracleRoundState', self.client.address, 0)[:2]
+            if not eligible:
+                print(f"Warning: {self.client.address} is not eligible to "
+                      f"submit round {round_id}.")
+                return None
+            nonce = self.nonces.next()
+
+        tx = {
+            'to': self.contract.address,
+            'data': self.contract.encode_abi(
+                'submit', args=[round_id, round(value * 10**self.decimals)]
+            ),
+            'nonce': nonce,
+            'gas': self.policy.gas_limit,
+            'maxFeePerGas': max_fee,
+            'maxPriorityFeePerGas': priority_fee,
+        }
+        try:
+            tx_hash = self.client.send_transaction(tx)
+        except Exception as e:
+            print("Error occurred while publishing on chain:", str(e))
+            # The local nonce may be off, e.g. after a transaction sent elsewhere
+            self.nonces.reset()
+            return None
+
+        self.sent += 1
+        if replace:
+            self.pending.hashes[tx_hash] = (value, now)
+            self.pending.value = value
+            self.pending.max_fee, self.pending.priority_fee = max_fee, priority_fee
+            self.pending.sent_at = now
+        else:
+            self.pending = PendingSubmission(
+                nonce, value, round_id, max_fee, priority_fee, now, {tx_hash: (value, now)}
+            )
+        return tx_hash
+
+    def attach(self, feed) -> None:
+        """
+        Publishes every new data point of a feed, on the feed's thread.
+
+        Parameters:
+            feed (DataFeed): A numeric feed.
+        """
+        self._feed = feed
+        data_feed.listeners.append(self._on_data_point)
+
+    def _on_data_point(self, feed) -> None:
+        if feed is self._feed:
+            time_stamp, value = feed.DATAPOINT_BUFFER.latest()
+            self.update(value, time_stamp)
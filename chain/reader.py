@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from web3 import Web3
+
+BLOCK_POLL_INTERVAL = 1.0   # seconds a block number is trusted before re-checking
+
+
+class Call(NamedTuple):
+    """
+    A read-only contract call.
+
+    Attributes:
+        contract (Contract): web3 contract.
+        fn_name (str): Function name, e.g. 'latestAnswer'.
+        args (tuple): Function arguments.
+        immutable (bool): The result never changes (e.g. 'decimals') and is
+            cached forever; otherwise it is cached for the current block.
+    """
+    contract: Any
+    fn_name: str
+    args: tuple = ()
+    immutable: bool = False
+
+
+class ChainReader:
+    """
+    Read layer over a web3 connection. Contract objects and immutable
+    results are cached forever, other results for the block they were read
+    at, and all calls missing from the cache go out as one JSON-RPC batch.
+
+    Per-block results are reused for `block_poll_interval` seconds. After
+    that, the next read re-checks the block number in the same batch as its
+    calls, so a read costs at most one round trip; a new block drops the
+    per-block cache.
+
+    Attributes:
+        w3 (Web3): Connection to the node.
+        requests (int): JSON-RPC round trips made (batches count once).
+
+    Methods:
+        contract(address: str, abi) -> Contract:
+            Cached contract object.
+        contract_from_files(address_file: str, abi_file: str) -> Contract:
+            Cached contract object of an address file and an ABI file.
+        block_number() -> int:
+            Latest block number.
+        read(contract, fn_name: str, *args, immutable: bool = False) -> Any:
+            Result of a single call.
+        read_many(calls: List[Call]) -> List[Any]:
+            Results of several calls, in one batch.
+    """
+
+    def __init__(self, w3: Web3, block_poll_interval: float = BLOCK_POLL_INTERVAL) -> None:
+        self.w3 = w3
+        # web3 otherwise re-fetches eth_chainId around every eth_call
+        w3.provider.cache_allowed_requests = True
+        self.block_poll_interval = block_poll_interval
+        self.requests = 0
+        self._contracts: Dict[Tuple[str, str], Any] = {}
+        self._contract_files: Dict[Tuple[str, str], Any] = {}
+        self._immutable: Dict[tuple, Any] = {}
+        self._block: Optional[int] = None
+        self._block_checked = 0.0
+        self._per_block: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def contract(self, address: str, abi) -> Any:
+        """
+        Cached contract object.
+
+        Parameters:
+            address (str): Contract address.
+            abi (str or list): Contract ABI, as JSON or decoded.
+
+        Returns:
+            Contract: web3 contract.
+        """
+        abi_json = json.dumps(json.loads(abi) if isinstance(abi, str) else abi, sort_keys=True)
+        key = (Web3.to_checksum_address(address), abi_json)
+        with self._lock:
+            if key not in self._contracts:
+                self._contracts[key] = self.w3.eth.contract(address=key[0], abi=abi_json)
+            return self._contracts[key]
+
+    def contract_from_files(self, address_file: str, abi_file: str) -> Any:
+        """
+        Cached contract object; each pair of files is read once.
+
+        Parameters:
+            address_file (str): Text file holding the contract address.
+            abi_file (str): JSON file holding the contract ABI.
+
+        Returns:
+            Contract: web3 contract.
+        """
+        key = (address_file, abi_file)
+        if key not in self._contract_files:
+            with open(address_file) as f:
+                address = f.read().strip()
+            with open(abi_file) as f:
+                abi = json.load(f)
+            self._contract_files[key] = self.contract(address, abi)
+        return self._contract_files[key]
+
+    def block_number(self) -> int:
+        """
+        Latest block number, re-checked at most every block_poll_interval.
+        """
+        now = time.monotonic()
+        if self._block is None or now - self._block_checked >= self.block_poll_interval:
+            block = self.w3.eth.block_number
+            self.requests += 1
+            self._set_block(block, now)
+        return self._block
+
+    def _set_block(self, block: int, checked: float) -> None:
+        with self._lock:
+            if block != self._block:
+                self._per_block.clear()
+                self._block = block
+            self._block_checked = checked
+
+    def read(self, contract, fn_name: str, *args, immutable: bool = False) -> Any:
+        """
+        Result of a single call, see read_many.
+        """
+        return self.read_many([Call(contract, fn_name, args, immutable)])[0]
+
+    def read_many(self, calls: List[Call]) -> List[Any]:
+        """
+        Results of several calls. Cached results are reused, the rest are
+        read at the latest block in one JSON-RPC batch. When the block is due
+        a re-check, eth_blockNumber goes out in that same batch and the
+        per-block results are read again and cached for the returned block.
+
+        Parameters:
+            calls (List[Call]): Calls to make.
+
+        Returns:
+            List[Any]: Results, in the order of calls.
+        """
+        now = time.monotonic()
+        results: List[Any] = [None] * len(calls)
+        missing = []
+        with self._lock:
+            # per-block results are trusted until the block is due a re-check
+            fresh = (self._block is not None
+                     and now - self._block_checked < self.block_poll_interval)
+            for i, call in enumerate(calls):
+                key = (call.contract.address, call.fn_name, tuple(call.args))
+                cache = self._immutable if call.immutable else self._per_block
+                if key in cache and (call.immutable or fresh):
+                    results[i] = cache[key]
+                else:
+                    missing.append((i, key, cache))
+        if not missing:
+            return results
+
+        check_block = not all(calls[i].immutable for i, _, _ in missing)
+        fns = [
+            calls[i].contract.get_function_by_name(calls[i].fn_name)(*calls[i].args)
+            for i, _, _ in missing
+        ]
+        if len(fns) == 1 and not check_block:
+            values = [fns[0].call()]
+        else:
+            with self.w3.batch_requests() as batch:
+                if check_block:
+                    batch.add(self.w3.eth.get_block_number())
+                for fn in fns:
+                    batch.add(fn)
+                values = batch.execute()
+        self.requests += 1
+
+        block = None
+        if check_block:
+            block, values = values[0], values[1:]
+            self._set_block(block, now)
+        with self._lock:
+            for (i, key, cache), value in zip(missing, values):
+                # a newer block may have cleared the cache meanwhile
+                if cache is self._immutable or block == self._block:
+                    cache[key] = value
+                results[i] = value
+        return results
@@ -4,7 +4,13 @@ from datetime import datetime
 from pathlib import Path
 
 DEBUG = True #show debug messages in CLI
-WEBSERVER_THREADS = 1
+WEBSERVER_THREADS = 1 #event loops serving endpoint.py, sharing one listening socket
+WEBSERVER_HOST = '127.0.0.1'
+WEBSERVER_PORT = 16556
+SUBSCRIBER_QUEUE_SIZE = 100 #undelivered data points before a stream subscriber is evicted
+SSE_PING_INTERVAL = 15 #seconds between keep-alive comments on idle streams
+SCHEDULER_WORKERS = 8 #size of the worker pool shared by all feeds
+DATAPOINT_BUFFER_CAPACITY = 100_000 #data points of history kept in memory per feed
 
 HEADER = '\033[95m'
 OKBLUE = '\033[94m'
@@ -22,6 +28,10 @@ TEST_DIR = 'test'
 LOGGING_FILE = 'data_feeds.db'
 DATEFORMAT = '%Y-%m-%d %H:%M:%S.%f %z'
 DATA_EXT = '.csv'
+DATAPOINT_LOG_EXT = '.log'
+DATAPOINT_LOG_SEGMENT_RECORDS = 65_536 #records (16 bytes each) per log segment file
+DATAPOINT_LOG_FSYNC_RECORDS = 64 #fsync the log after this many records...
+DATAPOINT_LOG_FSYNC_INTERVAL = 5 #...or this many seconds, whichever comes first
 LINE_START = '>'
 
 FEED_NAME = 'feed_name'
@@ -61,6 +71,33 @@ def status_message(feed):
     x = feed.ACTIVE
     return f'{get_color(x)}{feed.NAME}{ENDC} with id {feed.ID} is {get_word(x)}active, with {feed.COUNT} data points served since {get_starttime_string(feed)}'
 
+def endpoint_message(endpoint):
+    host, port = endpoint.address
+    return f'{OKBLUE}Serving latest data points on http://{host}:{port}/feeds{ENDC}'
+
+def broadcaster_message(broadcaster):
+    return (f'subscribers: {broadcaster.subscribers}, data points published: {broadcaster.published}, '
+            f'slow subscribers evicted: {broadcaster.evicted}')
+
+def breaker_status_message(source, breaker):
+    x = breaker.state == 'closed'
+    return (f'{get_color(x)}{source}{ENDC} circuit breaker is {breaker.state}, '
+            f'{breaker.failures} consecutive failures, {breaker.skipped} calls skipped')
+
+def lateness_message(name, stats):
+    return (f'{name} ticks: {stats.ticks}, skipped: {stats.skipped}, errors: {stats.errors}, '
+            f'lateness last/mean/max: {stats.last_lateness:.3f}/{stats.mean_lateness:.3f}/{stats.max_lateness:.3f}s')
+
+def connection_pool_message(host, stats):
+    return f'{host} requests: {stats["requests"]}, connections opened: {stats["connections"]}, reused: {stats["reused"]}'
+
+def rate_limit_message(bucket, stats):
+    return f'{bucket} calls: {stats["calls"]}, waited: {stats["waited"]:.1f}s'
+
+def response_cache_message(source, stats):
+    return (f'{source} hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'revalidated: {stats["revalidated"]}, coalesced: {stats["coalesced"]}')
+
 #################### COINGECKo####################
 
 PRICE = 'current_price'
@@ -0,0 +1,285 @@
+#stdlib
+import asyncio
+import json
+import socket
+import threading
+
+#third party
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+#our stuff
+from all_feeds import all_feeds
+from feeds import data_feed
+import constants as c
+import prometheus_metrics     #registers the metrics served on /metrics
+
+JSON = 'application/json'
+EVENT_STREAM = 'text/event-stream'
+
+
+def get_feeds(names):
+    ''' feed classes for a comma separated list of names (all feeds if empty) '''
+    if not names:
+        return list(all_feeds.values())
+    return [all_feeds[name] for name in names.split(',')]
+
+
+def not_found(name):
+    return web.json_response({'error': f'unknown feed: {name}'}, status=404)
+
+
+def respond(request, etag, body):
+    ''' 304 if the client already has this etag, else the (pre-serialized) body '''
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers={'ETag': etag})
+    return web.Response(body=body, content_type=JSON, headers={'ETag': etag})
+
+
+async def get_feed(request):
+    ''' GET /feeds/{name}: latest data point of one feed '''
+    name = request.match_info['name']
+    feed = all_feeds.get(name)
+    if feed is None:
+        return not_found(name)
+    return respond(request, *feed.get_response())
+
+
+async def get_batch(request):
+    ''' GET /feeds?names=a,b: latest data points of many (default all) feeds,
+    as an object keyed by feed name; built from the per-feed bodies '''
+    try:
+        feeds = get_feeds(request.query.get('names'))
+    except KeyError as e:
+        return not_found(e.args[0])
+    responses = [(feed.NAME, *feed.get_response()) for feed in feeds]
+    etag = '"' + '.'.join(etag.strip('"') for _, etag, _ in responses) + '"'
+    body = b'{' + b','.join(
+        json.dumps(name).encode() + b':' + body for name, _, body in responses
+    ) + b'}'
+    return respond(request, etag, body)
+
+
+def format_event(feed, etag, body):
+    ''' server-sent event of a data point, built once and sent to every subscriber '''
+    return f'id: {etag.strip(chr(34))}\nevent: {feed.NAME}\ndata: '.encode() + body + b'\n\n'
+
+
+class Subscription:
+    ''' a stream client: its feed filter and bounded queue of pending events '''
+
+    def __init__(self, names=None, ids=None, queue_size=c.SUBSCRIBER_QUEUE_SIZE):
+        self.names = names          #None: no filter by name
+        self.ids = ids              #None: no filter by ID
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.transport = None
+        self.evicted = False
+
+    def wants(self, feed):
+        if self.names is None and self.ids is None:
+            return True
+        return ((self.names is not None and feed.NAME in self.names)
+                or (self.ids is not None and feed.ID in self.ids))
+
+    def close(self):
+        ''' end the stream (called on the subscription's loop) '''
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    ''' Fans each new data point out to the stream subscribers.
+
+    publish() runs on the feed's thread: the event is formatted once and
+    handed to every serving loop in a single callback, which puts it on the
+    queues of the subscribers that want it. A subscriber whose queue is full
+    is not keeping up and is evicted (its connection aborted), so a slow
+    client never holds back the feed or the other subscribers.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}    #loop -> set of Subscriptions
+        self.published = 0
+        self.evicted = 0
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.setdefault(subscription.loop, set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.get(subscription.loop, set()).discard(subscription)
+
+    @property
+    def subscribers(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+    def publish(self, feed):
+        ''' DataFeed listener: push the feed's latest data point to its subscribers '''
+        event = format_event(feed, *feed.get_response())
+        with self._lock:
+            deliveries = [
+                (loop, [sub for sub in subs if sub.wants(feed)])
+                for loop, subs in self._subscriptions.items()
+            ]
+            self.published += 1     #feeds publish from their own threads
+        for loop, subs in deliveries:
+            if subs:
+                try:
+                    loop.call_soon_threadsafe(self._deliver, subs, event)
+                except RuntimeError:
+                    pass    #loop already closed
+
+    def _deliver(self, subs, event):
+        for sub in subs:
+            if sub.evicted:
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._evict(sub)
+
+    def _evict(self, sub):
+        sub.evicted = True
+        with self._lock:
+            self.evicted += 1       #each serving loop evicts on its own thread
+        sub.close()
+        if sub.transport is not None:
+            sub.transport.abort()   #unblocks a write stuck on a stalled client
+
+    def close(self):
+        ''' end every stream of the calling loop '''
+        with self._lock:
+            subs = list(self._subscriptions.pop(asyncio.get_running_loop(), ()))
+        for sub in subs:
+            sub.close()
+
+
+BROADCASTER = web.AppKey('broadcaster', Broadcaster)
+
+
+def parse_ids(ids):
+    return {int(i) for i in ids.split(',')} if ids else None
+
+
+async def stream(request):
+    ''' GET /stream?names=a,b&ids=1,2: server-sent events of every new data
+    point of the matching (default all) feeds, starting with the latest ones '''
+    names = request.query.get('names')
+    try:
+        ids = parse_ids(request.query.get('ids'))
+    except ValueError:
+        return web.json_response({'error': 'ids must be integers'}, status=400)
+    sub = Subscription(set(names.split(',')) if names else None, ids)
+    sub.transport = request.transport
+
+    response = web.StreamResponse(headers={'Content-Type': EVENT_STREAM, 'Cache-Control': 'no-cache'})
+    await response.prepare(request)
+    broadcaster = request.app[BROADCASTER]
+    broadcaster.subscribe(sub)
+    try:
+        for feed in all_feeds.values():
+            if sub.wants(feed) and len(feed.DATAPOINT_BUFFER):
+                await response.write(format_event(feed, *feed.get_response()))
+        while True:
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), c.SSE_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                event = b': ping\n\n'
+            if event is None:
+                break
+            await response.write(event)
+    except ConnectionError:
+        pass    #client went away, or was evicted
+    finally:
+        broadcaster.unsubscribe(sub)
+    return response
+
+
+async def metrics(request):
+    ''' GET /metrics: Prometheus scrape; frame collectors build their samples now '''
+    return web.Response(body=generate_latest(), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+
+def create_app(broadcaster):
+    app = web.Application()
+    app[BROADCASTER] = broadcaster
+    app.router.add_get('/feeds', get_batch)
+    app.router.add_get('/feeds/{name}', get_feed)
+    app.router.add_get('/stream', stream)
+    app.router.add_get('/metrics', metrics)
+    return app
+
+
+class Endpoint:
+    ''' HTTP server of the latest data point of every feed in all_feeds,
+    polled via /feeds or pushed to subscribers of /stream.
+
+    Runs `threads` event loops, each in its own daemon thread, all accepting
+    on one shared listening socket, so serving never blocks the CLI or the
+    feeds. Response bodies are serialized by the feeds when a data point is
+    produced (DataFeed.update_response), requests only look them up.
+    '''
+
+    def __init__(self, host=c.WEBSERVER_HOST, port=c.WEBSERVER_PORT,
+                 threads=c.WEBSERVER_THREADS):
+        self.host = host
+        self.port = port
+        self.threads = threads
+        self._sock = None
+        self._servers = []      #(loop, runner, thread)
+        self.broadcaster = Broadcaster()
+
+    @property
+    def address(self):
+        return self._sock.getsockname()[:2] if self._sock else None
+
+    def start(self):
+        self._sock = socket.create_server((self.host, self.port), backlog=1024)
+        self._sock.setblocking(False)
+        data_feed.listeners.append(self.broadcaster.publish)
+        for i in range(self.threads):
+            loop = asyncio.new_event_loop()
+            runner = web.AppRunner(create_app(self.broadcaster), access_log=None)
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._serve, args=(loop, runner, ready),
+                name=f'siwa-endpoint-{i}', daemon=True
+            )
+            thread.start()
+            ready.wait()    #return once every loop is accepting
+            self._servers.append((loop, runner, thread))
+
+    def _serve(self, loop, runner, ready):
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(runner.setup())
+        #each loop owns (and closes) its own duplicate of the listening socket
+        loop.run_until_complete(web.SockSite(runner, self._sock.dup()).start())
+        ready.set()
+        loop.run_forever()
+        loop.close()
+
+    async def _shutdown(self, runner):
+        self.broadcaster.close()    #open streams would hold up the cleanup
+        await runner.cleanup()
+
+    def stop(self):
+        if self.broadcaster.publish in data_feed.listeners:
+            data_feed.listeners.remove(self.broadcaster.publish)
+        for loop, runner, thread in self._servers:
+            asyncio.run_coroutine_threadsafe(self._shutdown(runner), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+        self._servers = []
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(Broadcaster()), host=c.WEBSERVER_HOST,
+                port=c.WEBSERVER_PORT, access_log=None)
@@ -0,0 +1,142 @@
+#stdlib
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+#our stuff
+import constants as c
+from apis import async_utils
+from feeds.scheduler import HeartbeatScheduler, TickStats
+
+logger = logging.getLogger('SQLLogger')
+
+
+class AsyncFeedRuntime:
+    ''' Runs every feed on one asyncio event loop (in a background thread,
+    so the CLI keeps the main thread). The ticks of DataFeeds with a
+    create_new_data_point_async coroutine are awaited on the loop; other
+    blocking DataFeed ticks are sent to a bounded thread pool.
+    Feeds fire on the same wall-clock aligned ticks as the HeartbeatScheduler
+    and the runtime exposes the same add_feed/remove_feed/get_stats interface.
+    '''
+
+    def __init__(self, max_workers=c.SCHEDULER_WORKERS):
+        self.max_workers = max_workers
+        self._tasks = {}                #feed name -> asyncio.Task
+        self._stats = {}                #feed name -> TickStats
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._executor = None
+
+    def add_feed(self, feed):
+        ''' start running feed on the event loop; no-op if already running '''
+        with self._lock:
+            self._ensure_started()
+            self._stats.setdefault(feed.NAME, TickStats())
+        asyncio.run_coroutine_threadsafe(self._add(feed), self._loop).result()
+
+    def remove_feed(self, feed, wait=True):
+        ''' cancel the feed's task; optionally wait for it to finish '''
+        if self._loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._remove(feed), self._loop)
+        if wait:
+            future.result()
+
+    @property
+    def feed_names(self):
+        return list(self._tasks)
+
+    def get_stats(self):
+        ''' snapshot of TickStats for every feed the runtime has seen '''
+        with self._lock:
+            return {name: TickStats(**vars(stats)) for name, stats in self._stats.items()}
+
+    def shutdown(self, wait=True):
+        ''' cancel all feeds, close the shared HTTP session and stop the loop '''
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=wait)
+        self._loop = self._thread = self._executor = None
+
+    def _ensure_started(self):
+        #called with self._lock held
+        if self._loop is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='siwa-feed')
+        self._loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name='siwa-asyncio')
+        self._thread.start()
+
+    async def _add(self, feed):
+        task = self._tasks.get(feed.NAME)
+        if task is None or task.done():
+            self._tasks[feed.NAME] = asyncio.create_task(
+                self._run_feed(feed), name=feed.NAME)
+
+    async def _remove(self, feed):
+        task = self._tasks.pop(feed.NAME, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _shutdown(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await async_utils.close_session()
+
+    @staticmethod
+    def async_tick(feed):
+        ''' the feed's tick as a coroutine function, None if it only has a blocking one '''
+        create = getattr(feed, 'create_new_data_point_async', None)
+        if inspect.iscoroutinefunction(create):
+            async def tick():
+                return await feed.store_data_point_async(await create())
+            return tick
+        return None
+
+    async def _run_feed(self, feed):
+        loop = asyncio.get_running_loop()
+        async_tick = self.async_tick(feed)
+        due = time.time()
+        while feed.ACTIVE:
+            now = time.time()
+            if due > now:
+                await asyncio.sleep(due - now)
+                continue
+            lateness = now - due
+            with self._lock:
+                self._stats[feed.NAME].record(lateness)
+            try:
+                if async_tick is not None:
+                    await async_tick()
+                else:
+                    await loop.run_in_executor(None, feed.tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                with self._lock:
+                    self._stats[feed.NAME].errors += 1
+                logger.exception(f'{feed.NAME} failed to create a new data point')
+            #ticks that passed while this one was running are skipped
+            next_due = HeartbeatScheduler.next_tick(feed.HEARTBEAT, max(due, time.time()))
+            with self._lock:
+                self._stats[feed.NAME].skipped += max(
+                    0, round((next_due - due) / feed.HEARTBEAT) - 1)
+            due = next_due
+        if self._tasks.get(feed.NAME) is asyncio.current_task():
+            del self._tasks[feed.NAME]
@@ -1,5 +1,5 @@
 from feeds.data_feed import DataFeed
-from collections import deque 
+from feeds.ring_buffer import RingBuffer
 from dataclasses import dataclass
 import constants as c
 from numpy import random
@@ -11,13 +11,23 @@ class Brc20Feed(DataFeed):
     NAME = 'brc20'
     ID = 0
     HEARTBEAT = 1
-    DATAPOINT_DEQUE = deque([], maxlen=100)
+    DATAPOINT_BUFFER = RingBuffer(100, dtype=object)  #ticker history responses
+    #created on first use and reused across heartbeats
+    UNISAT_API = None
+    MONGO_CLIENT = None
+
+    @classmethod
+    def get_unisat_api(cls):
+        if cls.UNISAT_API is None:
+            cls.UNISAT_API = UnisatAPI()  # Instantiate the UnisatAPI class.
+        return cls.UNISAT_API
 
     @classmethod
     def connection_db(cls, ticker):
-        # Establish a connection to the MongoDB database.
-        client = pymongo.MongoClient("mongodb://localhost:27017/")
-        db = client["siwa_lite"]  # Select the 'siwa_lite' database.
+        # Establish a connection to the MongoDB database (pooled by pymongo).
+        if cls.MONGO_CLIENT is None:
+            cls.MONGO_CLIENT = pymongo.MongoClient("mongodb://localhost:27017/")
+        db = cls.MONGO_CLIENT["siwa_lite"]  # Select the 'siwa_lite' database.
         collection = db[ticker]  # Select the collection based on the ticker name.
         return collection
     
@@ -32,12 +42,13 @@ class Brc20Feed(DataFeed):
             # "receive",
         ]
 
-        unisat_api = UnisatAPI()  # Instantiate the UnisatAPI class.
+        unisat_api = cls.get_unisat_api()
 
         # Query the best block height from the Unisat API and extract it from the response.
         best_block_height = unisat_api.get_best_block_height().json()["data"]["height"]
-        # Query the list of BRC20 tokens from the Unisat API and extract the token details.
-        brc20_list = unisat_api.get_brc20_list(0, 300).json()["data"]["detail"]
+        # Query the list of BRC20 tokens from the Unisat API; only the first one is used,
+        # so a single item is requested.
+        brc20_list = list(unisat_api.iter_brc20_list(0, 1, max_items=1))
         # Get ticker info for the first BRC20 token in the list.
         brc20_ticker_info = unisat_api.get_brc20_ticker_info(brc20_list[0])
         # Uncomment this line to retrieve the last transaction history for a specific event type (currently commented out).
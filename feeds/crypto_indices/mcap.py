@@ -0,0 +1,88 @@
+from feeds.data_feed import DataFeed, logger
+from feeds.ring_buffer import RingBuffer
+import constants as c
+
+from apis.market_snapshot import MarketSnapshotService
+from apis import async_crypto_api
+from apis.coinmarketcap import CoinMarketCapAPI as coinmarketcap
+from apis.coingecko import CoinGeckoAPI as coingecko
+# from apis.cryptocompare import CryptoCompareAPI as cryptocompare
+from apis.coinpaprika import CoinPaprikaAPI as coinpaprika
+
+#any CryptoAPI subclasses; fetched in parallel, once per tick for all MCAP feeds
+SOURCES = [
+    # cryptocompare,
+    coinpaprika,            #one tickers request since its bulk mode
+    coinmarketcap,
+    coingecko               #pages of 250 coins
+]
+#their asyncio clients, used when the feeds run on the AsyncFeedRuntime
+ASYNC_SOURCES = [
+    # async_crypto_api.AsyncCryptoCompareAPI,
+    async_crypto_api.AsyncCoinPaprikaAPI,
+    async_crypto_api.AsyncCoinMarketCapAPI,
+    async_crypto_api.AsyncCoinGeckoAPI,
+]
+SOURCE_DEADLINE = 60        #seconds to wait for the sources on each fetch
+
+#shared by the MCAP feeds: fetches the largest N of any of them
+snapshots = MarketSnapshotService(
+    SOURCES, deadline=SOURCE_DEADLINE, async_sources=ASYNC_SOURCES)
+
+
+class MCAPIndex(DataFeed):
+    ''' Total market cap of the top N coins, averaged over the sources.
+    Child classes set NAME, ID, N and their own DATAPOINT_BUFFER. '''
+    HEARTBEAT = 180
+    N: int
+    SOURCES_USED = []           #sources that made it into the latest data point
+
+    @classmethod
+    def start(cls):
+        snapshots.register(cls.N)
+        super().start()
+
+    @classmethod
+    def process_source_data_into_siwa_datapoint(cls, snapshot):
+        '''
+            Process data from multiple sources
+        '''
+        totals = snapshot.totals(cls.N)
+        cls.SOURCES_USED = sorted(totals)
+        logger.info(f'{cls.NAME} sources used: {cls.SOURCES_USED or "[none]"}')
+        if sum(totals.values()) == 0:
+            # No source answered: repeat the last data point, if there is one
+            return cls.DATAPOINT_BUFFER[-1] if len(cls.DATAPOINT_BUFFER) else None
+        else:
+            # Take average of values from all sources
+            return sum(totals.values()) / len(totals)
+
+    @classmethod
+    def create_new_data_point(cls):
+        return cls.process_source_data_into_siwa_datapoint(snapshots.get(cls.N))
+
+    @classmethod
+    async def create_new_data_point_async(cls):
+        ''' used instead of create_new_data_point by the AsyncFeedRuntime '''
+        return cls.process_source_data_into_siwa_datapoint(await snapshots.get_async(cls.N))
+
+
+class MCAP10(MCAPIndex):
+    NAME = 'mcap10'
+    ID = 3
+    N = 10
+    DATAPOINT_BUFFER = RingBuffer(c.DATAPOINT_BUFFER_CAPACITY)
+
+
+class MCAP100(MCAPIndex):
+    NAME = 'mcap100'
+    ID = 4
+    N = 100
+    DATAPOINT_BUFFER = RingBuffer(c.DATAPOINT_BUFFER_CAPACITY)
+
+
+class MCAP1000(MCAPIndex):
+    NAME = 'mcap1000'
+    ID = 2
+    N = 1000
+    DATAPOINT_BUFFER = RingBuffer(c.DATAPOINT_BUFFER_CAPACITY)
@@ -1,10 +1,10 @@
 #stdlib
 import os
+import json
 import time
+import asyncio
 import logging
 import typing as tp
-from threading import Lock
-from collections import deque
 from datetime import datetime, timezone
 from dataclasses import dataclass
 
@@ -13,12 +13,18 @@ import pandas as pd
 
 #our stuff
 import constants as c
+from feeds.ring_buffer import RingBuffer
+from feeds.datapoint_log import DatapointLog
 
 #'%(asctime)s:%(thread)d - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('SQLLogger')
 logger.setLevel(logging.INFO)
 logger.propagate = False # TODO determine if undesirable
 
+#callables notified with the feed class after each stored data point,
+#e.g. endpoint.Broadcaster.publish; called on the thread that produced the point
+listeners = []
+
 @dataclass
 class DataFeed:
     ''' The base-level implementation for all data feeds, which should inherit from DataFeed and implement the get_data_point method as required.
@@ -30,20 +36,36 @@ class DataFeed:
     ID: int
     HEARTBEAT: int              #in seconds
     START_TIME: float           #unix timestamp
-    DATAPOINT_DEQUE: deque
+    DATAPOINT_BUFFER: RingBuffer  #timestamped history, see feeds.ring_buffer
 
     #NOTE: the below are default attrs inherited by child classes
     ACTIVE: bool = False
+    PERSIST: bool = True        #log data points to disk (numeric feeds only)
+    DATAPOINT_LOG: tp.Optional[DatapointLog] = None #open while the feed is active
+    RESPONSE: tp.Optional[tuple] = None #(etag, json body) of the latest data point, see endpoint.py
     COUNT: int = 0              #number of data points served since starting
     DATA_KEYS = (c.FEED_NAME, c.TIME_STAMP, c.DATA_POINT)
 
     @classmethod
     def get_data_dir(cls):
-        return c.DATA_PATH / (cls.NAME + c.DATA_EXT)
+        ''' directory of the feed's datapoint log segments '''
+        return c.DATA_PATH / cls.NAME
+
+    @classmethod
+    def persists(cls):
+        return cls.PERSIST and cls.DATAPOINT_BUFFER.dtype.kind in 'fiu'
 
     @classmethod
     def start(cls):
-        ''' flag feed as active so it can start receiving/processing data '''
+        ''' flag feed as active so it can start receiving/processing data;
+        on first start the in-memory buffer is refilled from the datapoint log '''
+        if cls.persists() and cls.DATAPOINT_LOG is None:
+            cls.DATAPOINT_LOG = DatapointLog(cls.get_data_dir())
+            if not len(cls.DATAPOINT_BUFFER):
+                time_stamps, data_points = cls.DATAPOINT_LOG.tail(cls.DATAPOINT_BUFFER.capacity)
+                cls.DATAPOINT_BUFFER.extend(data_points, time_stamps)
+                logger.info(f'{cls.NAME} restored {len(data_points)} data points from its log')
+                cls.update_response()
         cls.START_TIME = time.time()
         cls.ACTIVE = True
 
@@ -53,6 +75,9 @@ class DataFeed:
         for some feeds, this may involve some cleanup, disconnecting a stream etc.
         and would be handled in the overridden stop() method in that specific feed'''
         cls.ACTIVE = False
+        log, cls.DATAPOINT_LOG = cls.DATAPOINT_LOG, None
+        if log is not None:
+            log.close()
 
     @classmethod
     def run(cls):
@@ -61,12 +86,68 @@ class DataFeed:
         in others it may be handled by a library e.g. tweepy (twitter) stream
         in that case there would be an overridden run() method in that feed'''
 
+        #sleep until the next absolute tick rather than a full HEARTBEAT,
+        #so the period does not stretch by the time spent fetching
+        next_tick = time.time()
         while cls.ACTIVE:
-            dp = cls.create_new_data_point()
-            logger.info(f'\nNext data point for {cls.NAME}: {dp}\n')
-            cls.DATAPOINT_DEQUE.append(dp)
-            cls.COUNT += 1
-            time.sleep(cls.HEARTBEAT)
+            cls.tick()
+            next_tick += cls.HEARTBEAT
+            time.sleep(max(0, next_tick - time.time()))
+
+    @classmethod
+    def tick(cls):
+        ''' create, log and store a single data point;
+        called once per heartbeat by run() or by the HeartbeatScheduler '''
+        return cls.store_data_point(cls.create_new_data_point())
+
+    @classmethod
+    def store_data_point(cls, dp):
+        ''' log and store a freshly created data point,
+        stamped with the time it was produced '''
+        if dp is None:
+            logger.warning(f'{cls.NAME} produced no data point, nothing stored')
+            return None
+        logger.info(f'\nNext data point for {cls.NAME}: {dp}\n')
+        time_stamp = time.time()
+        cls.DATAPOINT_BUFFER.append(dp, time_stamp)
+        log = cls.DATAPOINT_LOG
+        if log is not None:
+            #the log's own lock orders this against stop() closing it
+            try:
+                log.append(time_stamp, dp)
+            except ValueError:
+                logger.info(f'{cls.NAME} stopped, data point not logged')
+        cls.COUNT += 1
+        cls.update_response()
+        for listener in listeners:
+            try:
+                listener(cls)
+            except Exception:
+                logger.exception(f'{cls.NAME} data point listener failed')
+        return dp
+
+    @classmethod
+    async def store_data_point_async(cls, dp):
+        ''' store_data_point for feeds on an event loop: the log append
+        (and its fsync) and the listeners run in the loop's default executor
+        so they never block the loop '''
+        stored = asyncio.get_running_loop().run_in_executor(None, cls.store_data_point, dp)
+        try:
+            return await asyncio.shield(stored)
+        except asyncio.CancelledError:
+            #the thread stores it regardless; a cancelled feed waits for it
+            await stored
+            raise
+
+    @classmethod
+    def update_response(cls):
+        ''' serialize the latest data point once, when it is produced, so the
+        endpoint serves the same bytes to every request until the next one '''
+        served = cls.get_most_recently_stored_data_point()
+        #COUNT restarts with the process, the production time tells restarts apart
+        etag = f'"{cls.ID}-{cls.COUNT}-{int((served[c.TIME_STAMP] or 0) * 1000)}"'
+        body = json.dumps(served, default=str).encode()
+        cls.RESPONSE = (etag, body) #swapped in one assignment, readers never see a torn pair
 
     @classmethod
     def create_new_data_point(cls):
@@ -75,11 +156,21 @@ class DataFeed:
 
     @classmethod
     def get_most_recently_stored_data_point(cls):
-        ''' pass '''
-        data_point = cls.DATAPOINT_DEQUE[-1] if len(cls.DATAPOINT_DEQUE) else None
-        to_serve = (cls.NAME, time.time(), data_point)
+        ''' the latest data point with the time it was produced
+        (time stamp and data point are None before the first one) '''
+        latest = cls.DATAPOINT_BUFFER.latest()
+        time_stamp, data_point = latest if latest else (None, None)
+        to_serve = (cls.NAME, time_stamp, data_point)
         return dict(zip(cls.DATA_KEYS, to_serve))
 
+    @classmethod
+    def get_response(cls):
+        ''' (etag, json body) of the latest data point '''
+        #looked up in the class itself, not inherited from a parent feed
+        if cls.__dict__.get('RESPONSE') is None:
+            cls.update_response()
+        return cls.RESPONSE
+
     # @staticmethod
     # def format_data(dp):
     #     timenow =  datetime.now(timezone.utc)
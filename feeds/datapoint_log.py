@@ -0,0 +1,125 @@
+#stdlib
+import os
+import time
+from pathlib import Path
+from threading import Lock
+
+#third party
+import numpy as np
+
+#our stuff
+import constants as c
+
+#one record per data point: 16 bytes, fixed width so segments can be mmapped as arrays
+RECORD = np.dtype([(c.TIME_STAMP, '<f8'), (c.DATA_POINT, '<f8')])
+
+
+class DatapointLog:
+    ''' Append-only binary log of a feed's (timestamp, data point) pairs.
+
+    The log is a directory of fixed-size segments, `<index>.log`, each
+    holding up to `segment_records` records. Appends are written through to
+    the OS immediately and fsynced in batches (every `fsync_records` records
+    or `fsync_interval` seconds, whichever comes first), so a crashed
+    process loses nothing and a power cut at most one batch.
+    Reads memory-map the segments, see tail().
+    '''
+
+    def __init__(self, directory,
+                 segment_records=c.DATAPOINT_LOG_SEGMENT_RECORDS,
+                 fsync_records=c.DATAPOINT_LOG_FSYNC_RECORDS,
+                 fsync_interval=c.DATAPOINT_LOG_FSYNC_INTERVAL):
+        self.directory = Path(directory)
+        self.segment_records = segment_records
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+        self._lock = Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._open_tail_segment()
+
+    def segment_paths(self):
+        ''' segment files, oldest first '''
+        return sorted(self.directory.glob('*' + c.DATAPOINT_LOG_EXT))
+
+    def _segment_path(self, index):
+        return self.directory / f'{index:010d}{c.DATAPOINT_LOG_EXT}'
+
+    def _open_tail_segment(self):
+        paths = self.segment_paths()
+        if not paths:
+            self._open_segment(0)
+            return
+        path = paths[-1]
+        #drop a record torn by a crash mid-write
+        size = path.stat().st_size
+        if size % RECORD.itemsize:
+            os.truncate(path, size - size % RECORD.itemsize)
+        self._index = int(path.stem)
+        self._file = open(path, 'ab')
+        self._records = path.stat().st_size // RECORD.itemsize
+
+    def _open_segment(self, index):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+        self._index = index
+        self._file = open(self._segment_path(index), 'ab')
+        self._records = 0
+
+    def append(self, timestamp, data_point):
+        ''' append one record; rolls over to a new segment when the current one is full '''
+        record = np.array([(timestamp, data_point)], dtype=RECORD).tobytes()
+        with self._lock:
+            if self._file is None:
+                raise ValueError(f'{self.directory} log is closed')
+            if self._records >= self.segment_records:
+                self._open_segment(self._index + 1)
+            self._file.write(record)
+            self._file.flush()
+            self._records += 1
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_records
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def _sync(self):
+        #called with self._lock held
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        ''' fsync any records appended since the last batch '''
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def tail(self, n):
+        ''' (timestamps, data points) arrays of the newest n records, oldest first;
+        reads only the segments that hold them '''
+        chunks = []
+        remaining = n
+        for path in reversed(self.segment_paths()):
+            if remaining <= 0:
+                break
+            records = path.stat().st_size // RECORD.itemsize
+            if not records:
+                continue
+            #an mmap of the segment; only the pages of the tail are read
+            segment = np.memmap(path, dtype=RECORD, mode='r', shape=(records,))
+            chunks.append(np.array(segment[-remaining:]))
+            remaining -= len(chunks[-1])
+            del segment
+        records = np.concatenate(chunks[::-1]) if chunks else np.empty(0, dtype=RECORD)
+        return records[c.TIME_STAMP], records[c.DATA_POINT]
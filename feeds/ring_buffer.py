@@ -0,0 +1,82 @@
+#third party
+import numpy as np
+
+
+class RingBuffer:
+    ''' Fixed-capacity history of (timestamp, value) pairs in preallocated
+    numpy arrays rather than a deque of boxed python objects.
+
+    Every point is written twice, at i and i + capacity, so the latest n
+    points are always one contiguous slice: appends and latest-reads are O(1)
+    and window() returns read-only views without copying.
+    Views alias the buffer and are overwritten once the ring wraps past them;
+    copy them if they must outlive `capacity` further appends.
+    '''
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError('RingBuffer capacity must be at least 1')
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._values = np.empty(2 * capacity, dtype=self.dtype)
+        self._timestamps = np.empty(2 * capacity, dtype=np.float64)
+        self._next = 0          #slot the next point is written to, in [0, capacity)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, value, timestamp):
+        ''' store value produced at unix time `timestamp`, evicting the oldest point if full '''
+        i = self._next
+        self._values[i] = self._values[i + self.capacity] = value
+        self._timestamps[i] = self._timestamps[i + self.capacity] = timestamp
+        self._next = (i + 1) % self.capacity
+        self._len = min(self._len + 1, self.capacity)
+
+    def extend(self, values, timestamps):
+        ''' append many points, oldest first '''
+        values = np.asarray(values, dtype=self.dtype)[-self.capacity:]
+        timestamps = np.asarray(timestamps, dtype=np.float64)[-self.capacity:]
+        for value, timestamp in zip(values, timestamps):
+            self.append(value, timestamp)
+
+    def clear(self):
+        self._next = 0
+        self._len = 0
+
+    def _end(self):
+        #index one past the newest point, in the second copy of the ring
+        return self._next + self.capacity
+
+    def latest(self):
+        ''' (timestamp, value) of the newest point, or None if empty '''
+        if not self._len:
+            return None
+        i = self._end() - 1
+        return float(self._timestamps[i]), self._item(self._values[i])
+
+    def window(self, n=None):
+        ''' read-only (timestamps, values) views of the newest n points (all
+        stored points if n is None), oldest first '''
+        n = self._len if n is None else min(n, self._len)
+        end = self._end()
+        timestamps = self._timestamps[end - n:end]
+        values = self._values[end - n:end]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def __getitem__(self, index):
+        ''' value of the index-th stored point, oldest first; negative indices
+        count from the newest, so buffer[-1] is the latest value '''
+        if not -self._len <= index < self._len:
+            raise IndexError('RingBuffer index out of range')
+        if index < 0:
+            index += self._len
+        return self._item(self._values[self._end() - self._len + index])
+
+    @staticmethod
+    def _item(value):
+        #numpy scalars -> python scalars, so points serialize like before
+        return value.item() if isinstance(value, np.generic) else value
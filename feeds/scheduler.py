@@ -0,0 +1,162 @@
+#stdlib
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+#our stuff
+import constants as c
+
+logger = logging.getLogger('SQLLogger')
+
+
+@dataclass
+class TickStats:
+    ''' per-feed bookkeeping of how punctually the scheduler fired a feed '''
+    ticks: int = 0              #ticks dispatched to the worker pool
+    skipped: int = 0            #ticks dropped because the previous one was still running
+    errors: int = 0             #ticks whose create_new_data_point raised
+    last_lateness: float = 0.0  #seconds between scheduled and actual start
+    max_lateness: float = 0.0
+    total_lateness: float = 0.0
+
+    @property
+    def mean_lateness(self):
+        return self.total_lateness / self.ticks if self.ticks else 0.0
+
+    def record(self, lateness):
+        self.ticks += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+
+
+class HeartbeatScheduler:
+    ''' Single scheduler thread that fires every registered feed on absolute
+    wall-clock ticks (multiples of its HEARTBEAT since the epoch) and hands the
+    work to a bounded worker pool, so a feed's period never includes its fetch
+    time and one process can run many feeds without one thread each.
+    '''
+
+    def __init__(self, max_workers=c.SCHEDULER_WORKERS):
+        self.max_workers = max_workers
+        self._heap = []                 #(due time, seq, feed name, generation)
+        self._feeds = {}                #feed name -> (feed, generation)
+        self._in_flight = {}            #feed name -> Future of the running tick
+        self._stats = {}                #feed name -> TickStats
+        self._seq = itertools.count()
+        self._generations = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    @staticmethod
+    def next_tick(heartbeat, after):
+        ''' first wall-clock aligned tick strictly after `after` '''
+        return (math.floor(after / heartbeat) + 1) * heartbeat
+
+    def add_feed(self, feed):
+        ''' register feed and fire it immediately, then on every aligned tick;
+        re-adding an already registered feed is a no-op '''
+        with self._cond:
+            if feed.NAME in self._feeds:
+                return
+            generation = next(self._generations)
+            self._feeds[feed.NAME] = (feed, generation)
+            self._stats.setdefault(feed.NAME, TickStats())
+            heapq.heappush(self._heap, (time.time(), next(self._seq), feed.NAME, generation))
+            self._ensure_started()
+            self._cond.notify()
+
+    def remove_feed(self, feed, wait=True):
+        ''' unregister feed; optionally wait for its in-flight tick to finish '''
+        with self._cond:
+            self._feeds.pop(feed.NAME, None)
+            future = self._in_flight.get(feed.NAME)
+            self._cond.notify()
+        if wait and future is not None:
+            future.result()
+
+    @property
+    def feed_names(self):
+        with self._cond:
+            return list(self._feeds)
+
+    def get_stats(self):
+        ''' snapshot of TickStats for every feed the scheduler has seen '''
+        with self._cond:
+            return {name: TickStats(**vars(stats)) for name, stats in self._stats.items()}
+
+    def shutdown(self, wait=True):
+        ''' stop firing feeds and (optionally) wait for running ticks '''
+        with self._cond:
+            self._running = False
+            self._feeds.clear()
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+        self._thread = None
+        self._executor = None
+
+    def _ensure_started(self):
+        #called with self._cond held
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='siwa-feed')
+        self._thread = threading.Thread(
+            target=self._loop, name='siwa-scheduler')
+        self._thread.start()
+
+    def _loop(self):
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                due, _, name, generation = self._heap[0]
+                now = time.time()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                registered = self._feeds.get(name)
+                if registered is None or registered[1] != generation:
+                    #stale entry of a removed (or re-added) feed
+                    continue
+                feed = registered[0]
+                self._dispatch(feed, due)
+                heapq.heappush(self._heap, (
+                    self.next_tick(feed.HEARTBEAT, max(due, now)),
+                    next(self._seq), name, generation))
+
+    def _dispatch(self, feed, due):
+        #called with self._cond held
+        previous = self._in_flight.get(feed.NAME)
+        if previous is not None and not previous.done():
+            self._stats[feed.NAME].skipped += 1
+            logger.warning(f'{feed.NAME} tick due at {due} skipped, previous tick still running')
+            return
+        self._in_flight[feed.NAME] = self._executor.submit(self._run_tick, feed, due)
+
+    def _run_tick(self, feed, due):
+        if not feed.ACTIVE:
+            return
+        lateness = max(0.0, time.time() - due)
+        with self._cond:
+            self._stats[feed.NAME].record(lateness)
+        try:
+            feed.tick()
+        except Exception:
+            with self._cond:
+                self._stats[feed.NAME].errors += 1
+            logger.exception(f'{feed.NAME} failed to create a new data point')
@@ -1,5 +1,5 @@
 from feeds.data_feed import DataFeed
-from collections import deque 
+from feeds.ring_buffer import RingBuffer
 from dataclasses import dataclass
 import constants as c
 from numpy import random
@@ -9,7 +9,7 @@ class Test(DataFeed):
     NAME = 'test'
     ID = 0
     HEARTBEAT = 1
-    DATAPOINT_DEQUE = deque([], maxlen=100)
+    DATAPOINT_BUFFER = RingBuffer(c.DATAPOINT_BUFFER_CAPACITY)
 
     @classmethod
     def create_new_data_point(cls):
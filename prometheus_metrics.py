@@ -0,0 +1,46 @@
+#third party
+from prometheus_client import REGISTRY, Gauge
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.samples import Sample
+
+csgo_index_gauge = Gauge('csgo_index', 'CSGO skins index')
+
+
+class FrameCollector:
+    ''' Gauge with one sample per row of a DataFrame, e.g. the price of
+    every skin. The compute path only swaps in its latest frame
+    (set_frame); the samples are built when Prometheus scrapes, in one
+    pass over the frame's columns, instead of a labelled gauge being set
+    (label lookup plus lock) per row on every run. '''
+
+    def __init__(self, name, documentation, label, value):
+        self.name = name
+        self.documentation = documentation
+        self.label = label          #column holding the label value
+        self.value = value          #column holding the sample value
+        self._frame = None
+
+    def set_frame(self, df):
+        ''' publish the latest frame; it must not be modified afterwards '''
+        self._frame = df
+
+    def describe(self):
+        ''' lets the registry check the name without collecting '''
+        return [GaugeMetricFamily(self.name, self.documentation, labels=[self.label])]
+
+    def collect(self):
+        family = GaugeMetricFamily(self.name, self.documentation, labels=[self.label])
+        df = self._frame
+        if df is not None:
+            family.samples = [
+                Sample(self.name, {self.label: label}, value)
+                for label, value in zip(df[self.label].tolist(),
+                                        df[self.value].astype(float).tolist())
+            ]
+        yield family
+
+
+csgo_price_collector = FrameCollector(
+    'csgo_price', 'Lowest price of a CSGO skin', 'market_hash_name', 'price'
+)
+REGISTRY.register(csgo_price_collector)
@@ -12,9 +12,21 @@ import cmd2
 
 #our stuff
 from all_feeds import all_feeds
+from endpoint import Endpoint
+from apis import history, resilience, response_cache, sessions, storage
+from apis.rate_limiter import rate_limiter
+from feeds.scheduler import HeartbeatScheduler
+from feeds.async_runtime import AsyncFeedRuntime
 import constants as c
 
-datafeed_threads = {}
+#feed runtimes selectable with --runtime; both fire every active feed on its
+#heartbeat, the threaded one on a worker pool, the async one on one event loop
+runtimes = {
+    'threaded': HeartbeatScheduler,
+    'async': AsyncFeedRuntime,
+}
+scheduler = HeartbeatScheduler() #replaced in __main__ according to --runtime
+endpoint = Endpoint() #serves the latest data points over HTTP, started in __main__
 
 
 def get_params():
@@ -30,9 +42,16 @@ def get_params():
         help='List of datafeeds to start, separated by commas. Call like this: python siwa.py --datafeeds feed1 feed2 feed3'
     )
 
+    parser.add_argument(
+        '--runtime',
+        choices=list(runtimes),
+        default='threaded',
+        help='Feed runtime: threaded (worker pool) or async (single asyncio event loop)'
+    )
+
     args = parser.parse_args()
     datafeeds = [all_feeds[f] for f in args.datafeeds]
-    return datafeeds
+    return datafeeds, args.runtime
 
 def start_feeds(feeds):
     ''' start all feeds in feeds list '''
@@ -43,18 +62,14 @@ def start_feeds(feeds):
         #print datafeed startup message to CLI
         print(c.start_message(feed))
 
-        #create new thread *only if* one doesn't already exist
-        if not feed.NAME in datafeed_threads:
-            thread = threading.Thread(target=feed.run)
-            thread.start()
-            datafeed_threads[feed.NAME] = thread
+        #register with the scheduler (no-op if already registered)
+        scheduler.add_feed(feed)
 
 def stop_feeds(feeds):
-    ''' stop *and kill thread for* all feeds in a list '''
+    ''' stop all feeds in a list and remove them from the scheduler '''
     for feed in feeds:
         feed.stop()
-        datafeed_threads[feed.NAME].join()
-        del(datafeed_threads[feed.NAME])
+        scheduler.remove_feed(feed)
 
 class Siwa(cmd2.Cmd):
     ''' siwa CLI: allows user to start/stop datafeeds, list feed statuses '''
@@ -71,29 +86,40 @@ class Siwa(cmd2.Cmd):
 
     def do_status(self, args: cmd2.Statement):
         '''show status (active, inactive) for all datafeeds,
-        if debug enabled, also show status of threads;
-        inactive datafeeds merely sleep, they do not close their threads'''
+        if debug enabled, also show scheduler lateness and thread info'''
         #if -v then shows params too
 
         self.poutput(c.init_time_message(self))
 
         for feed in all_feeds.values():
             self.poutput(c.status_message(feed))
-            self.poutput(f'{feed.NAME} deque len: {len(feed.DATAPOINT_DEQUE)}')
+            self.poutput(f'{feed.NAME} buffer len: {len(feed.DATAPOINT_BUFFER)}')
+
+        for source, breaker in resilience.get_breakers().items():
+            self.poutput(c.breaker_status_message(source, breaker))
 
         if c.DEBUG:
-            threadcount = threading.active_count()
-            datafeed_threadcount = threading.active_count() - 1 - 1 - c.WEBSERVER_THREADS
-            endpoint_threadcount = 1 + c.WEBSERVER_THREADS
+            self.poutput('\n--- SCHEDULER DEBUG INFO ---')
+            for name, stats in scheduler.get_stats().items():
+                self.poutput(c.lateness_message(name, stats))
+            self.poutput('\n--- HTTP CONNECTION POOL ---')
+            for host, stats in sessions.get_stats().items():
+                self.poutput(c.connection_pool_message(host, stats))
+            self.poutput('\n--- RATE LIMITS ---')
+            for bucket, stats in rate_limiter.get_stats().items():
+                self.poutput(c.rate_limit_message(bucket, stats))
+            self.poutput('\n--- RESPONSE CACHE ---')
+            for source, stats in response_cache.get_stats().items():
+                self.poutput(c.response_cache_message(source, stats))
+            self.poutput('\n--- STREAM SUBSCRIBERS ---')
+            self.poutput(c.broadcaster_message(endpoint.broadcaster))
             self.poutput(f'''
-                --- THREAD DEBUG INFO ---
-                datafeed threads running: {datafeed_threadcount}
-                total threads: {threadcount} (1 main, {endpoint_threadcount} endpoint, and {datafeed_threadcount} feeds)
-                feeds threads running: {list(datafeed_threads.keys()) or '[none]'}''')
+                total threads: {threading.active_count()} (worker pool size: {scheduler.max_workers})
+                feeds scheduled: {scheduler.feed_names or '[none]'}''')
 
     def do_start(self, args: cmd2.Statement):
         '''start specified feed, if none specified start all;
-        create new thread for feed if none extant'''
+        register feed with the scheduler if not already scheduled'''
         if args:
             #start specific feed, if given
             feeds = [all_feeds[f] for f in args.arg_list]
@@ -105,7 +131,7 @@ class Siwa(cmd2.Cmd):
 
     def do_stop(self, args: cmd2.Statement):
         '''stop datafeed processing
-        (thread remains running in case we want to re-activate)'''
+        (feed is removed from the scheduler until started again)'''
         if args:
             #stop specific feed, if given
             feeds = [all_feeds[f] for f in args.arg_list]
@@ -116,15 +142,30 @@ class Siwa(cmd2.Cmd):
             self.poutput(c.stop_message(feed))
             stop_feeds([feed])
 
+    @cmd2.with_argparser(history.get_parser())
+    def do_history(self, args):
+        '''query stored market cap history, e.g.
+        history latest --source coingecko
+        history between Bitcoin 1703385000 1703390000
+        history top 10 coinmarketcap --at 1703386000'''
+        history.run_command(args, self.poutput)
+
     def do_quit(self,args: cmd2.Statement):
         """Exit the application"""
-        self.poutput('quitting; waiting for heartbeat timeout')
+        self.poutput('quitting; waiting for running feeds to finish')
         for feed in all_feeds.values():
             feed.stop()
+        scheduler.shutdown()
+        endpoint.stop()
+        #flush market cap snapshots still queued for the database
+        storage.close_all()
         return True
 
 if __name__ == '__main__':
-    args = get_params()
+    args, runtime = get_params()
+    scheduler = runtimes[runtime]()
+    endpoint.start()
+    print(c.endpoint_message(endpoint))
     if args:
         start_feeds(args)
     else:
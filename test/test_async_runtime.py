@@ -0,0 +1,142 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import threading
+import time
+import unittest
+
+from feeds.async_runtime import AsyncFeedRuntime
+from feeds import data_feed
+from feeds.data_feed import DataFeed
+from feeds.ring_buffer import RingBuffer
+
+
+class AsyncFeed(DataFeed):
+    ''' feed with only a coroutine version of create_new_data_point '''
+    NAME = 'async'
+    ID = 110
+    HEARTBEAT = 0.05
+    DATAPOINT_BUFFER = RingBuffer(100)
+    PERSIST = False
+    THREADS = []
+
+    @classmethod
+    async def create_new_data_point_async(cls):
+        cls.THREADS.append(threading.current_thread().name)
+        await asyncio.sleep(0.01)
+        return len(cls.THREADS)
+
+
+class DualFeed(DataFeed):
+    ''' blocking feed with a coroutine version of create_new_data_point '''
+    NAME = 'dual'
+    ID = 111
+    HEARTBEAT = 0.05
+    DATAPOINT_BUFFER = RingBuffer(100)
+    PERSIST = False
+    THREADS = []
+
+    @classmethod
+    def create_new_data_point(cls):
+        cls.THREADS.append('blocking')
+        return 0
+
+    @classmethod
+    async def create_new_data_point_async(cls):
+        cls.THREADS.append(threading.current_thread().name)
+        return len(cls.THREADS)
+
+
+class FailingFeed(AsyncFeed):
+    NAME = 'failing'
+    ID = 112
+    DATAPOINT_BUFFER = RingBuffer(100)
+
+    @classmethod
+    async def create_new_data_point_async(cls):
+        raise KeyError('market_cap')
+
+
+class TestAsyncFeedRuntime(unittest.TestCase):
+    FEEDS = (AsyncFeed, DualFeed, FailingFeed)
+
+    def setUp(self):
+        self.runtime = AsyncFeedRuntime(max_workers=2)
+        for feed in self.FEEDS:
+            feed.THREADS = []
+            feed.DATAPOINT_BUFFER.clear()
+            feed.COUNT = 0
+            feed.start()
+
+    def tearDown(self):
+        for feed in self.FEEDS:
+            feed.stop()
+        self.runtime.shutdown()
+
+    def test_ticks_on_the_event_loop(self):
+        self.runtime.add_feed(AsyncFeed)
+        self.runtime.add_feed(DualFeed)
+        time.sleep(0.4)
+        # let the ticks in progress finish, a removed feed's tick is cancelled
+        AsyncFeed.ACTIVE = DualFeed.ACTIVE = False
+        time.sleep(0.1)
+        self.runtime.remove_feed(AsyncFeed)
+        self.runtime.remove_feed(DualFeed)
+        for feed in (AsyncFeed, DualFeed):
+            self.assertGreaterEqual(feed.COUNT, 5)
+            self.assertEqual(set(feed.THREADS), {'siwa-asyncio'})
+            self.assertEqual(self.runtime.get_stats()[feed.NAME].ticks, feed.COUNT)
+        self.assertEqual(DualFeed.DATAPOINT_BUFFER[-1], DualFeed.COUNT)
+
+    def test_data_points_stored_off_the_event_loop(self):
+        threads = []
+
+        def listener(feed):
+            threads.append(threading.current_thread().name)
+
+        data_feed.listeners.append(listener)
+        self.addCleanup(data_feed.listeners.remove, listener)
+        self.runtime.add_feed(AsyncFeed)
+        self.runtime.add_feed(DualFeed)
+        time.sleep(0.2)
+        self.runtime.remove_feed(AsyncFeed)
+        self.runtime.remove_feed(DualFeed)
+        self.assertGreater(len(threads), 0)
+        self.assertNotIn('siwa-asyncio', threads)
+
+    def test_removed_feed_stops_ticking(self):
+        self.runtime.add_feed(AsyncFeed)
+        time.sleep(0.15)
+        self.runtime.remove_feed(AsyncFeed)
+        count = AsyncFeed.COUNT
+        time.sleep(0.15)
+        self.assertEqual(AsyncFeed.COUNT, count)
+        self.assertNotIn(AsyncFeed.NAME, self.runtime.feed_names)
+
+    def test_stopped_feed_leaves_the_runtime(self):
+        self.runtime.add_feed(AsyncFeed)
+        time.sleep(0.1)
+        AsyncFeed.stop()
+        time.sleep(0.15)
+        count = AsyncFeed.COUNT
+        time.sleep(0.1)
+        self.assertEqual(AsyncFeed.COUNT, count)
+        self.assertNotIn(AsyncFeed.NAME, self.runtime.feed_names)
+
+    def test_errors_are_counted(self):
+        self.runtime.add_feed(FailingFeed)
+        time.sleep(0.2)
+        self.runtime.remove_feed(FailingFeed)
+        stats = self.runtime.get_stats()[FailingFeed.NAME]
+        self.assertGreater(stats.errors, 0)
+        self.assertEqual(stats.errors, stats.ticks)
+        self.assertEqual(FailingFeed.COUNT, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
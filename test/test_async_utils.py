@@ -0,0 +1,135 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from requests.exceptions import ConnectionError, HTTPError, Timeout
+
+from apis import async_utils, resilience, utils
+
+
+class Server(ThreadingHTTPServer):
+    failures = 0        # /flaky answers 503 this many times first
+    paths = []
+
+    def handle_error(self, request, client_address):
+        pass            # clients that timed out hang up on /slow
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        status = 200
+        if self.path.startswith('/missing'):
+            status = 404
+        elif self.path.startswith('/flaky') and self.server.failures:
+            self.server.failures -= 1
+            status = 503
+        body = json.dumps({'path': self.path}).encode()
+        if self.path.startswith('/list'):
+            body = json.dumps({'data': {'detail': [
+                {'ticker': f'T{i}', 'holders': i, 'pad': 'x' * 100} for i in range(2000)
+            ]}}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(coroutine):
+    ''' runs the coroutine on a new event loop, closing its session after '''
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await async_utils.close_session()
+    return asyncio.run(main())
+
+
+class FlakyClient:
+    source = 'flaky-http'
+
+    def __init__(self, url):
+        self.url = url
+
+    @utils.handle_request_errors
+    async def get_data(self):
+        return await async_utils.get_json(self.url, params={'n': 1}, source=self.source)
+
+
+class TestGetJSON(unittest.TestCase):
+    def setUp(self):
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = 'http://127.0.0.1:%d' % self.server.server_address[1]
+
+    def test_decodes_body(self):
+        data = run(async_utils.get_json(self.base + '/ok', params={'flag': True}))
+        self.assertEqual(data, {'path': '/ok?flag=True'})
+
+    def test_errors_are_raised_as_requests_errors(self):
+        with self.assertRaises(HTTPError):
+            run(async_utils.get_json(self.base + '/missing'))
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(ConnectionError):
+            run(async_utils.get_json('http://127.0.0.1:%d/' % port))
+
+        with mock.patch.object(async_utils, 'REQUEST_TIMEOUT', 0.1):
+            with self.assertRaises(Timeout):
+                run(async_utils.get_json(self.base + '/slow'))
+
+    def test_iter_json_streams_items(self):
+        async def collect(url, **kwargs):
+            return [item async for item in async_utils.iter_json(
+                url, ('data', 'detail'), chunk_size=1024, **kwargs)]
+
+        items = run(collect(self.base + '/list', fields=('ticker',)))
+        self.assertEqual(len(items), 2000)
+        self.assertEqual(items[-1], {'ticker': 'T1999'})
+        self.assertEqual(run(collect(self.base + '/list', max_items=2)),
+                         [{'ticker': 'T0', 'holders': 0, 'pad': 'x' * 100},
+                          {'ticker': 'T1', 'holders': 1, 'pad': 'x' * 100}])
+        with self.assertRaises(HTTPError):
+            run(collect(self.base + '/missing'))
+
+    def test_failed_statuses_are_retried(self):
+        resilience.configure(FlakyClient.source, max_attempts=3,
+                             base_delay=0.001, max_delay=0.001)
+        self.addCleanup(resilience.SOURCE_POLICIES.pop, FlakyClient.source, None)
+        self.addCleanup(resilience._breakers.pop, FlakyClient.source, None)
+        client = FlakyClient(self.base + '/flaky')
+
+        self.server.failures = 2
+        self.assertEqual(run(client.get_data()), {'path': '/flaky?n=1'})
+        self.assertEqual(len(self.server.paths), 3)
+
+        self.server.failures = 3
+        self.assertIsNone(run(client.get_data()))
+        self.assertEqual(len(self.server.paths), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
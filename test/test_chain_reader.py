@@ -0,0 +1,127 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import encode
+from web3 import Web3
+
+from chain.reader import Call, ChainReader
+import constants as c
+
+CONTRACT = Web3().eth.contract(abi=c.TRANSLUCENT_FLUX_AGGREGATOR)
+SELECTORS = {
+    CONTRACT.encode_abi(name)[:10]: name
+    for name in ('latestAnswer', 'decimals', 'latestRound')
+}
+
+
+class Node(ThreadingHTTPServer):
+    ''' JSON-RPC node stub: one FluxAggregator with a settable answer and block '''
+    block = 1
+    answer = 4200000000
+    http_requests = 0
+    calls = []
+    methods = []
+
+    def handle_rpc(self, request):
+        method, params = request['method'], request['params']
+        self.methods.append(method)
+        if method == 'eth_chainId':
+            result = '0x1'
+        elif method == 'eth_blockNumber':
+            result = hex(self.block)
+        elif method == 'eth_call':
+            name = SELECTORS[params[0]['data'][:10]]
+            self.calls.append((name, params[1]))
+            value = {'latestAnswer': self.answer, 'decimals': 8, 'latestRound': 7}[name]
+            result = '0x' + encode(['int256'], [value]).hex()
+        else:
+            raise NotImplementedError(method)
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.server.http_requests += 1
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if isinstance(body, list):
+            response = [self.server.handle_rpc(r) for r in body]
+        else:
+            response = self.server.handle_rpc(body)
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestChainReader(unittest.TestCase):
+    def setUp(self):
+        self.node = Node(('127.0.0.1', 0), Handler)
+        self.node.calls = []
+        self.node.methods = []
+        threading.Thread(target=self.node.serve_forever, daemon=True).start()
+        self.addCleanup(self.node.server_close)
+        self.addCleanup(self.node.shutdown)
+        w3 = Web3(Web3.HTTPProvider(f'http://127.0.0.1:{self.node.server_port}'))
+        self.reader = ChainReader(w3, block_poll_interval=0)
+        self.contract = self.reader.contract(c.TRANSLUCENT_GAUSS_ARBITRUM_GOERLI,
+                                             c.TRANSLUCENT_FLUX_AGGREGATOR)
+
+    def test_contract_objects_are_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            address_file = os.path.join(tmp, 'contract_address.txt')
+            abi_file = os.path.join(tmp, 'abi.json')
+            with open(address_file, 'w') as f:
+                f.write(c.TRANSLUCENT_GAUSS_ARBITRUM_GOERLI + '\n')
+            with open(abi_file, 'w') as f:
+                f.write(c.TRANSLUCENT_FLUX_AGGREGATOR)
+            contract = self.reader.contract_from_files(address_file, abi_file)
+            os.remove(address_file)
+            self.assertIs(self.reader.contract_from_files(address_file, abi_file), contract)
+        self.assertIs(contract, self.contract)
+
+    def test_calls_are_batched_with_the_block_number(self):
+        answer, decimals = self.reader.read_many([
+            Call(self.contract, 'latestAnswer'),
+            Call(self.contract, 'decimals', immutable=True),
+        ])
+        self.assertEqual((answer, decimals), (4200000000, 8))
+        # eth_blockNumber and both eth_calls in one batch
+        self.assertEqual(self.node.http_requests, 1)
+        self.assertEqual(self.reader.requests, 1)
+        self.assertEqual(self.node.methods[-3:], ['eth_blockNumber', 'eth_call', 'eth_call'])
+        self.assertEqual(self.node.calls, [('latestAnswer', 'latest'), ('decimals', 'latest')])
+        self.assertEqual(self.reader._block, 1)
+
+    def test_per_block_cache_is_dropped_on_new_block(self):
+        self.reader.block_poll_interval = 60
+        self.reader.read(self.contract, 'latestAnswer')
+        self.reader.read(self.contract, 'decimals', immutable=True)
+        self.node.answer = 4300000000
+        requests = self.node.http_requests
+        self.assertEqual(self.reader.read(self.contract, 'latestAnswer'), 4200000000)
+        self.assertEqual(self.node.http_requests, requests)     # trusted, not re-read
+        self.node.block = 2
+        self.reader.block_poll_interval = 0
+        self.assertEqual(self.reader.read(self.contract, 'latestAnswer'), 4300000000)
+        self.assertEqual(self.reader._block, 2)
+        self.assertEqual(self.reader.read(self.contract, 'decimals', immutable=True), 8)
+        self.assertEqual([name for name, _ in self.node.calls],
+                         ['latestAnswer', 'decimals', 'latestAnswer'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from requests.exceptions import ConnectionError
+
+from apis import coinmarketcap, resilience
+from apis.coinmarketcap import CoinMarketCapAPI
+
+
+class FakeQuotes:
+    ''' quotes/latest: token id i has market cap 1000 * i; ids above 900 are unknown '''
+
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.calls = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, params=None, source=None):
+        ids = [int(id) for id in params['id'].split(',')]
+        with self.lock:
+            self.calls.append(ids)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        if self.fail_ids & set(ids):
+            raise ConnectionError('boom')
+        response = mock.Mock()
+        response.json.return_value = {'data': {
+            str(id): {'name': f'token {id}', 'last_updated': '2024-01-01T00:00:00.000Z',
+                      'quote': {'USD': {'market_cap': 1000.0 * id}}}
+            for id in ids if id <= 900
+        }}
+        return response
+
+
+class TestCoinMarketCapQuotes(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {'COINMARKETCAP_API_KEY': 'key'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # fail fast instead of retrying with backoff
+        patcher = mock.patch.dict(resilience.SOURCE_POLICIES, {
+            'coinmarketcap': resilience.ResiliencePolicy(max_attempts=1)
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = CoinMarketCapAPI()
+        self.quotes = FakeQuotes()
+
+    def fetch(self, ids):
+        with mock.patch.object(coinmarketcap.sessions, 'get', self.quotes.get):
+            return self.api.get_market_caps_of_list(ids)
+
+    def test_batches_sent_concurrently(self):
+        ids = list(range(1, 451))
+        market_caps = self.fetch(ids)
+        self.assertEqual(len(self.quotes.calls), 5)
+        self.assertTrue(all(len(batch) <= coinmarketcap.QUOTES_BATCH_SIZE
+                            for batch in self.quotes.calls))
+        self.assertGreater(self.quotes.max_in_flight, 1)
+        self.assertEqual(market_caps.market_caps.tolist(), [1000.0 * id for id in ids])
+        self.assertEqual(market_caps.names[4], 'token 5')
+        self.assertEqual(market_caps.last_updated[4], 1704067200.0)
+
+    def test_unknown_ids_and_failed_batches_are_skipped(self):
+        self.quotes.fail_ids = {150}
+        market_caps = self.fetch([1] + list(range(901, 1000)) + list(range(101, 201)))
+        self.assertEqual(market_caps.market_caps.tolist(), [1000.0])     # second batch failed
+
+        self.quotes.fail_ids = {1}
+        self.assertIsNone(self.fetch([1, 2]))
+
+    def test_single_token(self):
+        with mock.patch.object(coinmarketcap.sessions, 'get', self.quotes.get):
+            self.assertEqual(self.api.get_market_cap_of_token(7)['market_cap'], 7000.0)
+            self.assertEqual(self.api.get_market_cap_of_token(950), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
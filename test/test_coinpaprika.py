@@ -0,0 +1,123 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apis import async_utils, utils
+from apis.async_crypto_api import AsyncCoinPaprikaAPI
+from apis.coinpaprika import CoinPaprikaAPI
+
+NUM_COINS = 5000
+
+
+def make_tickers():
+    ''' ranked coins in random-ish order; every 7th has no market cap '''
+    tickers = [
+        {'id': f'coin-{rank}', 'name': f'Coin {rank}', 'rank': rank,
+         'last_updated': '2024-01-01T00:00:00Z',
+         'quotes': {'USD': {'market_cap': 0 if rank % 7 == 0 else 10.0**9 / rank,
+                            'price': 1.0}}}
+        for rank in range(1, NUM_COINS + 1)
+    ]
+    tickers = tickers[::2] + tickers[1::2]
+    tickers.append({'id': 'junk', 'name': 'Junk', 'rank': 0, 'quotes': {}})
+    return tickers
+
+
+class Paprika(ThreadingHTTPServer):
+    tickers = json.dumps(make_tickers()).encode()
+    paths = []
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path == '/v1/tickers':
+            body = self.server.tickers
+        else:   # /v1/coins/coin-{rank}/ohlcv/latest
+            rank = int(self.path.split('/')[3].split('-')[1])
+            # some coins have no OHLC data either
+            ohlc = {14: [], 28: None}.get(rank, [{'market_cap': 2.0 * rank}])
+            body = json.dumps(ohlc).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCoinPaprikaBulk(unittest.TestCase):
+    def setUp(self):
+        self.server = Paprika(('127.0.0.1', 0), Handler)
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        base = 'http://127.0.0.1:%d/v1' % self.server.server_address[1]
+        self.api = CoinPaprikaAPI()
+        self.async_api = AsyncCoinPaprikaAPI()
+        for api in (self.api, self.async_api):
+            api.url = base + '/tickers'
+            api.ohlc_url = base + '/coins/{coin_id}/ohlcv/latest'
+
+    def check_market_data(self, market_data):
+        # Coins 14 and 28 have neither a ticker market cap nor OHLC data
+        self.assertEqual(len(market_data), 98)
+        self.assertEqual(market_data.names[0], 'Coin 1')
+        self.assertEqual(market_data.market_caps[0], 10.0**9)
+        self.assertEqual(market_data.last_updated[0], 1704067200.0)
+        # coins without a ticker market cap fall back to their OHLC
+        self.assertEqual(market_data.market_caps[6], 14.0)
+        self.assertNotIn('Coin 14', market_data.names.tolist())
+        ohlc = [path for path in self.server.paths if path.endswith('/ohlcv/latest')]
+        self.assertEqual(len(ohlc), 100 // 7)
+
+    def test_top_n_from_one_listing(self):
+        data = self.api.get_data(100)
+        self.assertEqual([coin['rank'] for coin in data], list(range(1, 101)))
+        self.check_market_data(self.api.extract_market_cap(data))
+        self.assertEqual(self.server.paths.count('/v1/tickers'), 1)
+
+    def test_async_listing_and_ohlc_fallback(self):
+        threads = []
+        parse_data = self.async_api.parse_data
+
+        def parse_data_on(data, N):
+            threads.append(threading.current_thread())
+            return parse_data(data, N)
+
+        self.async_api.parse_data = parse_data_on
+
+        async def fetch():
+            try:
+                data = await self.async_api.get_data(100)
+                self.assertEqual([coin['rank'] for coin in data], list(range(1, 101)))
+                return await self.async_api.extract_market_cap_async(data)
+            finally:
+                await async_utils.close_session()
+
+        self.check_market_data(asyncio.run(fetch()))
+        self.assertEqual(self.server.paths.count('/v1/tickers'), 1)
+        # the listing is decoded off the event loop (the main thread here)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.main_thread())
+
+    def test_parse_data_streams(self):
+        chunks = [Paprika.tickers[i:i + 1000] for i in range(0, len(Paprika.tickers), 1000)]
+        top = self.api.parse_data(utils.iter_json_items(chunks), 3)
+        self.assertEqual([coin['id'] for coin in top], ['coin-1', 'coin-2', 'coin-3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+from apis.csgo_backfill import (
+    PriceHistoryBackfill, history_columns, read_price_histories, regenerate_mapping
+)
+
+DATES = ['2024-01-01', '2024-01-02', '2024-01-03']
+LAST_PAGE = 5
+
+
+def make_page(page):
+    ''' two skins per page, each priced on every date on two markets '''
+    return {
+        'meta': {'current_page': page, 'last_page': LAST_PAGE},
+        'data': [
+            {'market_hash_name': f'skin {2 * page + j}', 'dates': [
+                {'date': date, 'prices': [
+                    {'market': 'a', 'price': 100 * (page + j + d + 1), 'quantity': 1,
+                     'updated_at': None},
+                    {'market': 'b', 'price': 100 * (page + j + d + 1) + 50, 'quantity': 2,
+                     'updated_at': 1700000000},
+                ]}
+                for d, date in enumerate(DATES)
+            ]}
+            for j in range(2)
+        ],
+    }
+
+
+class FakeAPI:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_price_histories(self, page):
+        with self.lock:
+            self.calls.append(page)
+            if page in self.fail:
+                self.fail.discard(page)
+                raise ConnectionError('boom')
+        return make_page(page)
+
+
+class TestPriceHistoryBackfill(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = os.path.join(self.tmp_dir, 'histories')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_backfill_partitions_by_date(self):
+        api = FakeAPI()
+        failed = PriceHistoryBackfill(api.get_price_histories, self.store, workers=3).run()
+        self.assertEqual(failed, set())
+        self.assertEqual(sorted(api.calls), [1, 2, 3, 4, 5])     # page 1 fetched once
+        self.assertEqual(sorted(os.listdir(self.store)),
+                         ['checkpoint.json'] + [f'date={d}' for d in DATES])
+
+        df = read_price_histories(self.store)
+        self.assertEqual(len(df), LAST_PAGE * 2 * len(DATES) * 2)
+        self.assertEqual(list(df['date'].unique()), DATES)
+        row = df[(df['market_hash_name'] == 'skin 2') & (df['market'] == 'a')].iloc[0]
+        self.assertEqual(row['price'], 2.0)
+
+        df = read_price_histories(self.store, start='2024-01-02', end='2024-01-02')
+        self.assertEqual(set(df['date']), {'2024-01-02'})
+
+    def test_resumes_after_failure(self):
+        api = FakeAPI(fail=[2, 4])
+        failed = PriceHistoryBackfill(api.get_price_histories, self.store).run()
+        self.assertEqual(failed, {2, 4})
+
+        # a new run (e.g. after a restart) only fetches what is missing
+        api.calls.clear()
+        backfill = PriceHistoryBackfill(api.get_price_histories, self.store)
+        self.assertEqual(backfill.done(), {1, 3, 5})
+        self.assertEqual(backfill.run(), set())
+        self.assertEqual(sorted(api.calls), [2, 4])
+        self.assertEqual(len(read_price_histories(self.store)), LAST_PAGE * 2 * len(DATES) * 2)
+
+    def test_uncoerced_items_are_converted(self):
+        # as returned by a sampled validation
+        items = make_page(1)['data']
+        for item in items:
+            for day in item['dates']:
+                for price in day['prices']:
+                    price['price'] = str(price['price'])
+                    price['quantity'] = str(price['quantity'])
+                    if price['updated_at'] is not None:
+                        price['updated_at'] = str(price['updated_at'])
+        df = history_columns(items)
+        self.assertEqual(df['price'].iloc[0], 2.0)
+        self.assertEqual(df['quantity'].iloc[1], 2)
+        self.assertEqual(df['updated_at'].iloc[1], 1700000000)
+        self.assertEqual(str(df['updated_at'].dtype), 'Int64')
+
+    def test_regenerate_mapping(self):
+        PriceHistoryBackfill(FakeAPI().get_price_histories, self.store).run(pages=[1])
+        mapping_path = os.path.join(self.tmp_dir, 'mapping.csv')
+        pd.DataFrame({
+            'market_hash_name': ['skin 2', 'skin 3', 'no history'],
+            'quantity': [1, 3, 5],
+            'avg_index_share': [0.5, 0.3, 0.2],
+            'std_index_share': [0.1, 0.1, 0.1],
+        }).to_csv(mapping_path)
+
+        mapping = regenerate_mapping(self.store, mapping_path).set_index('market_hash_name')
+        # skin 2 at 2, 3, 4 and skin 3 at 3, 4, 5 dollars, skin 3 quantity 3
+        shares = pd.Series([2 / 11, 3 / 15, 4 / 19])
+        self.assertAlmostEqual(mapping.loc['skin 2', 'avg_index_share'], shares.mean())
+        self.assertAlmostEqual(mapping.loc['skin 2', 'std_index_share'], shares.std())
+        self.assertAlmostEqual(mapping.loc['skin 3', 'avg_index_share'], 1 - shares.mean())
+        self.assertEqual(mapping.loc['no history', 'avg_index_share'], 0.2)
+        self.assertEqual(mapping.loc['no history', 'quantity'], 5)
+        written = pd.read_csv(mapping_path, index_col=0).set_index('market_hash_name')
+        self.assertAlmostEqual(written.loc['skin 2', 'avg_index_share'], shares.mean())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from apis.csgo_index import CSGOIndexEngine, compute_caps
+from apis.share_solver import solve_shares
+
+
+def write_mapping(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    avg = rng.dirichlet(np.ones(n))
+    mapping = pd.DataFrame({
+        'market_hash_name': [f'skin {i}' for i in range(n)],
+        'quantity': rng.integers(1, 1000, n),
+        'avg_index_share': avg,
+        'std_index_share': avg * rng.uniform(0.05, 0.4, n),
+    })
+    mapping.to_csv(path)
+    return pd.read_csv(path, index_col=0)    # as parsed by the engine
+
+
+def reference_index(mapping, prices, k=100):
+    ''' index as computed by CSGOSkins.get_caps and get_index '''
+    df = pd.DataFrame({'market_hash_name': list(prices), 'price': list(prices.values())})
+    df = df.merge(compute_caps(mapping, k=k), on='market_hash_name', how='inner')
+    values = df['price'] * df['mapped_quantity']
+    return solve_shares(values, df['lower_cap_index_share'],
+                        df['upper_cap_index_share']).total
+
+
+class TestCSGOIndexEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'mapping.csv')
+        self.mapping = write_mapping(self.path, 50)
+        self.rng = np.random.default_rng(1)
+        self.prices = {
+            name: float(p) for name, p in
+            zip(self.mapping['market_hash_name'], self.rng.uniform(1, 500, 50))
+        }
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_matches_full_recomputation(self):
+        engine = CSGOIndexEngine(self.path, k=100)
+        self.assertEqual(engine.update(self.prices), 50)
+        self.assertAlmostEqual(engine.compute(), reference_index(self.mapping, self.prices))
+
+        # a few prices move, one skin disappears and an unmapped one appears
+        prices = dict(self.prices)
+        for name in ['skin 3', 'skin 17', 'skin 40']:
+            prices[name] *= 1.1
+        del prices['skin 8']
+        prices['not mapped'] = 10.0
+        self.assertEqual(engine.update(prices), 5)
+        self.assertAlmostEqual(engine.compute(), reference_index(self.mapping, prices))
+
+    def test_unchanged_snapshot_reuses_index(self):
+        engine = CSGOIndexEngine(self.path, k=100)
+        engine.update(self.prices)
+        index = engine.compute()
+        solution = engine.solution
+        self.assertEqual(engine.update(dict(self.prices)), 0)
+        self.assertEqual(engine.compute(), index)
+        self.assertIs(engine.solution, solution)
+        self.assertEqual(engine.reloads, 1)
+
+    def test_reloads_on_mapping_change(self):
+        engine = CSGOIndexEngine(self.path, k=100)
+        engine.update(self.prices)
+        engine.compute()
+        self.assertFalse(engine.reload_if_changed())
+
+        mapping = write_mapping(self.path, 50, seed=2)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertAlmostEqual(engine.compute(), reference_index(mapping, self.prices))
+        self.assertEqual(engine.reloads, 2)
+
+    def test_caps_need_k_or_multipliers(self):
+        with self.assertRaises(ValueError):
+            compute_caps(self.mapping)
+        with self.assertRaises(ValueError):
+            compute_caps(self.mapping, k=100, upper_multiplier=1)
+        caps = compute_caps(self.mapping, upper_multiplier=2, lower_multiplier=1)
+        self.assertTrue((caps['lower_cap_index_share'] >= 0).all())
+        self.assertTrue((caps['upper_cap_index_share'] > caps['avg_index_share']).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import json
+import unittest
+from unittest import mock
+
+import pandas as pd
+from prometheus_client import CollectorRegistry, generate_latest
+
+import prometheus_metrics
+from apis import csgoskins
+from apis.csgoskins import CSGOSkins, CSGOSkinsPricesRecord, prices_columns
+
+
+def make_items(n):
+    return [
+        {'market_hash_name': f'skin {i}', 'prices': [
+            {'market': 'a', 'price': str(100 + i), 'quantity': 2, 'updated_at': None},
+            {'market': 'b', 'price': 90 + i, 'quantity': 1, 'updated_at': 1700000000},
+        ]}
+        for i in range(n)
+    ]
+
+
+def make_client(validation=CSGOSkins.VALIDATION_FULL):
+    # skips __init__, which needs API keys and a web3 provider
+    csgo = CSGOSkins.__new__(CSGOSkins)
+    csgo.base_url = CSGOSkins.DEFAULT_BASE_URL
+    csgo.validation = validation
+    csgo.headers = {}
+    return csgo
+
+
+class TestValidation(unittest.TestCase):
+
+    def test_full_validation_coerces(self):
+        items = make_client().validate_api_data(CSGOSkinsPricesRecord, make_items(3))
+        self.assertEqual(items[1]['prices'][0]['price'], 101)
+
+        bad = make_items(3)
+        bad[2]['prices'][1]['quantity'] = 'many'
+        with self.assertRaises(Exception):
+            make_client().validate_api_data(CSGOSkinsPricesRecord, bad)
+
+    def test_sample_validation(self):
+        items = make_items(CSGOSkins.VALIDATION_SAMPLE_SIZE * 2)
+        csgo = make_client(CSGOSkins.VALIDATION_SAMPLE)
+        self.assertIs(csgo.validate_api_data(CSGOSkinsPricesRecord, items), items)
+        for item in items:
+            item['prices'][0]['quantity'] = 'many'
+        with self.assertRaises(Exception):
+            csgo.validate_api_data(CSGOSkinsPricesRecord, items)
+
+    def test_columns_match_json_normalize(self):
+        items = make_client().validate_api_data(CSGOSkinsPricesRecord, make_items(5))
+        expected = pd.json_normalize(items, record_path='prices', meta='market_hash_name')
+        pd.testing.assert_frame_equal(pd.DataFrame(prices_columns(items)), expected)
+
+    def test_prices_df_from_streamed_response(self):
+        body = json.dumps({'meta': {'total': 3}, 'data': make_items(3)}).encode()
+        response = mock.MagicMock()
+        response.iter_content.return_value = [body[i:i + 50] for i in range(0, len(body), 50)]
+        with mock.patch.object(csgoskins.sessions, 'request', return_value=response) as request:
+            df = make_client().get_prices_df()
+        self.assertTrue(request.call_args.kwargs['stream'])
+        response.__exit__.assert_called_once()      # closed once read
+        self.assertEqual(df['price'].tolist(), [1.0, 0.9, 1.01, 0.91, 1.02, 0.92])
+        self.assertEqual(df['market_hash_name'].tolist()[-1], 'skin 2')
+
+    def test_sampled_prices_df_is_numeric(self):
+        items = make_items(CSGOSkins.VALIDATION_SAMPLE_SIZE + 1)
+        csgo = make_client(CSGOSkins.VALIDATION_SAMPLE)
+        with mock.patch.object(csgo, 'iter_prices', return_value=iter(items)):
+            df = csgo.get_prices_df()
+        self.assertEqual(df['price'].tolist()[:4], [1.0, 0.9, 1.01, 0.91])
+        self.assertEqual(df['quantity'].dtype.kind, 'i')
+
+
+class TestPriceCollector(unittest.TestCase):
+
+    def test_agg_data_exports_prices_when_scraped(self):
+        items = make_client().validate_api_data(CSGOSkinsPricesRecord, make_items(3))
+        df = pd.DataFrame(prices_columns(items))
+        df['price'] = df['price'] / 100
+
+        collector = prometheus_metrics.FrameCollector(
+            'csgo_price', 'price', 'market_hash_name', 'price'
+        )
+        registry = CollectorRegistry()
+        registry.register(collector)
+        with mock.patch.object(prometheus_metrics, 'csgo_price_collector', collector):
+            with mock.patch.object(collector, 'collect', wraps=collector.collect) as collect:
+                agg = make_client().agg_data(df)
+                collect.assert_not_called()
+
+        self.assertEqual(agg['price'].tolist(), [0.9, 0.91, 0.92])
+        self.assertEqual(agg['quantity'].tolist(), [3, 3, 3])
+        self.assertEqual(registry.get_sample_value(
+            'csgo_price', {'market_hash_name': 'skin 1'}), 0.91)
+        self.assertIn(b'csgo_price{market_hash_name="skin 2"} 0.92', generate_latest(registry))
+
+    def test_empty_before_first_frame(self):
+        collector = prometheus_metrics.FrameCollector('empty', 'doc', 'name', 'value')
+        self.assertEqual(list(collector.collect())[0].samples, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+from feeds.data_feed import DataFeed
+from feeds.datapoint_log import DatapointLog, RECORD
+from feeds.ring_buffer import RingBuffer
+
+
+class LoggedFeed(DataFeed):
+    NAME = 'logged'
+    ID = 103
+    HEARTBEAT = 1
+    DATAPOINT_BUFFER = RingBuffer(5)
+
+
+class TestDatapointLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name) / 'feed'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_appends_roll_over_segments(self):
+        log = DatapointLog(self.directory, segment_records=4)
+        for i in range(10):
+            log.append(1000 + i, i * 0.5)
+        log.close()
+        self.assertEqual(len(log.segment_paths()), 3)
+        time_stamps, data_points = DatapointLog(self.directory).tail(6)
+        np.testing.assert_array_equal(time_stamps, np.arange(1004, 1010))
+        np.testing.assert_array_equal(data_points, np.arange(4, 10) * 0.5)
+
+    def test_fsync_is_batched(self):
+        log = DatapointLog(self.directory, fsync_records=3, fsync_interval=60)
+        with mock.patch('os.fsync') as fsync:
+            for i in range(7):
+                log.append(i, i)
+            self.assertEqual(fsync.call_count, 2)
+            log.close()
+            self.assertEqual(fsync.call_count, 3)
+
+    def test_torn_record_is_dropped(self):
+        log = DatapointLog(self.directory)
+        log.append(1, 1.0)
+        log.close()
+        with open(log.segment_paths()[-1], 'ab') as f:
+            f.write(b'\x00' * (RECORD.itemsize // 2))
+        log = DatapointLog(self.directory)
+        log.append(2, 2.0)
+        np.testing.assert_array_equal(log.tail(10)[1], [1.0, 2.0])
+        log.close()
+
+    def test_feed_restarts_warm(self):
+        with mock.patch.object(LoggedFeed, 'get_data_dir', return_value=self.directory):
+            LoggedFeed.start()
+            for i in range(7):
+                LoggedFeed.store_data_point(float(i))
+            LoggedFeed.stop()
+            LoggedFeed.DATAPOINT_BUFFER.clear()
+
+            LoggedFeed.start()
+            LoggedFeed.stop()
+        self.assertEqual(len(LoggedFeed.DATAPOINT_BUFFER), 5)
+        np.testing.assert_array_equal(LoggedFeed.DATAPOINT_BUFFER.window()[1], [2, 3, 4, 5, 6])
+
+    def test_stop_while_storing(self):
+        errors = []
+
+        def store():
+            try:
+                for i in range(2000):
+                    LoggedFeed.store_data_point(float(i))
+            except Exception as e:
+                errors.append(e)
+
+        with mock.patch.object(LoggedFeed, 'get_data_dir', return_value=self.directory):
+            LoggedFeed.start()
+            thread = threading.Thread(target=store)
+            thread.start()
+            time.sleep(0.01)
+            LoggedFeed.stop()
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertIsNone(LoggedFeed.DATAPOINT_LOG)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import requests
+
+import endpoint
+from feeds.data_feed import DataFeed
+from feeds.ring_buffer import RingBuffer
+
+
+class ServedFeed(DataFeed):
+    NAME = 'served'
+    ID = 104
+    HEARTBEAT = 1
+    DATAPOINT_BUFFER = RingBuffer(10)
+
+
+class OtherFeed(ServedFeed):
+    NAME = 'other'
+    ID = 105
+    DATAPOINT_BUFFER = RingBuffer(10)
+
+
+class TestEndpoint(unittest.TestCase):
+    def setUp(self):
+        feeds = {ServedFeed.NAME: ServedFeed, OtherFeed.NAME: OtherFeed}
+        patcher = mock.patch.dict(endpoint.all_feeds, feeds, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = endpoint.Endpoint(port=0, threads=2)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        host, port = self.server.address
+        self.base = f'http://{host}:{port}/feeds'
+
+    def test_latest_data_point_and_etag(self):
+        ServedFeed.store_data_point(1.5)
+        r = requests.get(f'{self.base}/served')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['data_point'], 1.5)
+        etag = r.headers['ETag']
+
+        r = requests.get(f'{self.base}/served', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 304)
+
+        ServedFeed.store_data_point(2.5)
+        r = requests.get(f'{self.base}/served', headers={'If-None-Match': etag})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()['data_point'], 2.5)
+
+    def test_body_is_serialized_once_per_data_point(self):
+        ServedFeed.store_data_point(3.0)
+        with mock.patch.object(endpoint.json, 'dumps', wraps=json.dumps) as dumps:
+            requests.get(f'{self.base}/served')
+            requests.get(f'{self.base}/served')
+        dumps.assert_not_called()
+
+    def test_batch(self):
+        ServedFeed.store_data_point(4.0)
+        OtherFeed.store_data_point(5.0)
+        r = requests.get(self.base, params={'names': 'served,other'})
+        self.assertEqual(r.status_code, 200)
+        body = r.json()
+        self.assertEqual(body['served']['data_point'], 4.0)
+        self.assertEqual(body['other']['data_point'], 5.0)
+        self.assertEqual(set(requests.get(self.base).json()), {'served', 'other'})
+
+    def test_metrics(self):
+        r = requests.get(self.base.replace('/feeds', '/metrics'))
+        self.assertEqual(r.status_code, 200)
+        self.assertIn('# TYPE csgo_index gauge', r.text)
+
+    def test_unknown_feed(self):
+        self.assertEqual(requests.get(f'{self.base}/nope').status_code, 404)
+        self.assertEqual(requests.get(self.base, params={'names': 'nope'}).status_code, 404)
+
+    def test_stream_pushes_new_data_points(self):
+        ServedFeed.store_data_point(6.0)
+        with requests.get(f'{self.base[:-len("/feeds")]}/stream', params={'ids': ServedFeed.ID},
+                          stream=True, timeout=5) as r:
+            self.assertEqual(r.headers['Content-Type'], endpoint.EVENT_STREAM)
+            lines = r.iter_lines()
+            # the latest data point first, then every new one
+            for data_point in (6.0, 7.0):
+                event = [next(lines) for _ in range(4)]
+                self.assertEqual(event[1], b'event: served')
+                self.assertEqual(json.loads(event[2][len('data: '):])['data_point'], data_point)
+                OtherFeed.store_data_point(0.0)     # filtered out
+                ServedFeed.store_data_point(7.0)
+        self.assertGreater(self.server.broadcaster.published, 0)
+
+
+class TestBroadcaster(unittest.TestCase):
+    def test_slow_subscriber_is_evicted(self):
+        async def run():
+            broadcaster = endpoint.Broadcaster()
+            slow = endpoint.Subscription(queue_size=2)
+            fast = endpoint.Subscription(queue_size=2)
+            other = endpoint.Subscription(names={'other'})
+            for sub in (slow, fast, other):
+                broadcaster.subscribe(sub)
+            ServedFeed.store_data_point(1.0)
+            for _ in range(3):
+                broadcaster.publish(ServedFeed)
+                await asyncio.sleep(0)
+                await fast.queue.get()
+            self.assertTrue(slow.evicted)
+            self.assertIsNone(await slow.queue.get())
+            self.assertFalse(fast.evicted)
+            self.assertTrue(other.queue.empty())
+            self.assertEqual(broadcaster.evicted, 1)
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from apis import storage, utils
+from apis.crypto_api import MarketCapSnapshot
+from apis.history import MarketCapHistory
+
+
+def snapshot(market_caps, names, last_updated):
+    ''' snapshot of coins all updated at the same time '''
+    return MarketCapSnapshot.from_columns('test', market_caps, names,
+                                          [last_updated] * len(names))
+
+
+class TestMarketCapHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'data.db')
+        self.store = storage.get_market_cap_store(self.db_path)
+        self.store.write_snapshot(
+            snapshot([300.0, 200.0, 100.0], ['Bitcoin', 'Ethereum', 'Tether'], 1),
+            'coingecko', load_time=1000
+        )
+        self.store.enqueue_snapshot(
+            snapshot([310.0, 90.0, 150.0], ['Bitcoin', 'Ethereum', 'Tether'], 2),
+            'coingecko'
+        )
+        self.store.write_snapshot(snapshot([305.0], ['Bitcoin'], 1),
+                                  'coinmarketcap', load_time=1500)
+        self.store.flush()
+        self.history = MarketCapHistory(self.db_path)
+
+    def tearDown(self):
+        self.history.close()
+        storage.close_all()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_latest_snapshot_per_source(self):
+        latest = self.history.latest_snapshots()
+        self.assertEqual(sorted(latest), ['coingecko', 'coinmarketcap'])
+        self.assertEqual(
+            [row['name'] for row in latest['coingecko']],
+            ['Bitcoin', 'Tether', 'Ethereum']
+        )
+        self.assertEqual(latest['coinmarketcap'][0]['market_cap'], 305.0)
+
+    def test_store_market_cap_data(self):
+        utils.store_market_cap_data(snapshot([320.0], ['Bitcoin'], 3),
+                                    'coinpaprika', db_path=self.db_path)
+        latest = self.history.latest_snapshots()['coinpaprika']
+        self.assertEqual([(r['name'], r['market_cap']) for r in latest],
+                         [('Bitcoin', 320.0)])
+
+    def test_market_cap_between(self):
+        rows = self.history.market_cap_between('Bitcoin', 0, 2000)
+        self.assertEqual([(r['source'], r['market_cap']) for r in rows],
+                         [('coingecko', 300.0), ('coinmarketcap', 305.0)])
+        rows = self.history.market_cap_between('Bitcoin', 0, 2000, source='coinmarketcap')
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(self.history.market_cap_between('Unknown', 0, 2000), [])
+
+    def test_top_n_at(self):
+        rows = self.history.top_n_at(2, 1200, 'coingecko')
+        self.assertEqual([r['name'] for r in rows], ['Bitcoin', 'Ethereum'])
+        rows = self.history.top_n_at(2, None, 'coingecko')
+        self.assertEqual([r['name'] for r in rows], ['Bitcoin', 'Tether'])
+        self.assertEqual(self.history.top_n_at(2, 10, 'coingecko'), [])
+
+    def test_queries_use_indexes(self):
+        conn = sqlite3.connect(self.db_path)
+        plan = ' '.join(str(row) for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM market_caps "
+            "WHERE coin_id = 1 AND load_time BETWEEN 0 AND 1"
+        ))
+        self.assertIn('market_caps_by_coin_time', plan)
+        conn.close()
+
+    def test_queued_snapshots_written_by_close(self):
+        db_path = os.path.join(self.tmp_dir, 'queued.db')
+        store = storage.MarketCapStore(db_path)
+        for i, source in enumerate(['coingecko', 'coinpaprika', 'coingecko']):
+            store.enqueue_snapshot(
+                snapshot([100.0 + i, 10.0 + i], ['Bitcoin', 'Ethereum'], i), source
+            )
+        store.close()
+        self.assertIsNone(store._writer)
+
+        conn = sqlite3.connect(db_path)
+        self.addCleanup(conn.close)
+        rows = conn.execute(
+            "SELECT source, name, market_cap FROM market_cap_data "
+            "ORDER BY market_cap").fetchall()
+        self.assertEqual(rows, [
+            ('coingecko', 'Ethereum', 10.0), ('coinpaprika', 'Ethereum', 11.0),
+            ('coingecko', 'Ethereum', 12.0), ('coingecko', 'Bitcoin', 100.0),
+            ('coinpaprika', 'Bitcoin', 101.0), ('coingecko', 'Bitcoin', 102.0),
+        ])
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0], 3)
+
+    def test_bad_snapshot_does_not_stop_writer(self):
+        self.store.enqueue_snapshot({1.0: {'last_updated': 3}}, 'coingecko')
+        self.store.enqueue_snapshot(snapshot([320.0], ['Bitcoin'], 3), 'coinmarketcap')
+        self.store.flush()
+        self.assertTrue(self.store._writer.is_alive())
+        rows = self.history.market_cap_between('Bitcoin', 0, float('inf'),
+                                               source='coinmarketcap')
+        self.assertEqual([r['market_cap'] for r in rows], [305.0, 320.0])
+
+    def test_ids_cached_once_committed(self):
+        with self.assertRaises(sqlite3.Error):
+            bad = MarketCapSnapshot('kraken', np.array([object()]),
+                                    np.array(['Dogecoin'], dtype=object), np.array([1.0]))
+            self.store.write_snapshot(bad, 'kraken', load_time=2000)
+        self.assertNotIn('Dogecoin', self.store._coin_ids)
+        self.assertNotIn('kraken', self.store._source_ids)
+
+        self.store.write_snapshot(snapshot([50.0], ['Dogecoin'], 1), 'kraken', load_time=2000)
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute(
+            "SELECT id FROM coins WHERE name = 'Dogecoin'").fetchone()[0],
+            self.store._coin_ids['Dogecoin'])
+
+    def test_legacy_table_is_migrated(self):
+        legacy_path = os.path.join(self.tmp_dir, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(
+            "CREATE TABLE market_cap_data (name TEXT, market_cap REAL, "
+            "last_updated_time REAL, load_time REAL, source TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO market_cap_data VALUES (?, ?, ?, ?, ?)",
+            [('Bitcoin', 2.0, 0, 10, 'coingecko'),
+             ('Ethereum', 1.0, 0, 10, 'coingecko'),
+             ('Bitcoin', 3.0, 0, 20, 'coingecko')]
+        )
+        conn.commit()
+        conn.close()
+        history = MarketCapHistory(legacy_path)
+        self.assertEqual([r['market_cap'] for r in history.market_cap_between('Bitcoin', 0, 30)],
+                         [2.0, 3.0])
+        self.assertEqual(len(history.top_n_at(5, 15, 'coingecko')), 2)
+        # the original columns stay readable through the view
+        self.assertEqual(
+            history._conn.execute("SELECT COUNT(*) FROM market_cap_data").fetchone()[0], 3
+        )
+        history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import json
+import unittest
+
+from requests.exceptions import RequestException
+
+from apis import utils
+
+DOCUMENT = {
+    'meta': {'note': 'brackets ] and } in strings', 'pages': [1, 2, {'x': None}]},
+    'data': [
+        {'id': i, 'name': 'café "%d"' % i, 'price': 1.5 * i, 'tags': ['a', 'b']}
+        for i in range(500)
+    ] + [7, 12345, 'x', None],
+    'after': True,
+}
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJSONStream(unittest.TestCase):
+    def setUp(self):
+        self.text = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+
+    def test_items_at_path_for_any_chunking(self):
+        # chunks of 1 and 3 bytes split numbers and multi-byte characters
+        for size in (1, 3, 64, 4096, len(self.text)):
+            items = list(utils.iter_json_items(chunked(self.text, size), ('data',)))
+            self.assertEqual(items, DOCUMENT['data'], size)
+
+    def test_top_level_array(self):
+        self.assertEqual(list(utils.iter_json_items([b' [ ', b'] '])), [])
+        self.assertEqual(list(utils.iter_json_items([b'[1', b'2,3', b'4]'])), [12, 34])
+
+    def test_max_items_stops_reading(self):
+        read = []
+
+        def chunks():
+            for chunk in chunked(self.text, 256):
+                read.append(chunk)
+                yield chunk
+
+        items = list(utils.iter_json_items(chunks(), ('data',), max_items=3))
+        self.assertEqual([item['id'] for item in items], [0, 1, 2])
+        self.assertLess(len(read), 10)
+
+    def test_fields(self):
+        items = utils.iter_json_items([self.text], ('data',), fields=('id', 'price'))
+        self.assertEqual(next(items), {'id': 0, 'price': 0.0})
+
+    def test_errors(self):
+        with self.assertRaises(RequestException):
+            list(utils.iter_json_items([b'[1, 2 3]']))
+        with self.assertRaises(RequestException):
+            list(utils.iter_json_items([b'[{"a": 1}, {"b"']))
+        with self.assertRaises(utils.MissingDataException):
+            list(utils.iter_json_items([self.text], ('nope',)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,272 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import math
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+from apis import coingecko, storage
+from apis.coingecko import CoinGeckoAPI
+from apis.crypto_api import (
+    CryptoAPI, MarketCapSnapshot, fetch_mcap_by_rank_from_sources, join_market_caps
+)
+from apis.market_snapshot import MarketSnapshotService
+from feeds.crypto_indices import mcap
+
+
+class FakeSource(CryptoAPI):
+    ''' coin i has market cap SCALE * 1 / i '''
+    SCALE = 1.0
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self):
+        super().__init__(url='', source=type(self).__name__.lower())
+
+    def fetch_mcap_by_rank(self, N):
+        with self.lock:
+            self.calls.append((self.source, N))
+        time.sleep(0.05)
+        ranks = range(N, 0, -1)
+        return MarketCapSnapshot.from_columns(
+            self.source, [self.SCALE / rank for rank in ranks],
+            [f'coin {rank}' for rank in ranks], [0] * N)
+
+
+class Alpha(FakeSource):
+    pass
+
+
+class Beta(FakeSource):
+    SCALE = 3.0
+
+
+class Slow(FakeSource):
+    def fetch_mcap_by_rank(self, N):
+        time.sleep(1)
+        return super().fetch_mcap_by_rank(N)
+
+
+class Failing(FakeSource):
+    def fetch_mcap_by_rank(self, N):
+        raise KeyError('market_cap')
+
+
+class AsyncAlpha(Alpha):
+    DELAY = 0.05
+
+    async def fetch_mcap_by_rank(self, N):
+        await asyncio.sleep(self.DELAY)
+        return Alpha.fetch_mcap_by_rank(self, N)
+
+
+class AsyncBeta(AsyncAlpha):
+    SCALE = 3.0
+
+
+class AsyncSlow(AsyncAlpha):
+    DELAY = 10
+
+
+class TestMarketCapSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = MarketCapSnapshot.from_columns(
+            'source', [5.0, 9.0, None, 5.0, 7.0, 1.0],
+            ['e', 'a', 'x', 'b', 'c', 'f'],
+            ['2024-01-01T00:00:00.000Z', 1700000000, 0, None, 'junk', '2024-01-01T01:00:00'])
+
+    def test_columns(self):
+        snapshot = self.snapshot
+        self.assertEqual(len(snapshot), 5)                  # no market cap, dropped
+        self.assertEqual(snapshot.names.tolist(), ['e', 'a', 'b', 'c', 'f'])
+        self.assertEqual(snapshot.last_updated[:2].tolist(), [1704067200.0, 1700000000.0])
+        self.assertTrue(np.isnan(snapshot.last_updated[2:4]).all())
+        self.assertEqual(snapshot.last_updated[4], 1704070800.0)
+        with self.assertRaises(ValueError):
+            snapshot.market_caps[0] = 1.0
+
+    def test_top_keeps_equal_market_caps(self):
+        top = self.snapshot.top(4)
+        self.assertEqual(top.market_caps.tolist(), [9.0, 7.0, 5.0, 5.0])
+        self.assertEqual(sorted(top.names[2:].tolist()), ['b', 'e'])
+        self.assertEqual(self.snapshot.top(100).names.tolist(), ['a', 'c', 'e', 'b', 'f'])
+        self.assertEqual(len(self.snapshot.top(0)), 0)
+        for N, total in ((0, 0.0), (1, 9.0), (3, 21.0), (5, 27.0), (9, 27.0)):
+            self.assertEqual(self.snapshot.total(N), total)
+
+    def test_join(self):
+        other = MarketCapSnapshot.from_columns('other', [8.0, 2.0], ['a', 'z'], [0, 0])
+        names, market_caps = join_market_caps([self.snapshot, other])
+        self.assertEqual(names.tolist(), ['a', 'b', 'c', 'e', 'f', 'z'])
+        self.assertEqual(market_caps[0].tolist(), [9.0, 8.0])
+        self.assertTrue(math.isnan(market_caps[-1, 0]))
+        self.assertEqual(market_caps.shape, (6, 2))
+
+    def test_stored(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        db_path = os.path.join(tmp_dir, 'data.db')
+        self.addCleanup(storage.close_all)
+        storage.get_market_cap_store(db_path).write_snapshot(self.snapshot, 'source', 1000)
+        conn = sqlite3.connect(db_path)
+        self.addCleanup(conn.close)
+        rows = conn.execute(
+            'SELECT name, market_cap, last_updated_time FROM market_cap_data '
+            'ORDER BY market_cap DESC, name').fetchall()
+        self.assertEqual(rows[:3], [('a', 9.0, 1700000000.0), ('c', 7.0, None),
+                                    ('b', 5.0, None)])
+
+
+class TestFetchFromSources(unittest.TestCase):
+    def test_partial_results_by_the_deadline(self):
+        started = time.monotonic()
+        results = fetch_mcap_by_rank_from_sources([Alpha, Slow, Failing, Beta], 5,
+                                                  deadline=0.5)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(sorted(results), ['alpha', 'beta'])
+        self.assertEqual(results['beta'].total(1), 3.0)
+
+        results = fetch_mcap_by_rank_from_sources([Slow, Failing], 5)
+        self.assertEqual(list(results), ['slow'])
+
+
+class TestMarketSnapshotService(unittest.TestCase):
+    def setUp(self):
+        FakeSource.calls = []
+        self.service = MarketSnapshotService([Alpha, Beta], deadline=5)
+
+    def test_largest_registered_N_fetched_once(self):
+        for N in (10, 1000, 100):
+            self.service.register(N)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            snapshots = list(executor.map(self.service.get, [10, 100, 1000] * 2))
+        self.assertEqual(self.service.fetches, 1)
+        self.assertEqual(sorted(FakeSource.calls), [('alpha', 1000), ('beta', 1000)])
+        self.assertTrue(all(snapshot is snapshots[0] for snapshot in snapshots))
+
+        snapshot = snapshots[0]
+        self.assertEqual(snapshot.sources['beta'].names[:2].tolist(), ['coin 1', 'coin 2'])
+        self.assertEqual(snapshot.totals(2), {'alpha': 1.5, 'beta': 4.5})
+        with self.assertRaises(TypeError):
+            snapshot.sources['gamma'] = None
+        with self.assertRaises(ValueError):
+            snapshot.totals(2000)
+
+        sources, names, market_caps = snapshot.join(3)
+        self.assertEqual(sources, ['alpha', 'beta'])
+        self.assertEqual(names.tolist(), ['coin 1', 'coin 2', 'coin 3'])
+        self.assertEqual(market_caps[1].tolist(), [0.5, 1.5])
+
+    def test_refetched_when_stale_or_too_small(self):
+        self.service.get(10)
+        self.service.get(100)                  # not registered beforehand
+        self.assertEqual(self.service.fetches, 2)
+        self.service.max_age = 0
+        self.assertEqual(self.service.get(10).N, 100)
+        self.assertEqual(self.service.fetches, 3)
+
+    def test_lock_not_held_while_fetching(self):
+        service = MarketSnapshotService([Slow], deadline=5)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            small = executor.submit(service.get, 10)
+            time.sleep(0.1)
+            started = time.monotonic()
+            service.register(1000)
+            self.assertLess(time.monotonic() - started, 0.1)
+            same = executor.submit(service.get, 5)       # joins the fetch of 10
+            large = executor.submit(service.get, 1000)   # does not wait for it
+            self.assertEqual(large.result().N, 1000)
+            self.assertIs(same.result(), small.result())
+        self.assertEqual(service.fetches, 2)
+        self.assertEqual(service.snapshot.N, 1000)
+
+    def test_index_feeds_share_a_snapshot(self):
+        service = MarketSnapshotService([Alpha, Beta], deadline=5)
+        with mock.patch.object(mcap, 'snapshots', service):
+            for feed in (mcap.MCAP10, mcap.MCAP100, mcap.MCAP1000):
+                service.register(feed.N)
+            values = [feed.create_new_data_point()
+                      for feed in (mcap.MCAP10, mcap.MCAP100, mcap.MCAP1000)]
+        self.assertEqual(service.fetches, 1)
+        self.assertEqual(mcap.MCAP1000.SOURCES_USED, ['alpha', 'beta'])
+        harmonic = sum(1 / rank for rank in range(1, 11))
+        self.assertAlmostEqual(values[0], 2 * harmonic)
+        self.assertLess(values[0], values[1])
+        self.assertLess(values[1], values[2])
+
+
+class TestAsyncMarketSnapshot(unittest.TestCase):
+    def setUp(self):
+        FakeSource.calls = []
+
+    def test_async_index_feeds_share_a_snapshot(self):
+        service = MarketSnapshotService([], deadline=5, async_sources=[AsyncAlpha, AsyncBeta])
+        feeds = (mcap.MCAP10, mcap.MCAP100, mcap.MCAP1000)
+
+        async def tick():
+            return await asyncio.gather(*[feed.create_new_data_point_async()
+                                          for feed in feeds])
+
+        with mock.patch.object(mcap, 'snapshots', service):
+            for feed in feeds:
+                service.register(feed.N)
+            values = asyncio.run(tick())
+            self.assertEqual(service.fetches, 1)
+            self.assertEqual(sorted(FakeSource.calls),
+                             [('asyncalpha', 1000), ('asyncbeta', 1000)])
+            self.assertEqual(values, [feed.create_new_data_point() for feed in feeds])
+        self.assertEqual(service.fetches, 1)
+
+    def test_slow_sources_miss_the_deadline(self):
+        service = MarketSnapshotService([], deadline=0.5, async_sources=[AsyncAlpha, AsyncSlow])
+        started = time.monotonic()
+        snapshot = asyncio.run(service.get_async(10))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(list(snapshot.sources), ['asyncalpha'])
+
+
+class TestCoinGeckoPages(unittest.TestCase):
+    def test_top_N_paginated(self):
+        requests = []
+
+        def get(url, params, source):
+            requests.append(params)
+            start = (params['page'] - 1) * params['per_page']
+            response = mock.Mock()
+            response.json.return_value = [
+                {'name': f'coin {rank}', 'market_cap': 1e9 / rank, 'last_updated': 0}
+                for rank in range(start + 1, min(start + params['per_page'], 700) + 1)
+            ]
+            return response
+
+        with mock.patch.object(coingecko.response_cache, 'get', get):
+            data = CoinGeckoAPI().get_data(600)
+            self.assertEqual([(r['page'], r['per_page']) for r in requests],
+                             [(1, 250), (2, 250), (3, 250)])
+            self.assertEqual([coin['name'] for coin in data[::250]],
+                             ['coin 1', 'coin 251', 'coin 501'])
+            self.assertEqual(len(data), 600)
+
+            requests.clear()
+            self.assertEqual(len(CoinGeckoAPI().get_data(1000)), 700)
+            self.assertEqual(len(requests), 3)     # the short page is the last
+            requests.clear()
+            self.assertEqual(len(CoinGeckoAPI().get_data(50)), 50)
+            self.assertEqual(requests[0]['per_page'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import unittest
+
+from chain.local_chain import LocalChain
+from chain.publisher import Publisher, PublishPolicy
+from feeds import data_feed
+from feeds.data_feed import DataFeed
+from feeds.ring_buffer import RingBuffer
+
+
+class PublishedFeed(DataFeed):
+    NAME = 'published'
+    ID = 106
+    HEARTBEAT = 1
+    DATAPOINT_BUFFER = RingBuffer(10)
+    PERSIST = False
+
+
+class TestPublisher(unittest.TestCase):
+    def setUp(self):
+        self.now = 1_000_000
+        self.chain = LocalChain(clock=lambda: self.now)
+        self.policy = PublishPolicy(deviation=0.01, heartbeat=600, replace_after=30)
+        self.publisher = Publisher(self.chain, policy=self.policy)
+
+    def update(self, value, dt=10):
+        self.now += dt
+        return self.publisher.update(value, self.now)
+
+    def answer(self):
+        return self.chain.rounds[self.chain.latest_round][0] / 10**self.chain.decimals
+
+    def test_publishes_on_deviation_and_heartbeat_only(self):
+        self.assertIsNotNone(self.update(100.0))        # nothing on chain yet
+        for value in (100.5, 99.5, 100.9, 100.0):       # within 1%
+            self.assertIsNone(self.update(value))
+        self.assertIsNotNone(self.update(101.5))
+        self.assertEqual(self.answer(), 101.5)
+        self.assertIsNone(self.update(101.5, dt=500))
+        self.assertIsNotNone(self.update(101.5, dt=100))  # 600s since last round
+        self.assertEqual(self.chain.latest_round, 3)
+        self.assertEqual(self.publisher.sent, 3)
+
+    def test_restart_resumes_from_chain(self):
+        self.update(100.0)
+        publisher = Publisher(self.chain, policy=self.policy)
+        self.assertIsNone(publisher.update(100.2, self.now + 10))
+        self.assertIsNotNone(publisher.update(100.2, self.now + 600))
+        self.assertEqual(self.chain.latest_round, 2)
+
+    def test_stuck_transaction_is_replaced_with_higher_fees(self):
+        self.update(100.0)
+        self.chain.auto_mine = False
+        self.update(110.0)
+        self.chain.base_fee *= 10                       # leaves it stuck
+        self.assertEqual(self.chain.mine(), 0)
+        self.assertIsNone(self.update(110.0))           # not stuck long enough
+        self.assertIsNotNone(self.update(110.0, dt=30))
+        self.assertEqual(self.chain.mine(), 1)
+        self.assertIsNone(self.update(110.0))           # mined, picked up
+        self.assertIsNone(self.publisher.pending)
+        self.assertEqual(self.answer(), 110.0)
+        nonces = [tx['nonce'] for tx in self.chain.mined]
+        self.assertEqual(nonces, [0, 1])
+
+    def test_deviating_value_replaces_pending_one(self):
+        self.chain.auto_mine = False
+        first = self.update(100.0)
+        second = self.update(105.0)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.publisher.pending.nonce, 0)
+        self.chain.mine()
+        self.update(105.0)
+        self.assertEqual(len(self.chain.mined), 1)
+        self.assertEqual(self.answer(), 105.0)
+
+    def odd_fees(self):
+        # fees the bump doesn't scale to whole wei, as on a real chain
+        self.chain.base_fee = 10**8 + 1
+        self.chain.priority_fee = 10**7 + 3
+
+    def test_stuck_transaction_is_replaced_with_odd_fees(self):
+        self.odd_fees()
+        self.chain.auto_mine = False
+        self.update(100.0)
+        # not mined, at unchanged fees, so only the bump raises them
+        self.assertIsNotNone(self.update(100.0, dt=30))
+        self.assertEqual(self.chain.mine(), 1)
+        self.assertEqual(self.answer(), 100.0)
+
+    def test_deviating_value_replaces_pending_one_with_odd_fees(self):
+        self.odd_fees()
+        self.chain.auto_mine = False
+        first = self.update(100.0)
+        second = self.update(105.0)
+        self.assertIsNotNone(second)
+        self.assertNotEqual(first, second)
+        self.chain.mine()
+        self.assertEqual(self.answer(), 105.0)
+
+    def test_replaced_value_mined_first(self):
+        self.chain.auto_mine = False
+        first = self.update(100.0)
+        self.update(105.0)
+        # the original transaction wins the race against its replacement
+        self.chain.receipts[first] = {'status': 1}
+        self.assertIsNotNone(self.update(105.0))     # 5% off what was mined
+        self.assertEqual(self.publisher._last_value, 100.0)
+        self.assertEqual(self.publisher.pending.value, 105.0)
+
+    def test_nonces_resync_after_failed_send(self):
+        self.update(100.0)
+        self.chain.nonce += 1       # a transaction sent from elsewhere
+        self.assertIsNone(self.update(120.0))
+        self.assertIsNotNone(self.update(120.0))
+        self.assertEqual(self.answer(), 120.0)
+
+    def test_attach_publishes_new_data_points(self):
+        self.publisher.attach(PublishedFeed)
+        self.addCleanup(data_feed.listeners.remove, self.publisher._on_data_point)
+        PublishedFeed.store_data_point(42.0)
+        self.assertEqual(self.answer(), 42.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
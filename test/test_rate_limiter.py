@@ -0,0 +1,55 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import time
+import unittest
+
+from apis.rate_limiter import RateLimiter, TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate=10, capacity=3)
+        waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.1, places=2)
+        self.assertAlmostEqual(waits[4], 0.2, places=2)
+
+    def test_refills_over_time(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        bucket.reserve()
+        time.sleep(0.02)
+        self.assertEqual(bucket.reserve(), 0.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter({'provider': {None: (600, 2)}})
+        self.limiter.configure('provider', 60, endpoint='slow/endpoint')
+
+    def test_unknown_provider_is_not_limited(self):
+        self.assertEqual(self.limiter.reserve('unknown'), 0.0)
+
+    def test_endpoint_budget_applies_on_top_of_provider(self):
+        self.assertEqual(self.limiter.reserve('provider', 'slow/endpoint'), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve('provider', 'slow/endpoint'), 1.0, places=2)
+        # other endpoints only draw from the provider budget
+        self.assertAlmostEqual(self.limiter.reserve('provider', 'fast'), 0.1, places=2)
+
+    def test_acquire_async_waits(self):
+        async def acquire_three():
+            start = time.monotonic()
+            for _ in range(3):
+                await self.limiter.acquire_async('provider')
+            return time.monotonic() - start
+        self.assertGreaterEqual(asyncio.run(acquire_three()), 0.09)
+        self.assertEqual(self.limiter.get_stats()['provider']['calls'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
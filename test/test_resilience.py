@@ -0,0 +1,127 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import time
+import unittest
+
+from requests.exceptions import ConnectionError
+
+from apis import resilience, utils
+
+
+class FlakyAPI:
+    def __init__(self, source, failures):
+        self.source = source
+        self.failures = failures
+        self.calls = 0
+
+    @utils.handle_request_errors
+    def get_data(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError('connection reset')
+        return 'data'
+
+    @utils.handle_request_errors
+    async def get_data_async(self):
+        return self.get_data.__wrapped__(self)
+
+
+class Unparsable(FlakyAPI):
+    @utils.handle_request_errors
+    def get_data(self):
+        return {}['data']
+
+    @utils.handle_request_errors
+    async def get_data_async(self):
+        raise asyncio.CancelledError
+
+
+class TestHandleRequestErrors(unittest.TestCase):
+    def setUp(self):
+        resilience.configure(
+            'flaky', max_attempts=3, base_delay=0.001, max_delay=0.001,
+            failure_threshold=2, reset_timeout=0.05
+        )
+
+    def tearDown(self):
+        resilience.SOURCE_POLICIES.pop('flaky', None)
+        resilience._breakers.pop('flaky', None)
+
+    def test_retries_until_success(self):
+        api = FlakyAPI('flaky', failures=2)
+        self.assertEqual(api.get_data(), 'data')
+        self.assertEqual(api.calls, 3)
+        self.assertEqual(resilience.get_breaker('flaky').state, 'closed')
+
+    def test_async_retries_until_success(self):
+        api = FlakyAPI('flaky', failures=1)
+        self.assertEqual(asyncio.run(api.get_data_async()), 'data')
+        self.assertEqual(api.calls, 2)
+
+    def test_breaker_opens_and_skips_calls(self):
+        api = FlakyAPI('flaky', failures=100)
+        self.assertIsNone(api.get_data())
+        self.assertIsNone(api.get_data())
+        self.assertEqual(api.calls, 6)
+        breaker = resilience.get_breaker('flaky')
+        self.assertEqual(breaker.state, 'open')
+        # while open, the provider is not called at all
+        self.assertIsNone(api.get_data())
+        self.assertEqual(api.calls, 6)
+        self.assertEqual(breaker.skipped, 1)
+
+    def test_breaker_half_open_trial_closes_it(self):
+        api = FlakyAPI('flaky', failures=6)
+        api.get_data()
+        api.get_data()
+        self.assertEqual(resilience.get_breaker('flaky').state, 'open')
+        time.sleep(0.06)
+        self.assertEqual(api.get_data(), 'data')
+        self.assertEqual(resilience.get_breaker('flaky').state, 'closed')
+
+    def test_other_errors_reopen_half_open_breaker(self):
+        api = FlakyAPI('flaky', failures=6)
+        api.get_data()
+        api.get_data()
+        time.sleep(0.06)
+        with self.assertRaises(KeyError):
+            Unparsable('flaky', failures=0).get_data()
+        breaker = resilience.get_breaker('flaky')
+        self.assertEqual(breaker.state, 'open')
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())      # a new trial once reset_timeout passed
+
+    def test_async_cancellation_is_not_a_failure(self):
+        api = Unparsable('flaky', failures=0)
+        for _ in range(2):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(api.get_data_async())
+        breaker = resilience.get_breaker('flaky')
+        self.assertEqual((breaker.state, breaker.failures), ('closed', 0))
+
+    def test_cancelled_trial_releases_half_open_breaker(self):
+        api = FlakyAPI('flaky', failures=6)
+        api.get_data()
+        api.get_data()
+        time.sleep(0.06)
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(Unparsable('flaky', failures=0).get_data_async())
+        breaker = resilience.get_breaker('flaky')
+        self.assertEqual(breaker.failures, 2)
+        self.assertTrue(breaker.allow())      # the next call is the trial
+
+    def test_latency_budget_stops_retries(self):
+        resilience.configure('flaky', latency_budget=0, base_delay=1, max_delay=1)
+        api = FlakyAPI('flaky', failures=100)
+        self.assertIsNone(api.get_data())
+        self.assertEqual(api.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.exceptions import RequestException
+
+from apis import async_utils
+from apis.response_cache import ResponseCache
+from apis.sessions import SessionPool
+
+
+class Listing(ThreadingHTTPServer):
+    etag = '"v1"'
+    delay = 0.0
+    status = 200
+    requests = []
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('If-None-Match')))
+        time.sleep(self.server.delay)
+        if self.headers.get('If-None-Match') == self.server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ('%s %s' % (self.path, self.server.etag)).encode()
+        self.send_response(self.server.status)
+        self.send_header('ETag', self.server.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.server = Listing(('127.0.0.1', 0), Handler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:%d/listings' % self.server.server_address[1]
+        self.cache = ResponseCache(pool=SessionPool(), ttls={'test': 60})
+
+    def get(self, **params):
+        return self.cache.get(self.url, source='test', params=params)
+
+    def test_hits_within_ttl_keyed_by_params(self):
+        self.assertEqual(self.get(limit=10, page=1).text, '/listings?limit=10&page=1 "v1"')
+        self.assertIs(self.get(page=1, limit=10), self.get(limit=10, page=1))
+        self.get(limit=20, page=1)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.cache.get_stats()['test'],
+                         {'hits': 2, 'misses': 2, 'revalidated': 0, 'coalesced': 0})
+
+    def test_expired_entries_are_revalidated(self):
+        self.cache.configure('test', 0.05)
+        first = self.get(limit=10)
+        time.sleep(0.1)
+        self.assertIs(self.get(limit=10), first)      # 304
+        self.assertEqual(self.server.requests[-1][1], '"v1"')
+
+        self.server.etag = '"v2"'
+        time.sleep(0.1)
+        self.assertEqual(self.get(limit=10).text, '/listings?limit=10 "v2"')
+        stats = self.cache.get_stats()['test']
+        self.assertEqual((stats['revalidated'], stats['misses']), (1, 2))
+
+    def test_concurrent_requests_coalesce(self):
+        self.server.delay = 0.2
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(lambda _: self.get(limit=10), range(8)))
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(all(response is responses[0] for response in responses))
+        stats = self.cache.get_stats()['test']
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'] + stats['coalesced'], 7)
+
+    def get_async(self, count, **params):
+        async def gets():
+            try:
+                return await asyncio.gather(*[
+                    self.cache.get_async(self.url, source='test', params=params)
+                    for _ in range(count)
+                ])
+            finally:
+                await async_utils.close_session()
+        return asyncio.run(gets())
+
+    def test_async_requests_share_the_cache(self):
+        self.server.delay = 0.2
+        responses = self.get_async(4, limit=10)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(all(response is responses[0] for response in responses))
+        self.assertEqual(responses[0].text, '/listings?limit=10 "v1"')
+        # cached by an asyncio request, hit by a blocking one and vice versa
+        self.assertIs(self.get(limit=10), responses[0])
+        blocking = self.get(limit=20)
+        self.assertIs(self.get_async(1, limit=20)[0], blocking)
+
+        self.cache.configure('test', 0.05)
+        time.sleep(0.1)
+        self.assertIs(self.get_async(1, limit=10)[0], responses[0])   # 304
+        self.assertEqual(self.server.requests[-1][1], '"v1"')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.cache.get_stats()['test'],
+                         {'hits': 2, 'misses': 2, 'revalidated': 1, 'coalesced': 3})
+
+    def test_cancelled_async_request_fails_its_waiters(self):
+        self.server.delay = 0.2
+
+        async def cancel_leader():
+            try:
+                leader = asyncio.ensure_future(
+                    self.cache.get_async(self.url, source='test'))
+                await asyncio.sleep(0.05)
+                waiter = asyncio.ensure_future(
+                    self.cache.get_async(self.url, source='test'))
+                await asyncio.sleep(0.05)
+                leader.cancel()
+                return await asyncio.gather(leader, waiter, return_exceptions=True)
+            finally:
+                await async_utils.close_session()
+
+        leader, waiter = asyncio.run(cancel_leader())
+        self.assertIsInstance(leader, asyncio.CancelledError)
+        self.assertIsInstance(waiter, RequestException)
+        self.assertEqual(self.get().status_code, 200)     # not left in flight
+
+    def test_errors_and_uncached_sources_pass_through(self):
+        self.server.status = 429
+        self.assertEqual(self.get(limit=10).status_code, 429)
+        self.assertEqual(self.get(limit=10).status_code, 429)
+        self.assertEqual(len(self.server.requests), 2)
+
+        self.server.status = 200
+        self.cache.get(self.url, source='other')
+        self.cache.get(self.url, source='other')
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertNotIn('other', self.cache.get_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
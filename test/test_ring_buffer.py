@@ -0,0 +1,69 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import unittest
+
+import numpy as np
+
+from feeds.data_feed import DataFeed
+from feeds.ring_buffer import RingBuffer
+
+
+class BufferedFeed(DataFeed):
+    NAME = 'buffered'
+    ID = 102
+    HEARTBEAT = 1
+    DATAPOINT_BUFFER = RingBuffer(10)
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_empty(self):
+        buffer = RingBuffer(4)
+        self.assertEqual(len(buffer), 0)
+        self.assertIsNone(buffer.latest())
+        self.assertEqual(len(buffer.window()[1]), 0)
+        with self.assertRaises(IndexError):
+            buffer[-1]
+
+    def test_wraps_around_keeping_the_newest_points(self):
+        buffer = RingBuffer(4)
+        for i in range(10):
+            buffer.append(i * 1.5, 1000 + i)
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.latest(), (1009.0, 13.5))
+        self.assertEqual(buffer[-1], 13.5)
+        self.assertEqual(buffer[0], 9.0)
+        timestamps, values = buffer.window()
+        np.testing.assert_array_equal(timestamps, [1006, 1007, 1008, 1009])
+        np.testing.assert_array_equal(values, [9.0, 10.5, 12.0, 13.5])
+        np.testing.assert_array_equal(buffer.window(2)[1], [12.0, 13.5])
+
+    def test_window_is_a_read_only_view(self):
+        buffer = RingBuffer(4)
+        buffer.extend([1.0, 2.0, 3.0], [1, 2, 3])
+        timestamps, values = buffer.window()
+        self.assertFalse(values.flags.owndata)
+        with self.assertRaises(ValueError):
+            values[0] = 0
+
+    def test_object_dtype(self):
+        buffer = RingBuffer(2, dtype=object)
+        buffer.append({'detail': [1]}, 1)
+        self.assertEqual(buffer[-1], {'detail': [1]})
+
+    def test_feed_serves_production_time(self):
+        BufferedFeed.store_data_point(42.0)
+        self.assertIsNone(BufferedFeed.store_data_point(None))
+        stamp = BufferedFeed.DATAPOINT_BUFFER.latest()[0]
+        served = BufferedFeed.get_most_recently_stored_data_point()
+        self.assertEqual(served['data_point'], 42.0)
+        self.assertEqual(served['time_stamp'], stamp)
+        self.assertEqual(len(BufferedFeed.DATAPOINT_BUFFER), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
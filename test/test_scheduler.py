@@ -0,0 +1,92 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import time
+import unittest
+
+from feeds.data_feed import DataFeed
+from feeds.ring_buffer import RingBuffer
+from feeds.scheduler import HeartbeatScheduler
+
+
+class FastFeed(DataFeed):
+    NAME = 'fast'
+    ID = 100
+    HEARTBEAT = 0.05
+    DATAPOINT_BUFFER = RingBuffer(100)
+    PERSIST = False
+    STAMPS = []
+
+    @classmethod
+    def create_new_data_point(cls):
+        cls.STAMPS.append(time.time())
+        return len(cls.STAMPS)
+
+
+class SlowFeed(FastFeed):
+    NAME = 'slow'
+    ID = 101
+    DATAPOINT_BUFFER = RingBuffer(100)
+    STAMPS = []
+
+    @classmethod
+    def create_new_data_point(cls):
+        time.sleep(0.12)
+        return super().create_new_data_point()
+
+
+class TestHeartbeatScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = HeartbeatScheduler(max_workers=2)
+        for feed in (FastFeed, SlowFeed):
+            feed.STAMPS.clear()
+            feed.DATAPOINT_BUFFER.clear()
+            feed.COUNT = 0
+            feed.start()
+
+    def tearDown(self):
+        for feed in (FastFeed, SlowFeed):
+            feed.stop()
+        self.scheduler.shutdown()
+
+    def test_next_tick_is_wall_clock_aligned(self):
+        self.assertEqual(HeartbeatScheduler.next_tick(60, 119.5), 120)
+        self.assertEqual(HeartbeatScheduler.next_tick(60, 120), 180)
+
+    def test_ticks_do_not_drift(self):
+        self.scheduler.add_feed(FastFeed)
+        time.sleep(0.5)
+        self.scheduler.remove_feed(FastFeed)
+        # the first tick fires immediately, the rest land on multiples of HEARTBEAT
+        for stamp in FastFeed.STAMPS[1:]:
+            offset = stamp % FastFeed.HEARTBEAT
+            self.assertLess(min(offset, FastFeed.HEARTBEAT - offset), 0.03)
+        self.assertGreaterEqual(FastFeed.COUNT, 8)
+        stats = self.scheduler.get_stats()[FastFeed.NAME]
+        self.assertEqual(stats.ticks, FastFeed.COUNT)
+        self.assertLess(stats.max_lateness, 0.03)
+
+    def test_overrunning_tick_is_skipped(self):
+        self.scheduler.add_feed(SlowFeed)
+        time.sleep(0.5)
+        self.scheduler.remove_feed(SlowFeed)
+        stats = self.scheduler.get_stats()[SlowFeed.NAME]
+        self.assertGreater(stats.skipped, 0)
+        self.assertEqual(stats.ticks, SlowFeed.COUNT)
+
+    def test_removed_feed_stops_firing(self):
+        self.scheduler.add_feed(FastFeed)
+        time.sleep(0.2)
+        self.scheduler.remove_feed(FastFeed)
+        count = FastFeed.COUNT
+        time.sleep(0.2)
+        self.assertEqual(FastFeed.COUNT, count)
+        self.assertNotIn(FastFeed.NAME, self.scheduler.feed_names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.exceptions import Timeout
+
+from apis.sessions import SessionPool
+
+
+class Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass            # clients that timed out hang up on /slow
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'       # keeps connections alive
+
+    def do_GET(self):
+        if self.path.startswith('/slow'):
+            time.sleep(0.5)
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.bases = []
+        for _ in range(2):
+            server = Server(('127.0.0.1', 0), Handler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            self.bases.append('http://127.0.0.1:%d' % server.server_address[1])
+        self.pool = SessionPool(timeout=0.2)
+        self.addCleanup(self.pool.close)
+
+    def test_connections_reused_per_host(self):
+        first, second = self.bases
+        for i in range(5):
+            self.assertEqual(self.pool.get(f'{first}/coins?page={i}').json(), {})
+        self.pool.get(second + '/')
+        self.assertIs(self.pool.session_for(first + '/other'),
+                      self.pool.session_for(first + '/coins'))
+        self.assertIsNot(self.pool.session_for(first), self.pool.session_for(second))
+
+        stats = self.pool.get_stats()
+        self.assertEqual(stats[first], {'requests': 5, 'connections': 1, 'reused': 4})
+        self.assertEqual(stats[second], {'requests': 1, 'connections': 1, 'reused': 0})
+
+        self.pool.close()
+        self.assertEqual(self.pool.get_stats(), {})
+
+    def test_default_timeout(self):
+        base = self.bases[0]
+        with self.assertRaises(Timeout):
+            self.pool.get(base + '/slow')
+        self.assertEqual(self.pool.get(base + '/slow', timeout=5).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import sys
+import os
+
+# Add the parent directory of siwa-lite to the Python path
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.append(parent_dir)
+
+import unittest
+
+import numpy as np
+
+from apis.share_solver import SHARE_TOLERANCE, project_shares, share_residual, solve_shares
+from benchmarks.share_solver import legacy_adjust_share
+
+
+def make_universe(rng, n):
+    avg = rng.dirichlet(np.ones(n))
+    std = avg * rng.uniform(0.05, 0.4, n)
+    multiplier = np.exp(-100 * avg)
+    lower = np.maximum(avg - multiplier * std, 0)
+    upper = avg + multiplier * std
+    values = np.maximum(avg + 2 * std * rng.standard_normal(n), 1e-9) * 1e6
+    return values, lower, upper
+
+
+class TestShareSolver(unittest.TestCase):
+    def test_values_within_caps_are_unchanged(self):
+        solution = solve_shares([1.0, 2.0, 1.0], [0.2, 0.4, 0.2], [0.3, 0.6, 0.3])
+        np.testing.assert_array_equal(solution.values, [1.0, 2.0, 1.0])
+        self.assertEqual(solution.passes, 1)
+        self.assertEqual(solution.residual, 0)
+
+    def test_matches_legacy_where_it_converges(self):
+        rng = np.random.default_rng(0)
+        compared = 0
+        for _ in range(100):
+            values, lower, upper = make_universe(rng, int(rng.integers(5, 60)))
+            legacy = np.array(legacy_adjust_share(
+                values.tolist(), lower.tolist(), upper.tolist(), 1000))
+            if share_residual(legacy, lower, upper) > SHARE_TOLERANCE:
+                continue
+            solution = solve_shares(values, lower, upper, max_passes=1000)
+            self.assertFalse(solution.projected)
+            # the greedy passes stop within SHARE_TOLERANCE of the caps,
+            # legacy carries on until it hits them exactly
+            np.testing.assert_allclose(solution.values, legacy, rtol=0, atol=1e-9 * legacy.sum())
+            self.assertAlmostEqual(solution.total / legacy.sum(), 1, places=9)
+            compared += 1
+        self.assertGreater(compared, 20)
+
+    def test_projection_is_exact_and_bounded(self):
+        rng = np.random.default_rng(1)
+        values, lower, upper = make_universe(rng, 10000)
+        solution = project_shares(values, lower, upper)
+        self.assertLess(solution.passes, 100)
+        self.assertLessEqual(solution.residual, SHARE_TOLERANCE)
+        shares = values / solution.total
+        free = (shares > lower) & (shares < upper)
+        # values within their caps keep their original value
+        np.testing.assert_allclose(solution.values[free], values[free])
+
+    def test_falls_back_to_projection(self):
+        rng = np.random.default_rng(2)
+        values, lower, upper = make_universe(rng, 2000)
+        solution = solve_shares(values, lower, upper, max_passes=50)
+        self.assertTrue(solution.projected)
+        self.assertLessEqual(solution.residual, SHARE_TOLERANCE)
+        self.assertAlmostEqual(solution.total, solution.values.sum())
+
+    def test_hopeless_greedy_stops_early(self):
+        # far more skins off their caps than greedy passes
+        rng = np.random.default_rng(1)
+        values, lower, upper = make_universe(rng, 10000)
+        solution = solve_shares(values, lower, upper, max_passes=1000)
+        self.assertTrue(solution.projected)
+        self.assertLess(solution.passes, 100)
+        self.assertLessEqual(solution.residual, SHARE_TOLERANCE)
+
+    def test_infeasible_caps_report_residual(self):
+        solution = solve_shares([1.0, 1.0], [0.6, 0.6], [0.8, 0.8])
+        self.assertGreater(solution.residual, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()